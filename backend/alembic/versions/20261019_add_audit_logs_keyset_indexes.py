@@ -0,0 +1,33 @@
+"""add_audit_logs_keyset_indexes
+
+Revision ID: 20261019_audit_keyset
+Revises: 20261019_hourly_rollups
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_audit_keyset'
+down_revision: Union[str, None] = '20261019_hourly_rollups'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """ユーザー・企業別インデックスに id を追加し、(created_at, id) のキーセットページネーションで使えるようにする"""
+    op.drop_index('idx_audit_logs_user_id_created_at', table_name='audit_logs')
+    op.drop_index('idx_audit_logs_company_id_created_at', table_name='audit_logs')
+    op.create_index('idx_audit_logs_user_id_created_at', 'audit_logs', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('idx_audit_logs_company_id_created_at', 'audit_logs', ['company_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """インデックスを (user_id, created_at) / (company_id, created_at) に戻す"""
+    op.drop_index('idx_audit_logs_company_id_created_at', table_name='audit_logs')
+    op.drop_index('idx_audit_logs_user_id_created_at', table_name='audit_logs')
+    op.create_index('idx_audit_logs_company_id_created_at', 'audit_logs', ['company_id', 'created_at'], unique=False)
+    op.create_index('idx_audit_logs_user_id_created_at', 'audit_logs', ['user_id', 'created_at'], unique=False)
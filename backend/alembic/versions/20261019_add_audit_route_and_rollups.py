@@ -0,0 +1,78 @@
+"""add_audit_route_and_rollups
+
+Revision ID: 20261019_audit_rollups
+Revises: 20260104_audit_logs
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_audit_rollups'
+down_revision: Union[str, None] = '20260104_audit_logs'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+LATENCY_BUCKET_COLUMNS = [
+    ('bucket_le_10ms', '10ms以下の件数'),
+    ('bucket_le_25ms', '25ms以下の件数'),
+    ('bucket_le_50ms', '50ms以下の件数'),
+    ('bucket_le_100ms', '100ms以下の件数'),
+    ('bucket_le_250ms', '250ms以下の件数'),
+    ('bucket_le_500ms', '500ms以下の件数'),
+    ('bucket_le_1000ms', '1000ms以下の件数'),
+    ('bucket_le_2500ms', '2500ms以下の件数'),
+    ('bucket_le_5000ms', '5000ms以下の件数'),
+    ('bucket_le_inf', '5000ms超の件数'),
+]
+
+
+def upgrade() -> None:
+    """操作履歴にルートテンプレートを追加し、1分単位の集計テーブルを作成"""
+    op.add_column(
+        'audit_logs',
+        sa.Column('route', sa.String(length=255), nullable=True, comment='ルートテンプレート（例: /api/users/{user_id}、未マッチの場合はNULL）'),
+    )
+
+    op.create_table(
+        'audit_log_rollups',
+        sa.Column('id', sa.BigInteger(), nullable=False, comment='集計ID'),
+        sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False, comment='集計区間の開始時刻（分単位）'),
+        sa.Column('route', sa.String(length=255), nullable=False, comment='ルートテンプレート（例: /api/users/{user_id}）'),
+        sa.Column('method', sa.String(length=10), nullable=False, comment='HTTPメソッド'),
+        sa.Column('status_class', sa.SmallInteger(), nullable=False, comment='ステータス区分（2=2xx, 4=4xx, 5=5xx など）'),
+        sa.Column('company_id', sa.Integer(), nullable=True, comment='企業ID（未認証の場合はNULL）'),
+        sa.Column('request_count', sa.Integer(), nullable=False, comment='リクエスト数'),
+        sa.Column('error_count', sa.Integer(), nullable=False, comment='エラー数（5xx）'),
+        sa.Column('latency_sum_ms', sa.BigInteger(), nullable=False, comment='レスポンス時間の合計（ミリ秒）'),
+        sa.Column('latency_min_ms', sa.Integer(), nullable=True, comment='レスポンス時間の最小値（ミリ秒）'),
+        sa.Column('latency_max_ms', sa.Integer(), nullable=True, comment='レスポンス時間の最大値（ミリ秒）'),
+        *[
+            sa.Column(name, sa.Integer(), nullable=False, comment=comment)
+            for name, comment in LATENCY_BUCKET_COLUMNS
+        ],
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint(
+            'bucket_start', 'route', 'method', 'status_class', 'company_id',
+            name='uq_audit_log_rollups_key',
+            postgresql_nulls_not_distinct=True,
+        ),
+    )
+
+    # インデックス作成
+    op.create_index('idx_audit_log_rollups_company_id_bucket_start', 'audit_log_rollups', ['company_id', 'bucket_start'], unique=False)
+    op.create_index('idx_audit_log_rollups_route_bucket_start', 'audit_log_rollups', ['route', 'bucket_start'], unique=False)
+
+
+def downgrade() -> None:
+    """集計テーブルとルートテンプレートを削除"""
+    op.drop_index('idx_audit_log_rollups_route_bucket_start', table_name='audit_log_rollups')
+    op.drop_index('idx_audit_log_rollups_company_id_bucket_start', table_name='audit_log_rollups')
+    op.drop_table('audit_log_rollups')
+    op.drop_column('audit_logs', 'route')
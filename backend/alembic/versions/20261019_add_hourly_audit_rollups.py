@@ -0,0 +1,81 @@
+"""add_hourly_audit_rollups
+
+Revision ID: 20261019_hourly_rollups
+Revises: 20261019_audit_rollups
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_hourly_rollups'
+down_revision: Union[str, None] = '20261019_audit_rollups'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """集計区間の長さを追加し、1時間単位の集計行を保持できるようにする"""
+    op.add_column(
+        'audit_log_rollups',
+        sa.Column('bucket_minutes', sa.SmallInteger(), nullable=False, server_default='1', comment='集計区間の長さ（分、1 または 60）'),
+    )
+    op.alter_column('audit_log_rollups', 'bucket_minutes', server_default=None)
+    op.alter_column(
+        'audit_log_rollups', 'bucket_start',
+        existing_type=sa.DateTime(timezone=True),
+        comment='集計区間の開始時刻',
+        existing_comment='集計区間の開始時刻（分単位）',
+    )
+
+    # 一意制約とインデックスを集計区間の長さを含めて作り直す
+    op.drop_constraint('uq_audit_log_rollups_key', 'audit_log_rollups', type_='unique')
+
+    # 既存の1分単位の行から1時間単位の行を作成
+    op.execute("""
+        INSERT INTO audit_log_rollups (
+            bucket_minutes, bucket_start, route, method, status_class, company_id,
+            request_count, error_count, latency_sum_ms, latency_min_ms, latency_max_ms,
+            bucket_le_10ms, bucket_le_25ms, bucket_le_50ms, bucket_le_100ms, bucket_le_250ms,
+            bucket_le_500ms, bucket_le_1000ms, bucket_le_2500ms, bucket_le_5000ms, bucket_le_inf
+        )
+        SELECT
+            60, date_trunc('hour', bucket_start), route, method, status_class, company_id,
+            sum(request_count), sum(error_count), sum(latency_sum_ms), min(latency_min_ms), max(latency_max_ms),
+            sum(bucket_le_10ms), sum(bucket_le_25ms), sum(bucket_le_50ms), sum(bucket_le_100ms), sum(bucket_le_250ms),
+            sum(bucket_le_500ms), sum(bucket_le_1000ms), sum(bucket_le_2500ms), sum(bucket_le_5000ms), sum(bucket_le_inf)
+        FROM audit_log_rollups
+        GROUP BY date_trunc('hour', bucket_start), route, method, status_class, company_id
+    """)
+
+    op.create_unique_constraint(
+        'uq_audit_log_rollups_key',
+        'audit_log_rollups',
+        ['bucket_minutes', 'bucket_start', 'route', 'method', 'status_class', 'company_id'],
+        postgresql_nulls_not_distinct=True,
+    )
+    op.drop_index('idx_audit_log_rollups_route_bucket_start', table_name='audit_log_rollups')
+    op.drop_index('idx_audit_log_rollups_company_id_bucket_start', table_name='audit_log_rollups')
+    op.create_index('idx_audit_log_rollups_company_id_bucket_start', 'audit_log_rollups', ['bucket_minutes', 'company_id', 'bucket_start'], unique=False)
+    op.create_index('idx_audit_log_rollups_route_bucket_start', 'audit_log_rollups', ['bucket_minutes', 'route', 'bucket_start'], unique=False)
+
+
+def downgrade() -> None:
+    """1時間単位の集計行と集計区間の長さを削除"""
+    op.drop_index('idx_audit_log_rollups_route_bucket_start', table_name='audit_log_rollups')
+    op.drop_index('idx_audit_log_rollups_company_id_bucket_start', table_name='audit_log_rollups')
+    op.execute("DELETE FROM audit_log_rollups WHERE bucket_minutes <> 1")
+    op.drop_constraint('uq_audit_log_rollups_key', 'audit_log_rollups', type_='unique')
+    op.create_unique_constraint(
+        'uq_audit_log_rollups_key',
+        'audit_log_rollups',
+        ['bucket_start', 'route', 'method', 'status_class', 'company_id'],
+        postgresql_nulls_not_distinct=True,
+    )
+    op.create_index('idx_audit_log_rollups_company_id_bucket_start', 'audit_log_rollups', ['company_id', 'bucket_start'], unique=False)
+    op.create_index('idx_audit_log_rollups_route_bucket_start', 'audit_log_rollups', ['route', 'bucket_start'], unique=False)
+    op.drop_column('audit_log_rollups', 'bucket_minutes')
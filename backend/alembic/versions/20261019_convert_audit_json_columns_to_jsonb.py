@@ -0,0 +1,118 @@
+"""convert_audit_json_columns_to_jsonb
+
+Revision ID: 20261019_audit_jsonb
+Revises: 20261019_audit_dimensions
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_audit_jsonb'
+down_revision: Union[str, None] = '20261019_audit_dimensions'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+AUDIT_LOGS_VIEW_SQL = """
+CREATE VIEW audit_logs_view AS
+SELECT
+    l.id,
+    l.user_id,
+    l.company_id,
+    l.method,
+    p.value AS path,
+    l.route,
+    l.query_params,
+    l.request_body,
+    l.status_code,
+    l.response_time_ms,
+    l.ip_address,
+    ua.value AS user_agent,
+    l.created_at
+FROM audit_logs l
+JOIN audit_paths p ON p.id = l.path_id
+LEFT JOIN audit_user_agents ua ON ua.id = l.user_agent_id
+"""
+
+
+def upgrade() -> None:
+    """request_body / query_params を JSONB に変換し、包含検索用の GIN インデックスを作成"""
+    # ビューが参照しているカラムの型は変更できないため作り直す
+    op.execute("DROP VIEW IF EXISTS audit_logs_view")
+
+    # JSONとして解釈できない既存の値は NULL にする
+    op.execute("""
+        CREATE FUNCTION pg_temp.try_jsonb(value text) RETURNS jsonb AS $$
+        BEGIN
+            RETURN value::jsonb;
+        EXCEPTION WHEN others THEN
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql IMMUTABLE
+    """)
+    op.alter_column(
+        'audit_logs', 'request_body',
+        type_=postgresql.JSONB(),
+        existing_type=sa.Text(),
+        postgresql_using='pg_temp.try_jsonb(request_body)',
+        comment='リクエストボディ（JSONB、機密情報は除外）',
+        existing_comment='リクエストボディ（JSON、機密情報は除外）',
+    )
+    op.alter_column(
+        'audit_logs', 'query_params',
+        type_=postgresql.JSONB(),
+        existing_type=sa.Text(),
+        postgresql_using='pg_temp.try_jsonb(query_params)',
+        comment='クエリパラメータ（JSONB）',
+        existing_comment='クエリパラメータ（JSON）',
+    )
+
+    op.execute(AUDIT_LOGS_VIEW_SQL)
+
+    # 包含検索（@>）用、値がある行のみ（参照系の多くはボディを持たない）
+    op.create_index(
+        'idx_audit_logs_request_body', 'audit_logs', ['request_body'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'request_body': 'jsonb_path_ops'},
+        postgresql_where=sa.text('request_body IS NOT NULL'),
+    )
+    op.create_index(
+        'idx_audit_logs_query_params', 'audit_logs', ['query_params'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'query_params': 'jsonb_path_ops'},
+        postgresql_where=sa.text('query_params IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    """request_body / query_params を Text に戻す"""
+    op.drop_index('idx_audit_logs_query_params', table_name='audit_logs')
+    op.drop_index('idx_audit_logs_request_body', table_name='audit_logs')
+    op.execute("DROP VIEW IF EXISTS audit_logs_view")
+
+    op.alter_column(
+        'audit_logs', 'query_params',
+        type_=sa.Text(),
+        existing_type=postgresql.JSONB(),
+        postgresql_using='query_params::text',
+        comment='クエリパラメータ（JSON）',
+        existing_comment='クエリパラメータ（JSONB）',
+    )
+    op.alter_column(
+        'audit_logs', 'request_body',
+        type_=sa.Text(),
+        existing_type=postgresql.JSONB(),
+        postgresql_using='request_body::text',
+        comment='リクエストボディ（JSON、機密情報は除外）',
+        existing_comment='リクエストボディ（JSONB、機密情報は除外）',
+    )
+
+    op.execute(AUDIT_LOGS_VIEW_SQL)
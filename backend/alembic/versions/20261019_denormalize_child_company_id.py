@@ -0,0 +1,64 @@
+"""denormalize_child_company_id
+
+Revision ID: 20261019_child_company_id
+Revises: 20261019_audit_soft_refs
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_child_company_id'
+down_revision: Union[str, None] = '20261019_audit_soft_refs'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (テーブル, 企業IDの取得元のテーブル, 取得元への外部キー, 複合インデックスの2列目)
+CHILD_TABLES = [
+    ('visit_records', 'daily_reports', 'daily_report_id', 'visit_datetime'),
+    ('problems', 'daily_reports', 'daily_report_id', 'daily_report_id'),
+    ('plans', 'daily_reports', 'daily_report_id', 'daily_report_id'),
+    ('comments', 'daily_reports', 'daily_report_id', 'daily_report_id'),
+    ('departments', 'branches', 'branch_id', 'branch_id'),
+    ('user_branch_assignments', 'users', 'user_id', 'branch_id'),
+    ('user_department_assignments', 'users', 'user_id', 'department_id'),
+    ('user_role_assignments', 'users', 'user_id', 'user_id'),
+    ('user_group_assignments', 'users', 'user_id', 'user_id'),
+]
+
+
+def upgrade() -> None:
+    """テナントの子テーブルに企業ID（親からの非正規化）を追加し、(company_id, ...) の複合インデックスを作成"""
+    for table, parent, parent_fk, second_column in CHILD_TABLES:
+        # Add company_id column as nullable first
+        op.add_column(table, sa.Column('company_id', sa.Integer(), nullable=True, comment='企業ID'))
+
+        # Populate company_id from the parent
+        op.execute(f"""
+            UPDATE {table} t
+            SET company_id = p.company_id
+            FROM {parent} p
+            WHERE t.{parent_fk} = p.id
+        """)
+
+        op.alter_column(table, 'company_id', existing_type=sa.Integer(), nullable=False)
+        op.create_foreign_key(
+            f'fk_{table}_company_id',
+            table, 'companies',
+            ['company_id'], ['id'],
+            ondelete='CASCADE'
+        )
+        op.create_index(f'idx_{table}_company_id_{second_column}', table, ['company_id', second_column])
+
+
+def downgrade() -> None:
+    """企業IDを削除"""
+    for table, _, _, second_column in reversed(CHILD_TABLES):
+        op.drop_index(f'idx_{table}_company_id_{second_column}', table_name=table)
+        op.drop_constraint(f'fk_{table}_company_id', table, type_='foreignkey')
+        op.drop_column(table, 'company_id')
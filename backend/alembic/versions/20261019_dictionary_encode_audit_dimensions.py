@@ -0,0 +1,93 @@
+"""dictionary_encode_audit_dimensions
+
+Revision ID: 20261019_audit_dimensions
+Revises: 20261019_audit_keyset
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_audit_dimensions'
+down_revision: Union[str, None] = '20261019_audit_keyset'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+AUDIT_LOGS_VIEW_SQL = """
+CREATE VIEW audit_logs_view AS
+SELECT
+    l.id,
+    l.user_id,
+    l.company_id,
+    l.method,
+    p.value AS path,
+    l.route,
+    l.query_params,
+    l.request_body,
+    l.status_code,
+    l.response_time_ms,
+    l.ip_address,
+    ua.value AS user_agent,
+    l.created_at
+FROM audit_logs l
+JOIN audit_paths p ON p.id = l.path_id
+LEFT JOIN audit_user_agents ua ON ua.id = l.user_agent_id
+"""
+
+
+def upgrade() -> None:
+    """リクエストパス・User-Agent を辞書テーブルのIDへ置き換え、文字列を参照するビューを作成"""
+    op.create_table(
+        'audit_paths',
+        sa.Column('id', sa.Integer(), nullable=False, comment='パスID'),
+        sa.Column('value', sa.String(length=500), nullable=False, comment='リクエストパス'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('value'),
+    )
+    op.create_table(
+        'audit_user_agents',
+        sa.Column('id', sa.Integer(), nullable=False, comment='User-Agent ID'),
+        sa.Column('value', sa.String(length=500), nullable=False, comment='User-Agent'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('value'),
+    )
+
+    op.add_column('audit_logs', sa.Column('path_id', sa.Integer(), nullable=True, comment='リクエストパスID'))
+    op.add_column('audit_logs', sa.Column('user_agent_id', sa.Integer(), nullable=True, comment='User-Agent ID'))
+
+    # 既存の値を辞書テーブルへ登録してIDを設定
+    op.execute("INSERT INTO audit_paths (value) SELECT DISTINCT path FROM audit_logs")
+    op.execute("INSERT INTO audit_user_agents (value) SELECT DISTINCT user_agent FROM audit_logs WHERE user_agent IS NOT NULL")
+    op.execute("UPDATE audit_logs l SET path_id = p.id FROM audit_paths p WHERE p.value = l.path")
+    op.execute("UPDATE audit_logs l SET user_agent_id = ua.id FROM audit_user_agents ua WHERE ua.value = l.user_agent")
+
+    op.alter_column('audit_logs', 'path_id', nullable=False)
+    op.create_foreign_key('audit_logs_path_id_fkey', 'audit_logs', 'audit_paths', ['path_id'], ['id'])
+    op.create_foreign_key('audit_logs_user_agent_id_fkey', 'audit_logs', 'audit_user_agents', ['user_agent_id'], ['id'])
+    op.drop_column('audit_logs', 'path')
+    op.drop_column('audit_logs', 'user_agent')
+
+    op.execute(AUDIT_LOGS_VIEW_SQL)
+
+
+def downgrade() -> None:
+    """文字列のカラムに戻して辞書テーブルを削除"""
+    op.execute("DROP VIEW IF EXISTS audit_logs_view")
+
+    op.add_column('audit_logs', sa.Column('path', sa.String(length=500), nullable=True, comment='リクエストパス'))
+    op.add_column('audit_logs', sa.Column('user_agent', sa.String(length=500), nullable=True, comment='User-Agent'))
+    op.execute("UPDATE audit_logs l SET path = p.value FROM audit_paths p WHERE p.id = l.path_id")
+    op.execute("UPDATE audit_logs l SET user_agent = ua.value FROM audit_user_agents ua WHERE ua.id = l.user_agent_id")
+    op.alter_column('audit_logs', 'path', nullable=False)
+
+    op.drop_constraint('audit_logs_user_agent_id_fkey', 'audit_logs', type_='foreignkey')
+    op.drop_constraint('audit_logs_path_id_fkey', 'audit_logs', type_='foreignkey')
+    op.drop_column('audit_logs', 'user_agent_id')
+    op.drop_column('audit_logs', 'path_id')
+    op.drop_table('audit_user_agents')
+    op.drop_table('audit_paths')
@@ -0,0 +1,52 @@
+"""drop_audit_tenant_foreign_keys
+
+Revision ID: 20261019_audit_soft_refs
+Revises: 20261019_brin_indexes
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_audit_soft_refs'
+down_revision: Union[str, None] = '20261019_brin_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """操作履歴から企業・ユーザーへの外部キーを外す（企業を別のシャードへ移動しても default に残すため）"""
+    op.drop_constraint('audit_logs_company_id_fkey', 'audit_logs', type_='foreignkey')
+    op.drop_constraint('audit_logs_user_id_fkey', 'audit_logs', type_='foreignkey')
+    op.drop_constraint('audit_log_rollups_company_id_fkey', 'audit_log_rollups', type_='foreignkey')
+
+
+def downgrade() -> None:
+    """外部キーを戻す（移動済みの企業・ユーザーを参照する行は NULL にする）"""
+    op.execute(
+        "UPDATE audit_logs SET company_id = NULL "
+        "WHERE company_id IS NOT NULL AND company_id NOT IN (SELECT id FROM companies)"
+    )
+    op.execute(
+        "UPDATE audit_logs SET user_id = NULL "
+        "WHERE user_id IS NOT NULL AND user_id NOT IN (SELECT id FROM users)"
+    )
+    op.execute(
+        "DELETE FROM audit_log_rollups "
+        "WHERE company_id IS NOT NULL AND company_id NOT IN (SELECT id FROM companies)"
+    )
+    op.create_foreign_key(
+        'audit_log_rollups_company_id_fkey', 'audit_log_rollups', 'companies',
+        ['company_id'], ['id'], ondelete='CASCADE',
+    )
+    op.create_foreign_key(
+        'audit_logs_user_id_fkey', 'audit_logs', 'users',
+        ['user_id'], ['id'], ondelete='SET NULL',
+    )
+    op.create_foreign_key(
+        'audit_logs_company_id_fkey', 'audit_logs', 'companies',
+        ['company_id'], ['id'], ondelete='SET NULL',
+    )
@@ -0,0 +1,47 @@
+"""replace_time_btrees_with_brin
+
+Revision ID: 20261019_brin_indexes
+Revises: 20261019_audit_jsonb
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_brin_indexes'
+down_revision: Union[str, None] = '20261019_audit_jsonb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """追記のみの時系列カラムの btree インデックスを BRIN に置き換える"""
+    # audit_logs.created_at: btree を2つ（モデルの index=True と idx_audit_logs_created_at）持っていたため1つの BRIN にまとめる
+    # 保持期間の削除で空いた領域に新しい行が入っても範囲が広がりすぎないよう minmax_multi を使う
+    op.execute("DROP INDEX IF EXISTS ix_audit_logs_created_at")
+    op.drop_index('idx_audit_logs_created_at', table_name='audit_logs')
+    op.create_index(
+        'idx_audit_logs_created_at_brin', 'audit_logs', ['created_at'],
+        unique=False,
+        postgresql_using='brin',
+        postgresql_ops={'created_at': 'timestamptz_minmax_multi_ops'},
+        postgresql_with={'pages_per_range': 32, 'autosummarize': 'on'},
+    )
+
+    # service_subscription_history.changed_at: 変更時に現在日時で追記されるだけの履歴
+    op.create_index(
+        'idx_service_subscription_history_changed_at_brin', 'service_subscription_history', ['changed_at'],
+        unique=False,
+        postgresql_using='brin',
+    )
+
+
+def downgrade() -> None:
+    """BRIN インデックスを btree に戻す"""
+    op.drop_index('idx_service_subscription_history_changed_at_brin', table_name='service_subscription_history')
+    op.drop_index('idx_audit_logs_created_at_brin', table_name='audit_logs')
+    op.create_index('idx_audit_logs_created_at', 'audit_logs', ['created_at'], unique=False)
+    op.create_index('ix_audit_logs_created_at', 'audit_logs', ['created_at'], unique=False)
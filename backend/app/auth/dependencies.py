@@ -2,33 +2,40 @@
 認証依存性注入
 """
 from typing import Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import bindparam, select
 
-from app.database import get_db
+from app.database import SHARD_KEY, get_db
 from app.auth.jwt import decode_access_token
+from app.auth.repository import AuthUser, fast_path_connection, fetch_auth_user
 from app.models.user import User
+from app.services.tenant_shards import DEFAULT_SHARD, shard_map
 
 # OAuth2スキーム（トークンをAuthorizationヘッダーから取得）
 # Swagger UI用にフォーム形式のログインエンドポイントを指定
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login/form")
 
+# IDによるユーザー取得（全リクエストで実行するため一度だけ構築し、キャッシュキーの生成も省く）
+USER_BY_ID_QUERY = select(User).where(User.id == bindparam("user_id"))
+
 
 async def get_current_user(
+    request: Request,
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db),
-) -> User:
+) -> User | AuthUser:
     """
     現在のユーザーを取得
 
     Args:
+        request: FastAPIリクエスト（操作履歴用に request.state.user を設定）
         token: JWTトークン
         db: データベースセッション
 
     Returns:
-        現在のユーザー
+        現在のユーザー（AUTH_FAST_PATH が有効な場合は AuthUser）
 
     Raises:
         HTTPException: 認証に失敗した場合
@@ -49,13 +56,28 @@ async def get_current_user(
     if user_id is None:
         raise credentials_exception
 
+    # シャード分割時はトークンの company_id で接続先を決めるため、company_id を含まないトークンは受け付けない
+    if shard_map.sharded and payload.get("company_id") is None:
+        raise credentials_exception
+
     # データベースからユーザーを取得
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    conn = await fast_path_connection(db)
+    if conn is not None:
+        user = await fetch_auth_user(conn, user_id)
+    else:
+        result = await db.execute(USER_BY_ID_QUERY, {"user_id": user_id})
+        user = result.scalar_one_or_none()
 
     if user is None:
         raise credentials_exception
 
+    # 移動元のシャードに残った行など、ユーザーの企業の配置先ではないシャードで見つかったユーザーは使わない
+    if shard_map.sharded and shard_map.shard_for(user.company_id) != db.info.get(SHARD_KEY, DEFAULT_SHARD):
+        raise credentials_exception
+
+    # 操作履歴ミドルウェアでユーザー・企業を記録できるようにする
+    request.state.user = user
+
     return user
 
 
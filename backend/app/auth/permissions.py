@@ -4,10 +4,11 @@ Permission Management System
 """
 from typing import Set
 from fastapi import Depends, HTTPException, status
-from sqlalchemy import select, union
+from sqlalchemy import bindparam, select, union
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
+from app.auth.repository import fast_path_connection, fetch_user_permissions
 from app.auth.dependencies import get_current_user
 from app.models.user import User
 from app.models.role import Role
@@ -15,6 +16,20 @@ from app.models.user_role_assignment import UserRoleAssignment
 from app.models.group_role_permission import GroupRolePermission
 from app.models.user_group_assignment import UserGroupAssignment
 
+# ユーザーの最終権限 = 個別権限 ∪ グループ権限
+# 権限チェックのたびに実行するため一度だけ構築する（ユーザーIDはバインドパラメータ）
+USER_PERMISSIONS_QUERY = union(
+    # 1. 個別権限を取得（直接付与された権限）
+    select(Role.code)
+    .join(UserRoleAssignment, UserRoleAssignment.role_id == Role.id)
+    .where(UserRoleAssignment.user_id == bindparam("user_id")),
+    # 2. グループ権限を取得（グループ経由で取得した権限）
+    select(Role.code)
+    .join(GroupRolePermission, GroupRolePermission.role_id == Role.id)
+    .join(UserGroupAssignment, UserGroupAssignment.group_role_id == GroupRolePermission.group_role_id)
+    .where(UserGroupAssignment.user_id == bindparam("user_id")),
+)
+
 
 async def get_user_permissions(db: AsyncSession, user_id: int) -> Set[str]:
     """
@@ -29,24 +44,12 @@ async def get_user_permissions(db: AsyncSession, user_id: int) -> Set[str]:
     Returns:
         Set[str]: 権限コードのセット（例: {"user.create", "report.view"}）
     """
-    # 1. 個別権限を取得（直接付与された権限）
-    direct_query = (
-        select(Role.code)
-        .join(UserRoleAssignment, UserRoleAssignment.role_id == Role.id)
-        .where(UserRoleAssignment.user_id == user_id)
-    )
+    conn = await fast_path_connection(db)
+    if conn is not None:
+        return await fetch_user_permissions(conn, user_id)
 
-    # 2. グループ権限を取得（グループ経由で取得した権限）
-    group_query = (
-        select(Role.code)
-        .join(GroupRolePermission, GroupRolePermission.role_id == Role.id)
-        .join(UserGroupAssignment, UserGroupAssignment.group_role_id == GroupRolePermission.group_role_id)
-        .where(UserGroupAssignment.user_id == user_id)
-    )
-
-    # 3. UNION で統合（重複は自動的に除外される）
-    combined_query = union(direct_query, group_query)
-    result = await db.execute(combined_query)
+    # UNION で統合（重複は自動的に除外される）
+    result = await db.execute(USER_PERMISSIONS_QUERY, {"user_id": user_id})
     permissions = result.scalars().all()
 
     return set(permissions)
@@ -0,0 +1,106 @@
+"""
+Auth Repository
+認証・権限チェックで毎リクエスト実行するクエリを、セッションの接続でSQLのまま実行する
+
+ORM のインスタンス生成・アイデンティティマップ・属性の計装とSQLのコンパイルを省くため、結果は __slots__ の
+レコードや権限コードのセットで返す。SQLAlchemy のドライバーアダプター経由（exec_driver_sql）で実行するため、
+ORM のクエリと同じくセッションのトランザクション（読み取り専用の指定を含む）内で実行され、接続先（シャード・用途）・
+statement_timeout・例外の変換（DBAPIError）・SQLの集計とコメントも ORM のクエリと同じ。
+asyncpg のステートメントキャッシュにより、接続ごとにプリペアドステートメントとして再利用される。
+
+AUTH_FAST_PATH が有効かつドライバーが asyncpg の場合のみ使用し、それ以外は呼び出し側で ORM のクエリを使う。
+"""
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.config import get_settings
+
+settings = get_settings()
+
+USER_BY_ID_SQL = (
+    "SELECT id, company_id, name, email, role, position, created_at, updated_at "
+    "FROM users WHERE id = $1"
+)
+
+# ユーザーの最終権限 = 個別権限 ∪ グループ権限（app.auth.permissions.USER_PERMISSIONS_QUERY と同じ）
+USER_PERMISSIONS_SQL = (
+    "SELECT roles.code FROM roles "
+    "JOIN user_role_assignments ON user_role_assignments.role_id = roles.id "
+    "WHERE user_role_assignments.user_id = $1 "
+    "UNION "
+    "SELECT roles.code FROM roles "
+    "JOIN group_role_permissions ON group_role_permissions.role_id = roles.id "
+    "JOIN user_group_assignments ON user_group_assignments.group_role_id = group_role_permissions.group_role_id "
+    "WHERE user_group_assignments.user_id = $1"
+)
+
+
+@dataclass(slots=True)
+class AuthUser:
+    """認証済みユーザー（User モデルの認証・レスポンスで使う列のみ、パスワードハッシュは含まない）"""
+
+    id: int
+    company_id: int
+    name: str
+    email: str
+    role: str
+    position: str | None
+    created_at: datetime
+    updated_at: datetime
+
+
+async def fast_path_connection(db: AsyncSession) -> AsyncConnection | None:
+    """
+    高速パスで使う接続
+
+    Args:
+        db: データベースセッション（トランザクションを開始していない場合は開始する）
+
+    Returns:
+        セッションの接続（AUTH_FAST_PATH が無効、または asyncpg 以外のドライバーの場合はNone）
+    """
+    if not settings.AUTH_FAST_PATH:
+        return None
+    conn = await db.connection()
+    if conn.dialect.driver != "asyncpg":
+        return None
+    return conn
+
+
+async def _fetch(conn: AsyncConnection, sql: str, *args) -> list[Row]:
+    """SQLを実行（asyncpg の $1 形式のプレースホルダーに位置パラメータを渡す）"""
+    result = await conn.exec_driver_sql(sql, args)
+    return result.all()
+
+
+async def fetch_auth_user(conn: AsyncConnection, user_id: int) -> AuthUser | None:
+    """
+    IDによるユーザー取得
+
+    Args:
+        conn: fast_path_connection で取得した接続
+        user_id: ユーザーID
+
+    Returns:
+        ユーザー（存在しない場合はNone）
+    """
+    rows = await _fetch(conn, USER_BY_ID_SQL, user_id)
+    return AuthUser(*rows[0]) if rows else None
+
+
+async def fetch_user_permissions(conn: AsyncConnection, user_id: int) -> set[str]:
+    """
+    ユーザーの最終権限を取得
+
+    Args:
+        conn: fast_path_connection で取得した接続
+        user_id: ユーザーID
+
+    Returns:
+        権限コードのセット
+    """
+    rows = await _fetch(conn, USER_PERMISSIONS_SQL, user_id)
+    return {row[0] for row in rows}
@@ -4,13 +4,21 @@
 from typing import Callable
 from fastapi import Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import bindparam, select
 
 from app.database import get_db
 from app.auth.dependencies import get_current_active_user
 from app.models.user import User
 from app.models.service import Service, CompanyServiceSubscription
 
+# サービスの契約チェックはリクエストごとに実行するため一度だけ構築する
+SERVICE_BY_CODE_QUERY = select(Service).where(Service.service_code == bindparam("service_code"))
+ACTIVE_SUBSCRIPTION_QUERY = select(CompanyServiceSubscription).where(
+    CompanyServiceSubscription.company_id == bindparam("company_id"),
+    CompanyServiceSubscription.service_id == bindparam("service_id"),
+    CompanyServiceSubscription.status == "active",
+)
+
 
 async def check_service_subscription(
     user: User,
@@ -32,9 +40,7 @@ async def check_service_subscription(
         HTTPException: サービスが存在しない場合
     """
     # サービスを取得
-    result = await db.execute(
-        select(Service).where(Service.service_code == service_code)
-    )
+    result = await db.execute(SERVICE_BY_CODE_QUERY, {"service_code": service_code})
     service = result.scalar_one_or_none()
 
     if not service:
@@ -45,11 +51,8 @@ async def check_service_subscription(
 
     # 企業のサブスクリプションを確認
     result = await db.execute(
-        select(CompanyServiceSubscription).where(
-            CompanyServiceSubscription.company_id == user.company_id,
-            CompanyServiceSubscription.service_id == service.id,
-            CompanyServiceSubscription.status == "active",
-        )
+        ACTIVE_SUBSCRIPTION_QUERY,
+        {"company_id": user.company_id, "service_id": service.id},
     )
     subscription = result.scalar_one_or_none()
 
@@ -76,9 +79,7 @@ async def require_service_subscription(
 
     if not has_subscription:
         # サービス名を取得（エラーメッセージ用）
-        result = await db.execute(
-            select(Service).where(Service.service_code == service_code)
-        )
+        result = await db.execute(SERVICE_BY_CODE_QUERY, {"service_code": service_code})
         service = result.scalar_one_or_none()
         service_name = service.service_name if service else service_code
 
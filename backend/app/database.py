@@ -1,68 +1,705 @@
 """
 データベース接続とセッション管理
+
+参照系リクエスト（GET / HEAD）は READ ONLY トランザクションで処理し、コミットしない。
+更新系リクエストはハンドラー内では flush のみ行い、get_db が1回だけコミットする（1リクエスト1トランザクション）。
+
+読み取りレプリカ（DATABASE_URL_ASYNC_REPLICA）を設定した場合、参照系リクエストは
+レプリカのセッションを使用する。更新直後のリクエスト（read-your-writes トークンが有効な間）と
+レプリカの遅延が許容値を超えている間はプライマリを使用する。
+
+エンジンは初回使用時に生成する（API プロセスは非同期エンジンのみ、マイグレーション・スクリプトは
+同期エンジンのみを生成する）。接続はセッションの最初のクエリで取得し、DatabaseRoute を使うルートではハンドラーの終了直後
+（レスポンスのシリアライズ前）にコミット・解放してプールへ返す。
 """
-from sqlalchemy import create_engine
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base, sessionmaker
+import asyncio
+import functools
+import logging
+import time
+from contextvars import ContextVar
+from uuid import uuid4
+
+from fastapi import HTTPException, Request, status
+from fastapi.routing import APIRoute
+from sqlalchemy import Engine, create_engine, event, text
+from sqlalchemy import exc as sqlalchemy_exc
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 
 from app.config import get_settings
+from app.metrics import metrics
+from app.services.request_deadline import (
+    deadline_exceeded,
+    deadline_resolver,
+    is_deadline_error,
+    remaining_seconds,
+    reset_deadline,
+    start_deadline,
+    statement_timeout_ms,
+)
+from app.auth.jwt import decode_access_token
+from app.services.sql_commenter import render_comment, reset_sql_comment, set_sql_comment
+from app.services.sql_instrumentation import current_request_stats
+from app.services.tenant_shards import DEFAULT_SHARD, shard_map
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
-# 同期エンジン（Alembicマイグレーション用）
-sync_engine = create_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
-)
+# 接続の取得待ち・保持時間のバケット（秒）
+POOL_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
 
-# 非同期エンジン（FastAPI用）
-async_engine = create_async_engine(
-    settings.DATABASE_URL_ASYNC,
-    echo=settings.DEBUG,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
+pool_checkout_wait = metrics.histogram(
+    "db_pool_checkout_wait_seconds",
+    "コネクションプールからの接続取得の待ち時間（秒）",
+    buckets=POOL_TIME_BUCKETS,
+)
+connection_hold = metrics.histogram(
+    "db_connection_hold_seconds",
+    "接続を取得してからプールへ返すまでの時間（秒）",
+    buckets=POOL_TIME_BUCKETS,
 )
 
-# 同期セッションメーカー
+
+pool_checked_out = metrics.gauge("db_pool_checked_out", "使用中の接続数")
+pool_overflow = metrics.gauge("db_pool_overflow", "pool_size を超えて作成した接続数（負の値は未作成の枠）")
+pool_waiting = metrics.gauge("db_pool_waiting", "接続の取得を待っているタスク数")
+pool_checkout_timeouts = metrics.counter("db_pool_checkout_timeouts_total", "接続の取得がタイムアウトした回数")
+disconnects = metrics.counter("db_disconnects_total", "切断を検出して接続を破棄した回数")
+
+
+class _PoolInstrumentation:
+    """コネクションプールに接続の取得待ち時間・保持時間の計測を追加する Mixin"""
+
+    # メトリクスのラベル（primary / replica）
+    metrics_label = "default"
+    # 接続の取得を待っているタスク数（プールの接続を使い切って待つ場合のみ）
+    waiting = 0
+
+    def _update_gauges(self):
+        pass
+
+    def _exhausted(self) -> bool:
+        """空き接続も新規接続の余地もなく、取得が返却を待つ状態か"""
+        return False
+
+    def _do_get(self):
+        started = time.perf_counter()
+        blocking = self._exhausted()
+        if blocking:
+            self.waiting += 1
+            self._update_gauges()
+        try:
+            record = super()._do_get()
+        except sqlalchemy_exc.TimeoutError:
+            pool_checkout_timeouts.inc(pool=self.metrics_label)
+            raise
+        finally:
+            if blocking:
+                self.waiting -= 1
+                self._update_gauges()
+        now = time.perf_counter()
+        pool_checkout_wait.observe(now - started, pool=self.metrics_label)
+        record.info["checked_out_at"] = now
+        self._update_gauges()
+        return record
+
+    def _do_return_conn(self, record):
+        checked_out_at = record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            connection_hold.observe(time.perf_counter() - checked_out_at, pool=self.metrics_label)
+        super()._do_return_conn(record)
+        self._update_gauges()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics_label = self.metrics_label
+        return pool
+
+
+class InstrumentedAsyncQueuePool(_PoolInstrumentation, AsyncAdaptedQueuePool):
+    """接続の取得待ち時間・保持時間・待ちタスク数を計測するコネクションプール"""
+
+    def _update_gauges(self):
+        pool_checked_out.set(self.checkedout(), pool=self.metrics_label)
+        pool_overflow.set(self.overflow(), pool=self.metrics_label)
+        pool_waiting.set(self.waiting, pool=self.metrics_label)
+
+    def _exhausted(self) -> bool:
+        return self._pool.empty() and -1 < self._max_overflow <= self._overflow
+
+
+class InstrumentedNullPool(_PoolInstrumentation, NullPool):
+    """
+    接続を保持しないプール（PgBouncer のトランザクションモード用）
+
+    取得待ち時間は接続の確立にかかった時間となる。
+    """
+
+
+def _on_handle_error(context):
+    """切断エラーを記録（接続の破棄とプールの無効化は SQLAlchemy が行う）"""
+    if context.is_disconnect:
+        pool = context.engine.pool if context.engine is not None else None
+        label = getattr(pool, "metrics_label", "default")
+        disconnects.inc(pool=label)
+        logger.warning(f"データベースとの切断を検出しました（{label}）: {context.original_exception}")
+
+
+# エンジンの用途（セッションの info[ENGINE_ROLE_KEY] に設定）
+ENGINE_ROLE_KEY = "engine_role"
+ROLE_PRIMARY = "primary"
+ROLE_PRIMARY_READ_ONLY = "primary_read_only"
+ROLE_REPLICA = "replica"
+
+# 企業の配置先シャード（セッションの info[SHARD_KEY] に設定、未設定の場合は default）
+SHARD_KEY = "shard"
+
+# 生成済みのエンジン（(シャード, 用途) → エンジン）
+_async_engines: dict[tuple[str, str], AsyncEngine] = {}
+_sync_engine: Engine | None = None
+
+
+def _unique_statement_name() -> str:
+    """プリペアドステートメント名（PgBouncer 経由でサーバー接続を共有しても衝突しない名前）"""
+    return f"__asyncpg_{uuid4()}__"
+
+
+def async_engine_options(pgbouncer_mode: bool | None = None) -> dict:
+    """
+    非同期エンジンの生成オプション
+
+    PgBouncer のトランザクションモードでは、トランザクションごとにサーバー接続が変わるため
+    アプリ側では接続を保持せず（NullPool）、プリペアドステートメントには一意な名前を付ける。
+    PgBouncer がプリペアドステートメントを引き継がない場合（max_prepared_statements 未設定）は
+    ステートメントキャッシュも無効にする。
+
+    Args:
+        pgbouncer_mode: PgBouncer 経由で接続するか（省略時は DB_PGBOUNCER_MODE）
+
+    Returns:
+        create_async_engine のキーワード引数
+    """
+    if pgbouncer_mode is None:
+        pgbouncer_mode = settings.DB_PGBOUNCER_MODE
+    if not pgbouncer_mode:
+        return {
+            "echo": settings.DEBUG,
+            "poolclass": InstrumentedAsyncQueuePool,
+            "pool_pre_ping": settings.DB_POOL_PRE_PING,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+        }
+
+    connect_args = {"prepared_statement_name_func": _unique_statement_name}
+    if not settings.DB_PGBOUNCER_PREPARED_STATEMENTS:
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_cache_size"] = 0
+    return {
+        "echo": settings.DEBUG,
+        "poolclass": InstrumentedNullPool,
+        "connect_args": connect_args,
+    }
+
+
+def _create_async_engine(url: str, metrics_label: str) -> AsyncEngine:
+    """設定のプールパラメータで非同期エンジンを生成"""
+    engine = create_async_engine(url, **async_engine_options())
+    engine.pool.metrics_label = metrics_label
+    event.listen(engine.sync_engine, "handle_error", _on_handle_error)
+    return engine
+
+
+def get_async_engine(role: str = ROLE_PRIMARY, shard: str = DEFAULT_SHARD) -> AsyncEngine:
+    """
+    非同期エンジンを取得（初回使用時に生成）
+
+    Args:
+        role: primary / primary_read_only（READ ONLY トランザクション） / replica
+        shard: 企業の配置先シャード（読み取りレプリカは default のみ）
+
+    Returns:
+        非同期エンジン（primary_read_only はプライマリのプールを共有する）
+
+    Raises:
+        RuntimeError: 読み取りレプリカが設定されていないのに replica を指定した場合
+    """
+    key = (shard, role)
+    engine = _async_engines.get(key)
+    if engine is not None:
+        return engine
+    if role == ROLE_PRIMARY:
+        label = "primary" if shard == DEFAULT_SHARD else shard
+        engine = _create_async_engine(shard_map.url_for(shard), label)
+    elif role == ROLE_PRIMARY_READ_ONLY:
+        engine = get_async_engine(ROLE_PRIMARY, shard).execution_options(postgresql_readonly=True)
+    elif role == ROLE_REPLICA:
+        if not settings.DATABASE_URL_ASYNC_REPLICA or shard != DEFAULT_SHARD:
+            raise RuntimeError("読み取りレプリカが設定されていません")
+        engine = _create_async_engine(settings.DATABASE_URL_ASYNC_REPLICA, "replica").execution_options(
+            postgresql_readonly=True
+        )
+    else:
+        raise ValueError(f"不明なエンジンの用途です: {role}")
+    _async_engines[key] = engine
+    return engine
+
+
+def get_sync_engine() -> Engine:
+    """同期エンジンを取得（Alembicマイグレーション・スクリプト用、初回使用時に生成）"""
+    global _sync_engine
+    if _sync_engine is None:
+        _sync_engine = create_engine(
+            settings.DATABASE_URL,
+            echo=settings.DEBUG,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_size=settings.DB_SYNC_POOL_SIZE,
+            max_overflow=settings.DB_SYNC_MAX_OVERFLOW,
+        )
+    return _sync_engine
+
+
+async def dispose_engines():
+    """生成済みのエンジンの接続をすべて閉じる（アプリケーション終了時）"""
+    global _sync_engine
+    engines = _async_engines.copy()
+    _async_engines.clear()
+    for (shard, role), engine in engines.items():
+        # primary_read_only はプライマリのプールを共有するため個別には閉じない
+        if role != ROLE_PRIMARY_READ_ONLY:
+            await engine.dispose()
+    if _sync_engine is not None:
+        _sync_engine.dispose()
+        _sync_engine = None
+
+
+def pool_stats() -> list[dict]:
+    """
+    生成済みの非同期エンジンのコネクションプールの状態（このワーカーの値）
+
+    Returns:
+        プールごとの使用中・待機中の接続数、取得待ちの時間など
+    """
+    stats = []
+    for (shard, role), engine in _async_engines.items():
+        pool = engine.sync_engine.pool
+        # primary_read_only はプライマリのプールを共有、NullPool（PgBouncer モード）は接続を保持しない
+        if role == ROLE_PRIMARY_READ_ONLY or not isinstance(pool, InstrumentedAsyncQueuePool):
+            continue
+        label = getattr(pool, "metrics_label", role)
+        wait_count = pool_checkout_wait.count(pool=label)
+        wait_p95 = pool_checkout_wait.quantile(0.95, pool=label)
+        stats.append(
+            {
+                "pool": label,
+                "size": pool.size(),
+                "max_overflow": settings.DB_MAX_OVERFLOW,
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "waiting": getattr(pool, "waiting", 0),
+                "checkout_count": wait_count,
+                "checkout_wait_avg_ms": (
+                    pool_checkout_wait.sum(pool=label) / wait_count * 1000 if wait_count else None
+                ),
+                "checkout_wait_p95_ms": wait_p95 * 1000 if wait_p95 is not None else None,
+                "checkout_timeouts": int(pool_checkout_timeouts.value(pool=label)),
+                "disconnects": int(disconnects.value(pool=label)),
+            }
+        )
+    return stats
+
+
+class RoutingSession(Session):
+    """セッションの用途・企業の配置先シャードに応じたエンジンへバインドするセッション（エンジンは初回のクエリで生成）"""
+
+    def get_bind(self, mapper=None, **kw):
+        role = self.info.get(ENGINE_ROLE_KEY, ROLE_PRIMARY)
+        return get_async_engine(role, self.info.get(SHARD_KEY, DEFAULT_SHARD)).sync_engine
+
+
+def _async_session_factory(role: str) -> async_sessionmaker:
+    """用途ごとの非同期セッションメーカーを生成"""
+    return async_sessionmaker(
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+        info={ENGINE_ROLE_KEY: role},
+    )
+
+
+# 同期セッションメーカー（バインドは get_sync_db で行う）
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
-    bind=sync_engine,
 )
 
 # 非同期セッションメーカー
-AsyncSessionLocal = async_sessionmaker(
-    async_engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
-)
+AsyncSessionLocal = _async_session_factory(ROLE_PRIMARY)
+
+# 参照系リクエスト用の非同期セッションメーカー（READ ONLY トランザクション）
+ReadOnlySessionLocal = _async_session_factory(ROLE_PRIMARY_READ_ONLY)
+
+# 読み取りレプリカ用の非同期セッションメーカー（READ ONLY トランザクション、未設定の場合はNone）
+ReplicaSessionLocal = _async_session_factory(ROLE_REPLICA) if settings.DATABASE_URL_ASYNC_REPLICA else None
 
 # ベースクラス
 Base = declarative_base()
 
 
-async def get_db() -> AsyncSession:
-    """非同期データベースセッションを取得"""
-    async with AsyncSessionLocal() as session:
+# レプリカ経由で処理するHTTPメソッド
+READ_METHODS = {"GET", "HEAD"}
+
+# read-your-writes トークン（プライマリを使い続ける期限の UNIX 時刻）を受け渡すヘッダー
+READ_YOUR_WRITES_HEADER = "X-Primary-Until"
+
+
+class ReplicaState:
+    """読み取りレプリカの遅延（最後に計測した値）"""
+
+    def __init__(self):
+        self.lag_seconds: float | None = None
+        self.checked_at: float | None = None
+        self.error: str | None = None
+
+    @property
+    def available(self) -> bool:
+        """レプリカへ参照を振り分けてよいか（未計測・計測失敗・遅延超過の場合は False）"""
+        if ReplicaSessionLocal is None or self.lag_seconds is None:
+            return False
+        return self.lag_seconds <= settings.REPLICA_MAX_LAG_SECONDS
+
+    def as_dict(self) -> dict:
+        """ヘルスチェック用の表現"""
+        return {
+            "enabled": ReplicaSessionLocal is not None,
+            "available": self.available,
+            "lag_seconds": self.lag_seconds,
+            "error": self.error,
+        }
+
+
+replica_state = ReplicaState()
+
+replica_lag = metrics.gauge("db_replica_lag_seconds", "読み取りレプリカの遅延（秒）")
+commits_per_request = metrics.histogram(
+    "db_commits_per_request",
+    "1リクエストあたりのコミット回数",
+    buckets=(0, 1, 2, 3, 5),
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _count_commit(session: Session):
+    """セッションのコミット回数を記録（1リクエストあたりのコミット回数の計測用）"""
+    session.info["commit_count"] = session.info.get("commit_count", 0) + 1
+
+
+# statement_timeout を設定してからの経過時間の許容値（ミリ秒）
+# statement_timeout はSQLごとに計られるため、設定後に経過した分だけ後のSQLはデッドラインを超えて実行できる。
+# 経過がこの値を超えた場合は、次のSQLの前に残り時間で設定し直す。
+STATEMENT_TIMEOUT_SLACK_MS = 100
+
+# トランザクションの statement_timeout の設定状況（接続の info に保存）
+_STATEMENT_TIMEOUT_KEY = "statement_timeout"
+
+# ドライバーのパラメータ形式ごとのプレースホルダー（値ごとに別のプリペアドステートメントにしない）
+_PLACEHOLDERS = {"numeric_dollar": "$1", "qmark": "?", "format": "%s", "pyformat": "%s"}
+
+
+@event.listens_for(RoutingSession, "after_begin")
+def _track_statement_timeout(session: Session, transaction, connection):
+    """リクエストに制限時間がある場合、トランザクションの各SQLの前に statement_timeout を残り時間にする"""
+    if remaining_seconds() is not None:
+        connection.info[_STATEMENT_TIMEOUT_KEY] = (connection.get_transaction(), None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _apply_statement_timeout(conn, cursor, statement, parameters, context, executemany):
+    """
+    statement_timeout を残り時間に設定（トランザクションで最初のSQLと、設定から許容値以上経過した後のSQLの前）
+
+    同じカーソルでドライバーへ直接実行するため、SQLの集計・コメントの対象外。
+    """
+    state = conn.info.get(_STATEMENT_TIMEOUT_KEY)
+    if state is None:
+        return
+    transaction, applied_at = state
+    if transaction is not conn.get_transaction():
+        # 終了したトランザクションの設定（SET LOCAL と同じくトランザクションの終了で無効）
+        del conn.info[_STATEMENT_TIMEOUT_KEY]
+        return
+    now = time.monotonic()
+    if applied_at is not None and (now - applied_at) * 1000 < STATEMENT_TIMEOUT_SLACK_MS:
+        return
+    timeout_ms = statement_timeout_ms()
+    if timeout_ms is None:
+        return
+    placeholder = _PLACEHOLDERS[conn.dialect.paramstyle]
+    cursor.execute(f"SELECT set_config('statement_timeout', {placeholder}, true)", (str(timeout_ms),))
+    conn.info[_STATEMENT_TIMEOUT_KEY] = (transaction, now)
+
+
+def replica_lag_from_status(
+    in_recovery: bool, streaming: bool, caught_up: bool | None, replay_age: float | None
+) -> tuple[float | None, str | None]:
+    """
+    レプリカの状態から振り分けに使う遅延を判定
+
+    WAL レシーバーがプライマリから受信していない（切断・再接続中）場合は、受信位置と適用位置が一致していても
+    プライマリとの差が分からないため遅延中（None）とする。
+
+    Args:
+        in_recovery: リカバリ中（スタンバイ）か
+        streaming: WAL レシーバーがストリーミング中か
+        caught_up: 受信した WAL をすべて適用済みか
+        replay_age: 最後に適用したトランザクションからの経過秒数
+
+    Returns:
+        (遅延秒数, エラー)（振り分けられない場合の遅延秒数はNone）
+    """
+    if not in_recovery:
+        return None, "レプリカではありません"
+    if not streaming:
+        return None, "WALレシーバーがプライマリからストリーミングしていません"
+    if caught_up:
+        return 0.0, None
+    if replay_age is None:
+        return None, "適用済みのトランザクションがありません"
+    return float(replay_age), None
+
+
+async def check_replica_lag() -> float | None:
+    """
+    読み取りレプリカの遅延を計測して replica_state を更新
+
+    最後に適用したトランザクションの時刻から遅延を求める。プライマリで更新がない間も
+    遅延が増えて見えるため、WAL をストリーミング中で受信位置と適用位置が一致している場合は 0 とする。
+    WAL レシーバーが停止している場合は遅延中として扱う（replica_lag_from_status）。
+
+    Returns:
+        遅延秒数（レプリカ未設定・計測失敗・遅延中と判定した場合はNone）
+    """
+    if ReplicaSessionLocal is None:
+        return None
+    try:
+        async with ReplicaSessionLocal() as session:
+            result = await session.execute(
+                text(
+                    "SELECT pg_is_in_recovery(), "
+                    "EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming'), "
+                    "pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn(), "
+                    "EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())"
+                )
+            )
+            in_recovery, streaming, caught_up, replay_age = result.one()
+    except Exception as e:
+        logger.warning(f"読み取りレプリカの遅延計測に失敗: {e}")
+        replica_state.lag_seconds = None
+        replica_state.error = str(e)
+    else:
+        replica_state.lag_seconds, replica_state.error = replica_lag_from_status(
+            in_recovery, streaming, caught_up, replay_age
+        )
+        if replica_state.lag_seconds is not None:
+            replica_lag.set(replica_state.lag_seconds)
+        elif in_recovery and replay_age is not None:
+            # 遅延中と判定した場合も、最後に適用してからの経過時間をメトリクスに出す
+            replica_lag.set(float(replay_age))
+        if replica_state.error is not None and in_recovery:
+            logger.warning(f"読み取りレプリカをプライマリの代わりに使用できません: {replica_state.error}")
+    replica_state.checked_at = time.time()
+    return replica_state.lag_seconds
+
+
+def read_your_writes_token() -> str:
+    """更新後にプライマリを使い続ける期限のトークンを生成"""
+    return f"{time.time() + settings.READ_YOUR_WRITES_SECONDS:.3f}"
+
+
+def is_pinned_to_primary(request: Request) -> bool:
+    """
+    read-your-writes トークンが有効か（直前に更新したクライアントか）
+
+    期限が有効期間より先のトークンは改ざんとみなして無視する。
+    """
+    token = request.headers.get(READ_YOUR_WRITES_HEADER) or request.cookies.get(READ_YOUR_WRITES_HEADER)
+    if not token:
+        return False
+    try:
+        until = float(token)
+    except ValueError:
+        return False
+    now = time.time()
+    # トークンは小数点以下3桁に丸めるため1秒の余裕を持たせる
+    return now < until <= now + settings.READ_YOUR_WRITES_SECONDS + 1
+
+
+def request_shard(request: Request) -> str:
+    """
+    リクエストの企業の配置先シャード
+
+    アクセストークンの company_id から決定する（トークンがない・company_id を含まない場合は default）。
+    ユーザーの取得より前にセッションのシャードを決めるため、トークンはここでもデコードする。
+    シャード分割時に company_id を含まないトークンや、ユーザーの企業の配置先と異なるシャードは
+    get_current_user が 401 で拒否する。
+    """
+    if not shard_map.sharded:
+        return DEFAULT_SHARD
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return DEFAULT_SHARD
+    payload = decode_access_token(token)
+    return shard_map.shard_for(payload.get("company_id") if payload else None)
+
+
+def use_replica(request: Request) -> bool:
+    """リクエストを読み取りレプリカで処理するか"""
+    return (
+        request.method in READ_METHODS
+        and replica_state.available
+        and not is_pinned_to_primary(request)
+    )
+
+
+# 現在のリクエストのセッション（ハンドラー終了時に解放するため）
+_request_session: ContextVar[AsyncSession | None] = ContextVar("request_session", default=None)
+
+
+async def release_request_session():
+    """
+    現在のリクエストのセッションを確定して接続をプールへ返す
+
+    更新系リクエストはコミットし、参照系リクエストはトランザクションを終了する。
+    ロード済みの属性は解放後も参照できる（expire_on_commit=False）。
+    """
+    session = _request_session.get()
+    if session is None:
+        return
+    _request_session.set(None)
+    if not session.info.get("read_only"):
+        await session.commit()
+    await session.close()
+    session.info["released"] = True
+
+
+async def get_db(request: Request) -> AsyncSession:
+    """
+    非同期データベースセッションを取得
+
+    参照系リクエストは READ ONLY トランザクションのセッション（読み取りレプリカが利用可能な場合は
+    レプリカ）を返し、コミットせずに終了する。更新系リクエストはハンドラーの終了後に1回だけコミットする。
+    DatabaseRoute のルートでは、ハンドラーの終了時点で release_request_session により確定・解放済みとなる。
+    セッションはアクセストークンの企業の配置先シャードへ接続する（読み取りレプリカは default のみ）。
+    """
+    read_only = request.method in READ_METHODS
+    shard = request_shard(request)
+    if not read_only:
+        session_factory = AsyncSessionLocal
+    elif shard == DEFAULT_SHARD and use_replica(request):
+        session_factory = ReplicaSessionLocal
+    else:
+        session_factory = ReadOnlySessionLocal
+
+    async with session_factory(info={SHARD_KEY: shard}) as session:
+        session.info["read_only"] = read_only
+        token = _request_session.set(session)
         try:
             yield session
-            await session.commit()
+            if not read_only and not session.info.get("released"):
+                await session.commit()
         except Exception:
             await session.rollback()
             raise
         finally:
+            _request_session.reset(token)
+            commits_per_request.observe(
+                session.info.get("commit_count", 0),
+                kind="read" if read_only else "write",
+            )
             await session.close()
 
 
+REQUEST_ID_HEADER = "X-Request-ID"
+
+
+class DatabaseRoute(APIRoute):
+    """
+    ハンドラーの終了直後（response_model の検証・シリアライズ前）にDBセッションを解放するルート
+
+    ハンドラーが例外を送出した場合は解放せず、get_db の終了処理でロールバックする。
+    SQL_COMMENTER_ENABLED の場合、依存関係を含むリクエスト中のSQLにルートテンプレート・ハンドラー名を
+    コメントとして付加する。リクエストのSQL実行の集計にはルートを記録する。
+    ルートの制限時間（REQUEST_DEADLINE_SECONDS / REQUEST_DEADLINES）を超えた場合は 503 を返す。
+    """
+
+    def sql_comment(self, request_id: str | None = None) -> str:
+        """このルートのSQLに付加するコメント"""
+        return render_comment(
+            {"route": self.path_format, "controller": self.endpoint.__name__, "request_id": request_id}
+        )
+
+    def get_route_handler(self):
+        endpoint = self.dependant.call
+        if asyncio.iscoroutinefunction(endpoint) and not getattr(endpoint, "releases_session", False):
+
+            @functools.wraps(endpoint)
+            async def call_and_release(**kwargs):
+                result = await endpoint(**kwargs)
+                await release_request_session()
+                return result
+
+            call_and_release.releases_session = True
+            self.dependant.call = call_and_release
+        handler = super().get_route_handler()
+        route_label = f"{','.join(sorted(self.methods))} {self.path_format}"
+        route_comment = self.sql_comment() if settings.SQL_COMMENTER_ENABLED else None
+
+        async def tagged_handler(request: Request):
+            stats = current_request_stats()
+            if stats is not None:
+                stats.route = route_label
+            deadline_token = start_deadline(deadline_resolver.deadline_for(request.method, self.path_format))
+
+            request_id = None
+            comment_token = None
+            if route_comment is not None:
+                if settings.SQL_COMMENTER_REQUEST_ID:
+                    request_id = request.headers.get(REQUEST_ID_HEADER) or uuid4().hex
+                    comment_token = set_sql_comment(self.sql_comment(request_id))
+                else:
+                    comment_token = set_sql_comment(route_comment)
+            try:
+                response = await handler(request)
+            except Exception as e:
+                if remaining_seconds() is None or not is_deadline_error(e):
+                    raise
+                deadline_exceeded.inc(route=route_label)
+                logger.warning(f"リクエストの制限時間を超えました {route_label}: {e}")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="処理が制限時間内に完了しませんでした。しばらくしてから再度お試しください",
+                ) from e
+            finally:
+                reset_deadline(deadline_token)
+                if comment_token is not None:
+                    reset_sql_comment(comment_token)
+            if request_id is not None:
+                response.headers[REQUEST_ID_HEADER] = request_id
+            return response
+
+        return tagged_handler
+
+
 def get_sync_db():
     """同期データベースセッションを取得（マイグレーション用）"""
-    db = SessionLocal()
+    db = SessionLocal(bind=get_sync_engine())
     try:
         yield db
     finally:
@@ -4,8 +4,13 @@ FastAPI アプリケーション メインエントリーポイント
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.config import get_settings
-from app.scheduler import start_scheduler
+from app.database import READ_YOUR_WRITES_HEADER, check_replica_lag, dispose_engines, replica_state
+from app.metrics import metrics
+from app.middleware.query_stats import QUERY_COUNT_HEADER, QUERY_TIME_HEADER, QueryStatsMiddleware
+from app.scheduler import start_scheduler, flush_audit_rollups
+from app.services.audit_writer import audit_writer
 import logging
 
 settings = get_settings()
@@ -21,11 +26,18 @@ async def lifespan(app: FastAPI):
     # 起動時
     logger.info("アプリケーション起動: スケジューラーを開始します")
     scheduler = start_scheduler()
+    await audit_writer.start()
+    # 読み取りレプリカの遅延を計測してから参照系リクエストの振り分けを開始
+    await check_replica_lag()
     yield
     # 終了時
     logger.info("アプリケーション終了: スケジューラーを停止します")
     if scheduler:
         scheduler.shutdown()
+    # 未書き込みの操作履歴・リクエストメトリクス集計を書き込む
+    await audit_writer.stop()
+    await flush_audit_rollups()
+    await dispose_engines()
 
 
 # FastAPIアプリケーション
@@ -44,12 +56,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[READ_YOUR_WRITES_HEADER, QUERY_COUNT_HEADER, QUERY_TIME_HEADER],
 )
 
+# SQL実行計測ミドルウェア（操作履歴の書き込みを含めないよう操作履歴記録ミドルウェアの内側）
+app.add_middleware(QueryStatsMiddleware)
+
 # 操作履歴記録ミドルウェア
 from app.middleware import AuditLoggerMiddleware
 app.add_middleware(AuditLoggerMiddleware)
 
+# read-your-writes トークン付与ミドルウェア（読み取りレプリカ使用時）
+from app.middleware import ReadYourWritesMiddleware
+app.add_middleware(ReadYourWritesMiddleware)
+
 
 @app.get("/")
 async def root():
@@ -63,14 +83,22 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """ヘルスチェックエンドポイント"""
+    """ヘルスチェックエンドポイント（読み取りレプリカの遅延を含む）"""
+    await check_replica_lag()
     return {
         "status": "healthy",
         "app": settings.APP_NAME,
         "version": settings.APP_VERSION,
+        "replica": replica_state.as_dict(),
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """メトリクスエンドポイント（Prometheus テキスト形式）"""
+    return metrics.render()
+
+
 # ルーター追加
 from app.routers import (
     auth,
@@ -81,6 +109,8 @@ from app.routers import (
     customers,
     daily_reports,
     subscriptions,
+    audit_logs,
+    admin,
 )
 
 app.include_router(auth.router)
@@ -91,6 +121,8 @@ app.include_router(departments.router)
 app.include_router(customers.router)
 app.include_router(daily_reports.router)
 app.include_router(subscriptions.router)
+app.include_router(audit_logs.router)
+app.include_router(admin.router)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,175 @@
+"""
+アプリケーションメトリクス
+プロセス内でカウンター・ゲージ・ヒストグラムを保持し、Prometheus テキスト形式で出力する
+"""
+import threading
+from typing import Callable
+
+LabelValues = tuple[tuple[str, str], ...]
+
+
+def _label_key(labels: dict[str, str]) -> LabelValues:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels: LabelValues) -> str:
+    if not labels:
+        return ""
+    body = ",".join(f'{name}="{value}"' for name, value in labels)
+    return "{" + body + "}"
+
+
+class Counter:
+    """単調増加するカウンター"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self) -> list[tuple[LabelValues, float]]:
+        with self._lock:
+            return list(self._values.items())
+
+
+class Gauge:
+    """現在値を表すゲージ（function を指定した場合は出力時に値を算出）"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, description: str, function: Callable[[], float] | None = None):
+        self.name = name
+        self.description = description
+        self.function = function
+        self._values: dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels: str):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def value(self, **labels: str) -> float:
+        if self.function is not None and not labels:
+            return self.function()
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self) -> list[tuple[LabelValues, float]]:
+        if self.function is not None:
+            return [((), self.function())]
+        with self._lock:
+            return list(self._values.items())
+
+
+class Histogram:
+    """値の分布（累積バケット・合計・件数）"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: tuple[float, ...]):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        # ラベル → (バケットごとの件数, 合計, 件数)
+        self._values: dict[LabelValues, tuple[list[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = _label_key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def count(self, **labels: str) -> int:
+        values = self._values.get(_label_key(labels))
+        return values[2] if values else 0
+
+    def sum(self, **labels: str) -> float:
+        values = self._values.get(_label_key(labels))
+        return values[1] if values else 0.0
+
+    def quantile(self, q: float, **labels: str) -> float | None:
+        """分位数の推定値（該当するバケットの上限、観測なし・最大バケット超過の場合はNone）"""
+        values = self._values.get(_label_key(labels))
+        if not values or not values[2]:
+            return None
+        counts, _, count = values
+        for bound, bucket_count in zip(self.buckets, counts):
+            if bucket_count >= q * count:
+                return bound
+        return None
+
+    def series(self) -> list[tuple[str, LabelValues, float]]:
+        """(サフィックス, ラベル, 値) の一覧"""
+        with self._lock:
+            items = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._values.items()]
+        series = []
+        for labels, counts, total, count in items:
+            for bound, bucket_count in zip(self.buckets, counts):
+                series.append(("_bucket", labels + (("le", f"{bound:g}"),), bucket_count))
+            series.append(("_bucket", labels + (("le", "+Inf"),), count))
+            series.append(("_sum", labels, total))
+            series.append(("_count", labels, count))
+        return series
+
+
+class MetricsRegistry:
+    """メトリクスの登録と出力"""
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Gauge | Histogram] = {}
+
+    def _register(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric):
+                raise ValueError(f"メトリクス名が重複しています: {metric.name}")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, description: str) -> Counter:
+        """カウンターを登録（同名が登録済みの場合はそれを返す）"""
+        return self._register(Counter(name, description))
+
+    def gauge(self, name: str, description: str, function: Callable[[], float] | None = None) -> Gauge:
+        """ゲージを登録（同名が登録済みの場合はそれを返す）"""
+        return self._register(Gauge(name, description, function))
+
+    def histogram(self, name: str, description: str, buckets: tuple[float, ...]) -> Histogram:
+        """ヒストグラムを登録（同名が登録済みの場合はそれを返す）"""
+        return self._register(Histogram(name, description, buckets))
+
+    def get(self, name: str) -> Counter | Gauge | Histogram | None:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Prometheus テキスト形式で出力"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            if isinstance(metric, Histogram):
+                for suffix, labels, value in metric.series():
+                    lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {value:g}")
+                continue
+            for labels, value in metric.samples():
+                lines.append(f"{metric.name}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+# アプリケーション全体で共有するレジストリ
+metrics = MetricsRegistry()
@@ -3,5 +3,7 @@ Middleware Package
 """
 
 from app.middleware.audit_logger import AuditLoggerMiddleware
+from app.middleware.query_stats import QueryStatsMiddleware
+from app.middleware.read_your_writes import ReadYourWritesMiddleware
 
-__all__ = ["AuditLoggerMiddleware"]
+__all__ = ["AuditLoggerMiddleware", "QueryStatsMiddleware", "ReadYourWritesMiddleware"]
@@ -3,14 +3,15 @@ Audit Logging Middleware
 全てのAPIリクエストを操作履歴として記録するミドルウェア
 """
 import json
+import re
 import time
 from typing import Callable
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import AsyncSessionLocal
-from app.models.audit_log import AuditLog
+from app.services.audit_policy import audit_policy_resolver
+from app.services.audit_rollup import audit_rollup_aggregator
+from app.services.audit_writer import audit_writer
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,11 +20,16 @@ logger = logging.getLogger(__name__)
 EXCLUDED_PATHS = {
     "/",
     "/health",
+    "/metrics",
     "/docs",
     "/redoc",
     "/openapi.json",
 }
 
+# 集計・操作履歴にそのまま記録するHTTPメソッド（それ以外は OTHER_METHOD にまとめる）
+KNOWN_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "TRACE", "CONNECT"}
+OTHER_METHOD = "OTHER"
+
 # リクエストボディからマスクする機密情報のキー
 SENSITIVE_KEYS = {
     "password",
@@ -36,6 +42,19 @@ SENSITIVE_KEYS = {
 }
 
 
+def normalize_method(method: str) -> str:
+    """
+    記録するHTTPメソッド（audit_logs / audit_log_rollups の method 列は String(10)）
+
+    Args:
+        method: リクエストのHTTPメソッド
+
+    Returns:
+        既知のメソッドはそのまま、それ以外（WebDAV の拡張メソッドなど）は OTHER
+    """
+    return method if method in KNOWN_METHODS else OTHER_METHOD
+
+
 def mask_sensitive_data(data: dict) -> dict:
     """
     機密情報をマスクする
@@ -66,6 +85,118 @@ def mask_sensitive_data(data: dict) -> dict:
     return masked_data
 
 
+# バイト列スキャン用のトークン
+_SENSITIVE_TOKENS = tuple(sorted(key.encode("ascii") for key in SENSITIVE_KEYS))
+# 高速パス判定用（他のキーを部分文字列として含むキーは除外して最小化）
+_SENSITIVE_SCAN_TOKENS = tuple(
+    token
+    for token in _SENSITIVE_TOKENS
+    if not any(other != token and other in token for other in _SENSITIVE_TOKENS)
+)
+
+# 機密キーと値の開始位置にマッチする正規表現（小文字化したボディに対して使用）
+_SENSITIVE_KEY_PATTERN = re.compile(
+    rb'"(?:' + rb"|".join(re.escape(token) for token in _SENSITIVE_TOKENS) + rb')"\s*:\s*'
+)
+
+# スカラー値（文字列・数値・true/false/null）にマッチする正規表現
+_SCALAR_VALUE_PATTERN = re.compile(rb'"(?:[^"\\]|\\.)*"|[^,}\]\s]+')
+
+_MASKED_VALUE = b'"***MASKED***"'
+
+
+def _skip_container(body: bytes, start: int) -> int:
+    """
+    オブジェクト/配列の終端位置を返す（文字列リテラル内の括弧は無視）
+
+    Args:
+        body: JSONボディ
+        start: "{" または "[" の位置
+
+    Returns:
+        対応する閉じ括弧の次の位置（閉じていない場合は末尾）
+    """
+    depth = 0
+    in_string = False
+    index = start
+    length = len(body)
+    while index < length:
+        char = body[index]
+        if in_string:
+            if char == 0x5C:  # バックスラッシュ
+                index += 1
+            elif char == 0x22:  # '"'
+                in_string = False
+        elif char == 0x22:
+            in_string = True
+        elif char in (0x7B, 0x5B):  # "{", "["
+            depth += 1
+        elif char in (0x7D, 0x5D):  # "}", "]"
+            depth -= 1
+            if depth == 0:
+                return index + 1
+        index += 1
+    return length
+
+
+def mask_sensitive_body(body: bytes) -> bytes | None:
+    """
+    JSONボディの機密情報をバイト列のままマスクする
+
+    機密キーのトークンが含まれない場合は元のバイト列をそのまま返す（高速パス）。
+    含まれる場合は json.loads/json.dumps を経由せず、1回の走査で値を置換する。
+
+    Args:
+        body: リクエストボディ（バイト列）
+
+    Returns:
+        マスク済みのボディ（JSONでない場合はNone）
+    """
+    stripped = body.lstrip()
+    if not stripped or stripped[0] not in b"{[":
+        return None
+
+    # エスケープされたキー（"\u0070assword" など）はバイト列スキャンで検出できないため従来方式で処理
+    if b"\\u" in body:
+        try:
+            return json.dumps(mask_sensitive_data(json.loads(body)), ensure_ascii=False).encode("utf-8")
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return None
+
+    # bytes.lower() はASCIIのみ変換するため、オフセットは元のボディと一致する
+    lowered = body.lower()
+    for token in _SENSITIVE_SCAN_TOKENS:
+        if token in lowered:
+            break
+    else:
+        return body
+
+    chunks = []
+    position = 0
+    for match in _SENSITIVE_KEY_PATTERN.finditer(lowered):
+        value_start = match.end()
+        if value_start < position:
+            # マスク済みの値の内側にあるキーは読み飛ばす
+            continue
+        if value_start >= len(body):
+            break
+        if body[value_start] in b"{[":
+            value_end = _skip_container(body, value_start)
+        else:
+            value_match = _SCALAR_VALUE_PATTERN.match(body, value_start)
+            if value_match is None:
+                continue
+            value_end = value_match.end()
+        chunks.append(body[position:value_start])
+        chunks.append(_MASKED_VALUE)
+        position = value_end
+
+    if not chunks:
+        return body
+    chunks.append(body[position:])
+    return b"".join(chunks)
+
+
 class AuditLoggerMiddleware(BaseHTTPMiddleware):
     """操作履歴記録ミドルウェア"""
 
@@ -87,29 +218,23 @@ class AuditLoggerMiddleware(BaseHTTPMiddleware):
         # 開始時刻を記録
         start_time = time.time()
 
-        # ユーザー情報を取得（認証済みの場合）
-        user_id = None
-        company_id = None
-        if hasattr(request.state, "user"):
-            user_id = getattr(request.state.user, "id", None)
-            company_id = getattr(request.state.user, "company_id", None)
-
         # リクエストボディを取得（JSONの場合のみ）
         request_body = None
         if request.method in ["POST", "PUT", "PATCH"]:
             try:
                 body_bytes = await request.body()
                 if body_bytes:
-                    body_json = json.loads(body_bytes.decode("utf-8"))
-                    # 機密情報をマスク
-                    request_body = json.dumps(mask_sensitive_data(body_json))
+                    # 機密情報をマスク（機密キーを含まない場合は元のバイト列のまま）
+                    masked_body = mask_sensitive_body(body_bytes)
+                    if masked_body is not None:
+                        request_body = masked_body.decode("utf-8")
 
                 # リクエストボディを再度読めるようにする
                 async def receive():
                     return {"type": "http.request", "body": body_bytes}
 
                 request._receive = receive
-            except (json.JSONDecodeError, UnicodeDecodeError):
+            except UnicodeDecodeError:
                 # JSONでない場合は記録しない
                 pass
             except Exception as e:
@@ -133,13 +258,45 @@ class AuditLoggerMiddleware(BaseHTTPMiddleware):
         end_time = time.time()
         response_time_ms = int((end_time - start_time) * 1000)
 
+        # ユーザー情報を取得（認証済みの場合、認証依存性で request.state.user に設定される）
+        user_id = None
+        company_id = None
+        if hasattr(request.state, "user"):
+            user_id = getattr(request.state.user, "id", None)
+            company_id = getattr(request.state.user, "company_id", None)
+
+        # マッチしたルートのテンプレートを取得（例: /api/users/{user_id}）
+        route = request.scope.get("route")
+        route_template = getattr(route, "path_format", None)
+
+        method = normalize_method(request.method)
+
+        # 1分単位の集計に記録（DBへの書き込みはスケジューラーでまとめて行う）
+        audit_rollup_aggregator.record(
+            route=route_template,
+            method=method,
+            status_code=response.status_code,
+            company_id=company_id,
+            response_time_ms=response_time_ms,
+        )
+
+        # ルートごとの記録方針を適用（更新系・エラー応答は常に全項目を記録）
+        decision = audit_policy_resolver.decide(request.method, route_template, response.status_code)
+        if not decision.record:
+            return response
+        if not decision.include_details:
+            query_params = None
+            request_body = None
+            user_agent = None
+
         # 操作履歴を非同期で記録
         try:
             await self._log_audit(
                 user_id=user_id,
                 company_id=company_id,
-                method=request.method,
+                method=method,
                 path=request.url.path,
+                route=route_template,
                 query_params=query_params,
                 request_body=request_body,
                 status_code=response.status_code,
@@ -159,6 +316,7 @@ class AuditLoggerMiddleware(BaseHTTPMiddleware):
         company_id: int | None,
         method: str,
         path: str,
+        route: str | None,
         query_params: str | None,
         request_body: str | None,
         status_code: int,
@@ -167,28 +325,21 @@ class AuditLoggerMiddleware(BaseHTTPMiddleware):
         user_agent: str | None,
     ):
         """
-        操作履歴をデータベースに記録
+        操作履歴を書き込み器へ渡す（DBへの書き込みはバッチで行い、障害時はローカルに退避）
 
         Args:
             各種リクエスト情報
         """
-        async with AsyncSessionLocal() as db:
-            try:
-                audit_log = AuditLog(
-                    user_id=user_id,
-                    company_id=company_id,
-                    method=method,
-                    path=path,
-                    query_params=query_params,
-                    request_body=request_body,
-                    status_code=status_code,
-                    response_time_ms=response_time_ms,
-                    ip_address=ip_address,
-                    user_agent=user_agent,
-                )
-                db.add(audit_log)
-                await db.commit()
-            except Exception as e:
-                logger.error(f"操作履歴のDB保存に失敗: {e}")
-                await db.rollback()
-                raise
+        await audit_writer.submit({
+            "user_id": user_id,
+            "company_id": company_id,
+            "method": method,
+            "path": path,
+            "route": route,
+            "query_params": query_params,
+            "request_body": request_body,
+            "status_code": status_code,
+            "response_time_ms": response_time_ms,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+        })
@@ -0,0 +1,72 @@
+"""
+Query Stats Middleware
+リクエストごとのSQL実行回数・DB時間をレスポンスヘッダーとログに出力するミドルウェア
+"""
+import logging
+from typing import Callable
+from fastapi import Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.config import get_settings
+from app.metrics import metrics
+from app.services.sql_instrumentation import finish_request_stats, start_request_stats
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+QUERY_TIME_HEADER = "X-DB-Time-Ms"
+
+queries_per_request = metrics.histogram(
+    "db_queries_per_request",
+    "1リクエストあたりのSQL実行回数",
+    buckets=(1, 2, 5, 10, 20, 50, 100),
+)
+repeated_statement_requests = metrics.counter(
+    "db_repeated_statement_requests_total",
+    "同一形状のSQLを閾値回数以上実行したリクエスト数（N+1の可能性）",
+)
+
+
+class QueryStatsMiddleware(BaseHTTPMiddleware):
+    """SQL実行計測ミドルウェア"""
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        """
+        リクエストのSQL実行を集計し、ヘッダー（X-DB-Query-Count / X-DB-Time-Ms）とログに出力する
+
+        同一形状のSQLが SQL_REPEAT_THRESHOLD 回以上実行された場合は警告ログを出力する。
+
+        Args:
+            request: FastAPIリクエスト
+            call_next: 次のミドルウェアまたはエンドポイント
+
+        Returns:
+            レスポンス
+        """
+        stats, token = start_request_stats()
+        try:
+            response = await call_next(request)
+        finally:
+            finish_request_stats(token)
+
+        if not stats.count:
+            return response
+
+        route = getattr(request.scope.get("route"), "path_format", request.url.path)
+        response.headers[QUERY_COUNT_HEADER] = str(stats.count)
+        response.headers[QUERY_TIME_HEADER] = f"{stats.total_ms:.1f}"
+        queries_per_request.observe(stats.count)
+        logger.debug(f"{request.method} {route}: SQL {stats.count}回, {stats.total_ms:.1f}ms")
+
+        threshold = settings.SQL_REPEAT_THRESHOLD
+        if threshold:
+            repeated = stats.repeated(threshold)
+            if repeated:
+                repeated_statement_requests.inc(route=route)
+                for fingerprint, statement, count in repeated:
+                    logger.warning(
+                        f"同一形状のSQLを{count}回実行しました（N+1の可能性） {request.method} {route} "
+                        f"[{fingerprint}]: {statement[:200]}"
+                    )
+        return response
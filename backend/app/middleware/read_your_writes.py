@@ -0,0 +1,44 @@
+"""
+Read-Your-Writes Middleware
+更新系リクエストの成功後、一定時間プライマリを使い続けるためのトークンを返すミドルウェア
+"""
+from typing import Callable
+from fastapi import Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.config import get_settings
+from app.database import READ_METHODS, READ_YOUR_WRITES_HEADER, ReplicaSessionLocal, read_your_writes_token
+
+settings = get_settings()
+
+
+class ReadYourWritesMiddleware(BaseHTTPMiddleware):
+    """read-your-writes トークン付与ミドルウェア"""
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        """
+        更新系リクエストが成功した場合、レスポンスにトークン（ヘッダーとCookie）を付与する
+
+        クライアントはトークンをヘッダーで送り返す（ブラウザの場合はCookieでも可）。
+        トークンが有効な間の参照系リクエストはレプリカではなくプライマリで処理される。
+
+        Args:
+            request: FastAPIリクエスト
+            call_next: 次のミドルウェアまたはエンドポイント
+
+        Returns:
+            レスポンス
+        """
+        response = await call_next(request)
+
+        if ReplicaSessionLocal is not None and request.method not in READ_METHODS and response.status_code < 400:
+            token = read_your_writes_token()
+            response.headers[READ_YOUR_WRITES_HEADER] = token
+            response.set_cookie(
+                READ_YOUR_WRITES_HEADER,
+                token,
+                max_age=int(settings.READ_YOUR_WRITES_SECONDS) + 1,
+                httponly=True,
+                samesite="lax",
+            )
+        return response
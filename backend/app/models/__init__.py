@@ -19,7 +19,9 @@ from app.models.group_role import GroupRole
 from app.models.group_role_permission import GroupRolePermission
 from app.models.user_role_assignment import UserRoleAssignment
 from app.models.user_group_assignment import UserGroupAssignment
+from app.models.audit_dimension import AuditPath, AuditUserAgent
 from app.models.audit_log import AuditLog
+from app.models.audit_log_rollup import AuditLogRollup
 
 __all__ = [
     "Company",
@@ -42,5 +44,8 @@ __all__ = [
     "GroupRolePermission",
     "UserRoleAssignment",
     "UserGroupAssignment",
+    "AuditPath",
+    "AuditUserAgent",
     "AuditLog",
+    "AuditLogRollup",
 ]
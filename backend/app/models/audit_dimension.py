@@ -0,0 +1,34 @@
+"""
+Audit Log Dimension Models
+操作履歴で繰り返し出現する値（リクエストパス・User-Agent）を整数IDへ置き換えるための辞書テーブル
+"""
+from sqlalchemy import Column, Integer, String
+
+from app.database import Base
+
+# 辞書テーブルに格納する値の最大長（超える値は切り詰める）
+DIMENSION_VALUE_MAX_LENGTH = 500
+
+
+class AuditPath(Base):
+    """操作履歴のリクエストパス辞書"""
+
+    __tablename__ = "audit_paths"
+
+    id = Column(Integer, primary_key=True, comment="パスID")
+    value = Column(String(DIMENSION_VALUE_MAX_LENGTH), nullable=False, unique=True, comment="リクエストパス")
+
+    def __repr__(self):
+        return f"<AuditPath(id={self.id}, value='{self.value}')>"
+
+
+class AuditUserAgent(Base):
+    """操作履歴のUser-Agent辞書"""
+
+    __tablename__ = "audit_user_agents"
+
+    id = Column(Integer, primary_key=True, comment="User-Agent ID")
+    value = Column(String(DIMENSION_VALUE_MAX_LENGTH), nullable=False, unique=True, comment="User-Agent")
+
+    def __repr__(self):
+        return f"<AuditUserAgent(id={self.id}, value='{self.value}')>"
@@ -1,12 +1,44 @@
 """
 Audit Log Model
 APIエンドポイントへのリクエストを記録する操作履歴モデル
+
+リクエストパスと User-Agent は辞書テーブル（audit_paths / audit_user_agents）のIDで保持する。
+文字列で参照する場合は ORM の path / user_agent 属性、または audit_logs_view を使う。
 """
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, MetaData, Table, DDL, event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.associationproxy import association_proxy
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from app.database import Base
+from app.models.audit_dimension import AuditPath, AuditUserAgent
+
+
+class PreserializedJSONB(TypeDecorator):
+    """
+    JSONB型（シリアライズ済みのJSON文字列はそのまま渡す）
+
+    ミドルウェアが受け取ったリクエストボディを json.loads / json.dumps し直さずに保存するため、
+    文字列はJSONテキストとしてそのまま送り、それ以外の値のみシリアライズする。
+    """
+
+    impl = JSONB
+    cache_ok = True
+
+    def __init__(self):
+        super().__init__(none_as_null=True)
+
+    def bind_processor(self, dialect):
+        serialize = self.impl_instance.bind_processor(dialect)
+
+        def process(value):
+            if value is None or isinstance(value, str):
+                return value
+            return serialize(value) if serialize else value
+
+        return process
 
 
 class AuditLog(Base):
@@ -15,46 +47,119 @@ class AuditLog(Base):
     __tablename__ = "audit_logs"
 
     id = Column(Integer, primary_key=True, index=True, comment="操作履歴ID")
+    # 企業を別のシャードへ移動しても操作履歴は default に残すため、企業・ユーザーへの外部キーは持たない
     user_id = Column(
         Integer,
-        ForeignKey("users.id", ondelete="SET NULL"),
         nullable=True,
         index=True,
         comment="操作ユーザーID（未認証の場合はNULL）",
     )
     company_id = Column(
         Integer,
-        ForeignKey("companies.id", ondelete="SET NULL"),
         nullable=True,
         index=True,
         comment="企業ID（ユーザーに紐づく場合）",
     )
     method = Column(String(10), nullable=False, comment="HTTPメソッド")
-    path = Column(String(500), nullable=False, comment="リクエストパス")
-    query_params = Column(Text, nullable=True, comment="クエリパラメータ（JSON）")
-    request_body = Column(Text, nullable=True, comment="リクエストボディ（JSON、機密情報は除外）")
+    path_id = Column(Integer, ForeignKey("audit_paths.id"), nullable=False, comment="リクエストパスID")
+    route = Column(String(255), nullable=True, comment="ルートテンプレート（例: /api/users/{user_id}、未マッチの場合はNULL）")
+    query_params = Column(PreserializedJSONB(), nullable=True, comment="クエリパラメータ（JSONB）")
+    request_body = Column(PreserializedJSONB(), nullable=True, comment="リクエストボディ（JSONB、機密情報は除外）")
     status_code = Column(Integer, nullable=False, comment="レスポンスステータスコード")
     response_time_ms = Column(Integer, nullable=True, comment="レスポンス時間（ミリ秒）")
     ip_address = Column(String(45), nullable=True, comment="クライアントIPアドレス")
-    user_agent = Column(String(500), nullable=True, comment="User-Agent")
+    user_agent_id = Column(Integer, ForeignKey("audit_user_agents.id"), nullable=True, comment="User-Agent ID")
     created_at = Column(
         DateTime(timezone=True),
         server_default=func.now(),
         nullable=False,
-        index=True,
         comment="作成日時",
     )
 
     # リレーションシップ
-    user = relationship("User", foreign_keys=[user_id])
-    company = relationship("Company", foreign_keys=[company_id])
+    user = relationship("User", primaryjoin="foreign(AuditLog.user_id) == User.id", viewonly=True)
+    company = relationship("Company", primaryjoin="foreign(AuditLog.company_id) == Company.id", viewonly=True)
+    path_entry = relationship(AuditPath, lazy="joined", innerjoin=True)
+    user_agent_entry = relationship(AuditUserAgent, lazy="joined")
+
+    # 辞書テーブルの文字列（読み取り・検索条件用、書き込みは操作履歴の書き込み器で辞書IDへ変換する）
+    path = association_proxy("path_entry", "value")
+    user_agent = association_proxy("user_agent_entry", "value")
 
     # 90日以上経過したデータを効率的に削除するためのインデックス
+    # 追記のみで created_at と物理的な並びが一致するため BRIN（btree の数百分の一のサイズ）を使う
+    # ユーザー・企業別はキーセットページネーション（created_at, id の降順）用に id まで含める
     __table_args__ = (
-        Index("idx_audit_logs_created_at", "created_at"),
-        Index("idx_audit_logs_user_id_created_at", "user_id", "created_at"),
-        Index("idx_audit_logs_company_id_created_at", "company_id", "created_at"),
+        Index(
+            "idx_audit_logs_created_at_brin",
+            "created_at",
+            postgresql_using="brin",
+            postgresql_ops={"created_at": "timestamptz_minmax_multi_ops"},
+            postgresql_with={"pages_per_range": 32, "autosummarize": "on"},
+        ),
+        Index("idx_audit_logs_user_id_created_at", "user_id", "created_at", "id"),
+        Index("idx_audit_logs_company_id_created_at", "company_id", "created_at", "id"),
+        # 包含検索（@>）用、値がある行のみ（参照系の多くはボディを持たない）
+        Index(
+            "idx_audit_logs_request_body",
+            "request_body",
+            postgresql_using="gin",
+            postgresql_ops={"request_body": "jsonb_path_ops"},
+            postgresql_where=request_body.isnot(None),
+        ),
+        Index(
+            "idx_audit_logs_query_params",
+            "query_params",
+            postgresql_using="gin",
+            postgresql_ops={"query_params": "jsonb_path_ops"},
+            postgresql_where=query_params.isnot(None),
+        ),
     )
 
     def __repr__(self):
         return f"<AuditLog(id={self.id}, method='{self.method}', path='{self.path}', user_id={self.user_id})>"
+
+
+# 文字列のパス・User-Agent を含む参照用ビュー（アーカイブ・調査用）
+AUDIT_LOGS_VIEW_SQL = """
+CREATE VIEW audit_logs_view AS
+SELECT
+    l.id,
+    l.user_id,
+    l.company_id,
+    l.method,
+    p.value AS path,
+    l.route,
+    l.query_params,
+    l.request_body,
+    l.status_code,
+    l.response_time_ms,
+    l.ip_address,
+    ua.value AS user_agent,
+    l.created_at
+FROM audit_logs l
+JOIN audit_paths p ON p.id = l.path_id
+LEFT JOIN audit_user_agents ua ON ua.id = l.user_agent_id
+"""
+
+# create_all でテーブルとして作成されないよう別の MetaData に定義する
+audit_logs_view = Table(
+    "audit_logs_view",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer),
+    Column("company_id", Integer),
+    Column("method", String(10)),
+    Column("path", String(500)),
+    Column("route", String(255)),
+    Column("query_params", PreserializedJSONB()),
+    Column("request_body", PreserializedJSONB()),
+    Column("status_code", Integer),
+    Column("response_time_ms", Integer),
+    Column("ip_address", String(45)),
+    Column("user_agent", String(500)),
+    Column("created_at", DateTime(timezone=True)),
+)
+
+event.listen(Base.metadata, "after_create", DDL(AUDIT_LOGS_VIEW_SQL))
+event.listen(Base.metadata, "before_drop", DDL("DROP VIEW IF EXISTS audit_logs_view"))
@@ -0,0 +1,85 @@
+"""
+Audit Log Rollup Model
+操作履歴を1分単位・1時間単位で集計したリクエストメトリクスモデル
+"""
+from sqlalchemy import Column, Integer, BigInteger, SmallInteger, String, DateTime, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+
+from app.database import Base
+
+
+# レイテンシヒストグラムのバケット上限（ミリ秒）と対応するカラム名
+# 最後のバケット（上限None）はそれ以上の全てを含む
+LATENCY_BUCKETS = (
+    (10, "bucket_le_10ms"),
+    (25, "bucket_le_25ms"),
+    (50, "bucket_le_50ms"),
+    (100, "bucket_le_100ms"),
+    (250, "bucket_le_250ms"),
+    (500, "bucket_le_500ms"),
+    (1000, "bucket_le_1000ms"),
+    (2500, "bucket_le_2500ms"),
+    (5000, "bucket_le_5000ms"),
+    (None, "bucket_le_inf"),
+)
+
+
+# 集計粒度（分）: 短期間は1分単位、長期間の分析は1時間単位の行を使う
+BUCKET_MINUTE = 1
+BUCKET_HOUR = 60
+
+
+class AuditLogRollup(Base):
+    """操作履歴集計モデル - (区間, ルート, メソッド, ステータス区分, 企業) ごとのリクエスト統計"""
+
+    __tablename__ = "audit_log_rollups"
+
+    id = Column(BigInteger, primary_key=True, comment="集計ID")
+    bucket_start = Column(DateTime(timezone=True), nullable=False, comment="集計区間の開始時刻")
+    bucket_minutes = Column(SmallInteger, nullable=False, default=BUCKET_MINUTE, comment="集計区間の長さ（分、1 または 60）")
+    route = Column(String(255), nullable=False, comment="ルートテンプレート（例: /api/users/{user_id}）")
+    method = Column(String(10), nullable=False, comment="HTTPメソッド")
+    status_class = Column(SmallInteger, nullable=False, comment="ステータス区分（2=2xx, 4=4xx, 5=5xx など）")
+    # 操作履歴と同じく default に残すため、企業への外部キーは持たない
+    company_id = Column(
+        Integer,
+        nullable=True,
+        comment="企業ID（未認証の場合はNULL）",
+    )
+    request_count = Column(Integer, nullable=False, default=0, comment="リクエスト数")
+    error_count = Column(Integer, nullable=False, default=0, comment="エラー数（5xx）")
+    latency_sum_ms = Column(BigInteger, nullable=False, default=0, comment="レスポンス時間の合計（ミリ秒）")
+    latency_min_ms = Column(Integer, nullable=True, comment="レスポンス時間の最小値（ミリ秒）")
+    latency_max_ms = Column(Integer, nullable=True, comment="レスポンス時間の最大値（ミリ秒）")
+    bucket_le_10ms = Column(Integer, nullable=False, default=0, comment="10ms以下の件数")
+    bucket_le_25ms = Column(Integer, nullable=False, default=0, comment="25ms以下の件数")
+    bucket_le_50ms = Column(Integer, nullable=False, default=0, comment="50ms以下の件数")
+    bucket_le_100ms = Column(Integer, nullable=False, default=0, comment="100ms以下の件数")
+    bucket_le_250ms = Column(Integer, nullable=False, default=0, comment="250ms以下の件数")
+    bucket_le_500ms = Column(Integer, nullable=False, default=0, comment="500ms以下の件数")
+    bucket_le_1000ms = Column(Integer, nullable=False, default=0, comment="1000ms以下の件数")
+    bucket_le_2500ms = Column(Integer, nullable=False, default=0, comment="2500ms以下の件数")
+    bucket_le_5000ms = Column(Integer, nullable=False, default=0, comment="5000ms以下の件数")
+    bucket_le_inf = Column(Integer, nullable=False, default=0, comment="5000ms超の件数")
+
+    # リレーションシップ
+    company = relationship("Company", primaryjoin="foreign(AuditLogRollup.company_id) == Company.id", viewonly=True)
+
+    __table_args__ = (
+        # 未認証リクエスト（company_id=NULL）も同一キーとして集約するため NULLS NOT DISTINCT
+        UniqueConstraint(
+            "bucket_minutes",
+            "bucket_start",
+            "route",
+            "method",
+            "status_class",
+            "company_id",
+            name="uq_audit_log_rollups_key",
+            postgresql_nulls_not_distinct=True,
+        ),
+        Index("idx_audit_log_rollups_company_id_bucket_start", "bucket_minutes", "company_id", "bucket_start"),
+        Index("idx_audit_log_rollups_route_bucket_start", "bucket_minutes", "route", "bucket_start"),
+    )
+
+    def __repr__(self):
+        return f"<AuditLogRollup(bucket_start={self.bucket_start}, route='{self.route}', method='{self.method}', request_count={self.request_count})>"
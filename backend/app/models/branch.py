@@ -34,11 +34,17 @@ class Branch(Base):
 
     # リレーションシップ
     company = relationship("Company", back_populates="branches")
-    departments = relationship("Department", back_populates="branch", cascade="all, delete-orphan")
+    departments = relationship(
+        "Department",
+        back_populates="branch",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
     user_assignments = relationship(
         "UserBranchAssignment",
         back_populates="branch",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     def __repr__(self):
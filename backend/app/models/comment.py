@@ -1,7 +1,7 @@
 """
 Comment Model
 """
-from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -12,8 +12,17 @@ class Comment(Base):
     """コメントモデル"""
 
     __tablename__ = "comments"
+    __table_args__ = (
+        Index("idx_comments_company_id_daily_report_id", "company_id", "daily_report_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, comment="コメントID")
+    company_id = Column(
+        Integer,
+        ForeignKey("companies.id", ondelete="CASCADE"),
+        nullable=False,
+        comment="企業ID",
+    )
     daily_report_id = Column(
         Integer,
         ForeignKey("daily_reports.id", ondelete="CASCADE"),
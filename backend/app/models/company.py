@@ -26,25 +26,48 @@ class Company(Base):
     )
 
     # リレーションシップ
-    branches = relationship("Branch", back_populates="company", cascade="all, delete-orphan")
-    users = relationship("User", back_populates="company", cascade="all, delete-orphan")
-    customers = relationship("Customer", back_populates="company", cascade="all, delete-orphan")
-    daily_reports = relationship("DailyReport", back_populates="company", cascade="all, delete-orphan")
+    branches = relationship(
+        "Branch",
+        back_populates="company",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    users = relationship(
+        "User",
+        back_populates="company",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    customers = relationship(
+        "Customer",
+        back_populates="company",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    daily_reports = relationship(
+        "DailyReport",
+        back_populates="company",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
     service_subscriptions = relationship(
         "CompanyServiceSubscription",
         back_populates="company",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     subscription_history = relationship(
         "ServiceSubscriptionHistory",
         back_populates="company",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     # 権限管理システム
     group_roles = relationship(
         "GroupRole",
         back_populates="company",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     def __repr__(self):
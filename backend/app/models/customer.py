@@ -45,7 +45,12 @@ class Customer(Base):
     # リレーションシップ
     company = relationship("Company", back_populates="customers")
     assigned_user = relationship("User", back_populates="customers")
-    visit_records = relationship("VisitRecord", back_populates="customer", cascade="all, delete-orphan")
+    visit_records = relationship(
+        "VisitRecord",
+        back_populates="customer",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
 
     def __repr__(self):
         return f"<Customer(id={self.id}, name='{self.name}', company_name='{self.company_name}')>"
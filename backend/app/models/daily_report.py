@@ -40,10 +40,30 @@ class DailyReport(Base):
     # リレーションシップ
     company = relationship("Company", back_populates="daily_reports")
     user = relationship("User", back_populates="daily_reports")
-    visit_records = relationship("VisitRecord", back_populates="daily_report", cascade="all, delete-orphan")
-    problems = relationship("Problem", back_populates="daily_report", cascade="all, delete-orphan")
-    plans = relationship("Plan", back_populates="daily_report", cascade="all, delete-orphan")
-    comments = relationship("Comment", back_populates="daily_report", cascade="all, delete-orphan")
+    visit_records = relationship(
+        "VisitRecord",
+        back_populates="daily_report",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    problems = relationship(
+        "Problem",
+        back_populates="daily_report",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    plans = relationship(
+        "Plan",
+        back_populates="daily_report",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    comments = relationship(
+        "Comment",
+        back_populates="daily_report",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
 
     def __repr__(self):
         return f"<DailyReport(id={self.id}, user_id={self.user_id}, report_date={self.report_date})>"
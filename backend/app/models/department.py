@@ -1,7 +1,7 @@
 """
 Department Model
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -12,8 +12,17 @@ class Department(Base):
     """部署モデル"""
 
     __tablename__ = "departments"
+    __table_args__ = (
+        Index("idx_departments_company_id_branch_id", "company_id", "branch_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, comment="部署ID")
+    company_id = Column(
+        Integer,
+        ForeignKey("companies.id", ondelete="CASCADE"),
+        nullable=False,
+        comment="企業ID",
+    )
     branch_id = Column(
         Integer,
         ForeignKey("branches.id", ondelete="CASCADE"),
@@ -37,6 +46,7 @@ class Department(Base):
         "UserDepartmentAssignment",
         back_populates="department",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     def __repr__(self):
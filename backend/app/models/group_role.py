@@ -41,9 +41,11 @@ class GroupRole(Base):
         "GroupRolePermission",
         back_populates="group_role",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     user_group_assignments = relationship(
         "UserGroupAssignment",
         back_populates="group_role",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
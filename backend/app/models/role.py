@@ -33,9 +33,11 @@ class Role(Base):
         "UserRoleAssignment",
         back_populates="role",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     group_role_permissions = relationship(
         "GroupRolePermission",
         back_populates="role",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
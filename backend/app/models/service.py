@@ -1,7 +1,7 @@
 """
 Service Models
 """
-from sqlalchemy import Column, Integer, String, Text, Boolean, Date, DateTime, Numeric, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Boolean, Date, DateTime, Numeric, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -32,6 +32,7 @@ class Service(Base):
         "CompanyServiceSubscription",
         back_populates="service",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     def __repr__(self):
@@ -82,6 +83,7 @@ class CompanyServiceSubscription(Base):
         "ServiceSubscriptionHistory",
         back_populates="subscription",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     def __repr__(self):
@@ -131,5 +133,10 @@ class ServiceSubscriptionHistory(Base):
     subscription = relationship("CompanyServiceSubscription", back_populates="history")
     changed_by_user = relationship("User", back_populates="subscription_changes")
 
+    # 追記のみで changed_at と物理的な並びが一致するため BRIN を使う
+    __table_args__ = (
+        Index("idx_service_subscription_history_changed_at_brin", "changed_at", postgresql_using="brin"),
+    )
+
     def __repr__(self):
         return f"<ServiceSubscriptionHistory(id={self.id}, subscription_id={self.subscription_id}, change_type='{self.change_type}')>"
@@ -36,22 +36,36 @@ class User(Base):
 
     # リレーションシップ
     company = relationship("Company", back_populates="users")
-    daily_reports = relationship("DailyReport", back_populates="user", cascade="all, delete-orphan")
-    comments = relationship("Comment", back_populates="commenter", cascade="all, delete-orphan")
-    customers = relationship("Customer", back_populates="assigned_user")
+    daily_reports = relationship(
+        "DailyReport",
+        back_populates="user",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    comments = relationship(
+        "Comment",
+        back_populates="commenter",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    # 担当者・変更者は ON DELETE SET NULL（ユーザー削除時に子を読み込まずDB側でNULLにする）
+    customers = relationship("Customer", back_populates="assigned_user", passive_deletes=True)
     branch_assignments = relationship(
         "UserBranchAssignment",
         back_populates="user",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     department_assignments = relationship(
         "UserDepartmentAssignment",
         back_populates="user",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     subscription_changes = relationship(
         "ServiceSubscriptionHistory",
         back_populates="changed_by_user",
+        passive_deletes=True,
     )
     # 権限管理システム
     user_role_assignments = relationship(
@@ -59,12 +73,14 @@ class User(Base):
         foreign_keys="UserRoleAssignment.user_id",
         back_populates="user",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     user_group_assignments = relationship(
         "UserGroupAssignment",
         foreign_keys="UserGroupAssignment.user_id",
         back_populates="user",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     def __repr__(self):
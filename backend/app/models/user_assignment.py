@@ -1,7 +1,7 @@
 """
 User Assignment Models
 """
-from sqlalchemy import Column, Integer, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -12,8 +12,17 @@ class UserBranchAssignment(Base):
     """ユーザー支店所属モデル"""
 
     __tablename__ = "user_branch_assignments"
+    __table_args__ = (
+        Index("idx_user_branch_assignments_company_id_branch_id", "company_id", "branch_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, comment="所属ID")
+    company_id = Column(
+        Integer,
+        ForeignKey("companies.id", ondelete="CASCADE"),
+        nullable=False,
+        comment="企業ID",
+    )
     user_id = Column(
         Integer,
         ForeignKey("users.id", ondelete="CASCADE"),
@@ -49,8 +58,17 @@ class UserDepartmentAssignment(Base):
     """ユーザー部署所属モデル"""
 
     __tablename__ = "user_department_assignments"
+    __table_args__ = (
+        Index("idx_user_department_assignments_company_id_department_id", "company_id", "department_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, comment="所属ID")
+    company_id = Column(
+        Integer,
+        ForeignKey("companies.id", ondelete="CASCADE"),
+        nullable=False,
+        comment="企業ID",
+    )
     user_id = Column(
         Integer,
         ForeignKey("users.id", ondelete="CASCADE"),
@@ -1,7 +1,7 @@
 """
 UserRoleAssignment Model
 """
-from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -13,11 +13,18 @@ class UserRoleAssignment(Base):
 
     __tablename__ = "user_role_assignments"
     __table_args__ = (
+        Index("idx_user_role_assignments_company_id_user_id", "company_id", "user_id"),
         UniqueConstraint("user_id", "role_id", name="uq_user_role_assignments"),
         {"comment": "ユーザーへの個別権限割り当て（ユーザー⇔権限）"},
     )
 
     id = Column(Integer, primary_key=True, index=True, comment="ID")
+    company_id = Column(
+        Integer,
+        ForeignKey("companies.id", ondelete="CASCADE"),
+        nullable=False,
+        comment="企業ID",
+    )
     user_id = Column(
         Integer,
         ForeignKey("users.id", ondelete="CASCADE"),
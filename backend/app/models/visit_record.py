@@ -1,7 +1,7 @@
 """
 VisitRecord Model
 """
-from sqlalchemy import Column, Integer, Boolean, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Boolean, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -12,8 +12,17 @@ class VisitRecord(Base):
     """訪問記録モデル"""
 
     __tablename__ = "visit_records"
+    __table_args__ = (
+        Index("idx_visit_records_company_id_visit_datetime", "company_id", "visit_datetime"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, comment="訪問記録ID")
+    company_id = Column(
+        Integer,
+        ForeignKey("companies.id", ondelete="CASCADE"),
+        nullable=False,
+        comment="企業ID",
+    )
     daily_report_id = Column(
         Integer,
         ForeignKey("daily_reports.id", ondelete="CASCADE"),
@@ -0,0 +1,72 @@
+"""
+Admin API Router
+運用管理API（データベース接続の状態・遅いSQLの実行計画など）
+"""
+import os
+from dataclasses import asdict
+from fastapi import APIRouter, Depends, Query, status
+
+from app.config import get_settings
+from app.database import DatabaseRoute, pool_stats
+from app.models.user import User
+from app.schemas.admin import SlowQueryPlansResponse, WorkerPoolStatsResponse
+from app.services.slow_query_explain import captured_plans, clear_captured_plans
+from app.auth.permissions import require_permission
+
+settings = get_settings()
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], route_class=DatabaseRoute)
+
+
+@router.get("/db-pool", response_model=WorkerPoolStatsResponse)
+async def get_db_pool_stats(
+    current_user: User = Depends(require_permission("admin.access")),
+):
+    """
+    コネクションプールの状態取得
+
+    必要な権限: admin.access
+
+    値はリクエストを処理したワーカーのもの（全ワーカーの値は /metrics から取得）
+    """
+    return {
+        "pid": os.getpid(),
+        "pgbouncer_mode": settings.DB_PGBOUNCER_MODE,
+        "pre_ping": settings.DB_POOL_PRE_PING,
+        "recycle_seconds": settings.DB_POOL_RECYCLE,
+        "timeout_seconds": settings.DB_POOL_TIMEOUT,
+        "pools": pool_stats(),
+    }
+
+
+@router.get("/slow-queries", response_model=SlowQueryPlansResponse)
+async def get_slow_query_plans(
+    limit: int = Query(50, ge=1, le=500, description="取得件数"),
+    route: str | None = Query(None, description="ルートで絞り込み（例: GET /api/daily-reports）"),
+    current_user: User = Depends(require_permission("admin.access")),
+):
+    """
+    実行時間が閾値（SQL_EXPLAIN_THRESHOLD_MS）を超えたSQLの実行計画取得
+
+    必要な権限: admin.access
+
+    値はリクエストを処理したワーカーのもの（ワーカーごとに保持）
+    """
+    plans = [plan for plan in captured_plans() if route is None or plan.route == route]
+    return {
+        "pid": os.getpid(),
+        "threshold_ms": settings.SQL_EXPLAIN_THRESHOLD_MS,
+        "plans": [asdict(plan) for plan in plans[:limit]],
+    }
+
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_slow_query_plans(
+    current_user: User = Depends(require_permission("admin.access")),
+):
+    """
+    保持している実行計画の破棄（リクエストを処理したワーカーのみ）
+
+    必要な権限: admin.access
+    """
+    clear_captured_plans()
@@ -0,0 +1,175 @@
+"""
+Audit Log API Router
+操作履歴の検索・集計・分析API
+"""
+import json
+from datetime import datetime, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import DatabaseRoute, get_db
+from app.models.user import User
+from app.schemas.audit_log import (
+    AuditLogPageResponse,
+    RouteStatsResponse,
+    CompanyStatsResponse,
+    TimeBucketStatsResponse,
+)
+from app.auth.permissions import require_permission, require_permissions
+from app.services import audit_analytics, audit_search
+
+router = APIRouter(prefix="/api/audit-logs", tags=["audit-logs"], route_class=DatabaseRoute)
+
+# 集計範囲の上限
+MAX_ANALYTICS_RANGE = timedelta(days=400)
+# 1分単位の時系列で指定できる範囲の上限
+MAX_MINUTE_SERIES_RANGE = timedelta(hours=24)
+
+
+def _parse_containment(name: str, value: Optional[str]) -> Optional[dict]:
+    """包含検索の条件（JSONオブジェクト）を解釈"""
+    if value is None:
+        return None
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        parsed = None
+    if not isinstance(parsed, dict):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{name} にはJSONオブジェクトを指定してください",
+        )
+    return parsed
+
+
+def _resolve_range(start: Optional[datetime], end: Optional[datetime]) -> tuple[datetime, datetime]:
+    """集計範囲を正規化して検証"""
+    start, end = audit_analytics.normalize_range(start, end)
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="開始日時は終了日時より前を指定してください",
+        )
+    if end - start > MAX_ANALYTICS_RANGE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"集計範囲は{MAX_ANALYTICS_RANGE.days}日以内で指定してください",
+        )
+    return start, end
+
+
+@router.get("", response_model=AuditLogPageResponse)
+async def search_audit_logs(
+    user_id: Optional[int] = None,
+    route: Optional[str] = None,
+    method: Optional[str] = None,
+    status_code: Optional[int] = Query(None, ge=100, le=599),
+    status_class: Optional[int] = Query(None, ge=1, le=5),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    request_body_contains: Optional[str] = None,
+    query_params_contains: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(require_permission("audit.view")),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    操作履歴検索（自社のみ、新しい順）
+
+    必要な権限: audit.view
+
+    Parameters:
+    - user_id / route / method / status_code / status_class: 絞り込み条件（オプション）
+    - start / end: 記録日時の範囲（start 以上 end 未満）
+    - request_body_contains / query_params_contains: 含まれるJSONオブジェクト（例: {"customer_id": 42}）
+    - cursor: 前ページのレスポンスの next_cursor（省略時は先頭ページ）
+    - limit: 取得件数（最大200）
+    """
+    request_body_filter = _parse_containment("request_body_contains", request_body_contains)
+    query_params_filter = _parse_containment("query_params_contains", query_params_contains)
+    try:
+        items, next_cursor = await audit_search.search_audit_logs(
+            db,
+            current_user.company_id,
+            user_id=user_id,
+            route=route,
+            method=method,
+            status_code=status_code,
+            status_class=status_class,
+            start=start,
+            end=end,
+            request_body_contains=request_body_filter,
+            query_params_contains=query_params_filter,
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/analytics/routes", response_model=List[RouteStatsResponse])
+async def get_route_analytics(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    method: Optional[str] = None,
+    current_user: User = Depends(require_permission("audit.view")),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    ルート別レイテンシ・スループット・エラー率取得
+
+    必要な権限: audit.view
+
+    Parameters:
+    - start / end: 集計範囲（省略時は直近24時間、6時間を超える範囲は1時間単位の集計を使用）
+    - method: HTTPメソッドで絞り込み（オプション）
+    """
+    start, end = _resolve_range(start, end)
+    return await audit_analytics.get_route_stats(db, current_user.company_id, start, end, method)
+
+
+@router.get("/analytics/timeseries", response_model=List[TimeBucketStatsResponse])
+async def get_timeseries_analytics(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    interval: str = Query("hour", pattern="^(minute|hour|day)$"),
+    route: Optional[str] = None,
+    current_user: User = Depends(require_permission("audit.view")),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    時間区間別レイテンシ・スループット・エラー率取得
+
+    必要な権限: audit.view
+
+    Parameters:
+    - start / end: 集計範囲（省略時は直近24時間）
+    - interval: 区間（minute / hour / day、minute は24時間以内の範囲のみ）
+    - route: ルートテンプレートで絞り込み（例: /api/users/{user_id}）
+    """
+    start, end = _resolve_range(start, end)
+    if interval == "minute" and end - start > MAX_MINUTE_SERIES_RANGE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="1分単位の時系列は24時間以内の範囲で指定してください",
+        )
+    return await audit_analytics.get_timeseries(db, current_user.company_id, start, end, interval, route)
+
+
+@router.get("/analytics/companies", response_model=List[CompanyStatsResponse])
+async def get_company_analytics(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: User = Depends(require_permissions(["audit.view", "admin.access"])),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    企業（テナント）別レイテンシ・スループット・エラー率取得
+
+    必要な権限: audit.view AND admin.access（全企業を横断するためシステム管理者のみ）
+    """
+    start, end = _resolve_range(start, end)
+    return await audit_analytics.get_company_stats(db, start, end)
@@ -6,15 +6,46 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.database import get_db
+from app.database import SHARD_KEY, DatabaseRoute, ReadOnlySessionLocal, get_db
 from app.models.user import User
 from app.schemas.auth import Token, LoginRequest
 from app.schemas.user import UserResponse
 from app.auth.password import verify_password
 from app.auth.jwt import create_access_token
 from app.auth.dependencies import get_current_active_user
+from app.services.tenant_shards import DEFAULT_SHARD, shard_map
 
-router = APIRouter(prefix="/api/auth", tags=["認証"])
+router = APIRouter(prefix="/api/auth", tags=["認証"], route_class=DatabaseRoute)
+
+
+async def find_user_by_email(db: AsyncSession, email: str) -> User | None:
+    """
+    メールアドレスでユーザーを検索
+
+    企業を別のシャードへ移動した場合は配置先のシャードのユーザーを返す
+    （移動元に残った古い行は使わない）。
+
+    Args:
+        db: データベースセッション（default シャード）
+        email: メールアドレス
+
+    Returns:
+        ユーザー（存在しない場合はNone）
+    """
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalar_one_or_none()
+    if user is not None and shard_map.shard_for(user.company_id) == DEFAULT_SHARD:
+        return user
+
+    for shard in shard_map.shards:
+        if shard == DEFAULT_SHARD:
+            continue
+        async with ReadOnlySessionLocal(info={SHARD_KEY: shard}) as session:
+            result = await session.execute(select(User).where(User.email == email))
+            user = result.scalar_one_or_none()
+        if user is not None and shard_map.shard_for(user.company_id) == shard:
+            return user
+    return None
 
 
 @router.post("/login")
@@ -36,10 +67,7 @@ async def login(
         HTTPException: 認証に失敗した場合
     """
     # ユーザーをメールアドレスで検索
-    result = await db.execute(
-        select(User).where(User.email == login_request.email)
-    )
-    user = result.scalar_one_or_none()
+    user = await find_user_by_email(db, login_request.email)
 
     # ユーザーが存在しない、またはパスワードが一致しない場合
     if not user or not verify_password(login_request.password, user.password_hash):
@@ -51,7 +79,7 @@ async def login(
 
     # アクセストークンを生成
     access_token = create_access_token(
-        data={"user_id": user.id, "email": user.email}
+        data={"user_id": user.id, "email": user.email, "company_id": user.company_id}
     )
 
     return {
@@ -80,10 +108,7 @@ async def login_form(
         アクセストークン
     """
     # usernameをemailとして扱う
-    result = await db.execute(
-        select(User).where(User.email == form_data.username)
-    )
-    user = result.scalar_one_or_none()
+    user = await find_user_by_email(db, form_data.username)
 
     if not user or not verify_password(form_data.password, user.password_hash):
         raise HTTPException(
@@ -93,7 +118,7 @@ async def login_form(
         )
 
     access_token = create_access_token(
-        data={"user_id": user.id, "email": user.email}
+        data={"user_id": user.id, "email": user.email, "company_id": user.company_id}
     )
 
     return {"access_token": access_token, "token_type": "bearer"}
@@ -6,13 +6,13 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import DatabaseRoute, get_db
 from app.models.branch import Branch
 from app.models.user import User
 from app.schemas.branch import BranchCreate, BranchUpdate, BranchResponse
 from app.auth.permissions import require_permission
 
-router = APIRouter(prefix="/api/branches", tags=["branches"])
+router = APIRouter(prefix="/api/branches", tags=["branches"], route_class=DatabaseRoute)
 
 
 @router.get("", response_model=List[BranchResponse])
@@ -85,7 +85,7 @@ async def create_branch(
 
     new_branch = Branch(**branch.model_dump())
     db.add(new_branch)
-    await db.commit()
+    await db.flush()
     await db.refresh(new_branch)
     return new_branch
 
@@ -121,7 +121,7 @@ async def update_branch(
     for field, value in update_data.items():
         setattr(branch, field, value)
 
-    await db.commit()
+    await db.flush()
     await db.refresh(branch)
     return branch
 
@@ -153,4 +153,4 @@ async def delete_branch(
         )
 
     await db.delete(branch)
-    await db.commit()
+    await db.flush()
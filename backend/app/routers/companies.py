@@ -6,13 +6,13 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import DatabaseRoute, get_db
 from app.models.company import Company
 from app.models.user import User
 from app.schemas.company import CompanyCreate, CompanyUpdate, CompanyResponse
 from app.auth.permissions import require_permission
 
-router = APIRouter(prefix="/api/companies", tags=["companies"])
+router = APIRouter(prefix="/api/companies", tags=["companies"], route_class=DatabaseRoute)
 
 
 @router.get("", response_model=List[CompanyResponse])
@@ -69,7 +69,7 @@ async def create_company(
     """
     new_company = Company(**company.model_dump())
     db.add(new_company)
-    await db.commit()
+    await db.flush()
     await db.refresh(new_company)
     return new_company
 
@@ -99,7 +99,7 @@ async def update_company(
     for field, value in update_data.items():
         setattr(company, field, value)
 
-    await db.commit()
+    await db.flush()
     await db.refresh(company)
     return company
 
@@ -126,4 +126,4 @@ async def delete_company(
         )
 
     await db.delete(company)
-    await db.commit()
+    await db.flush()
@@ -3,16 +3,19 @@ Customer API Router
 """
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
+from sqlalchemy import bindparam, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import DatabaseRoute, get_db
 from app.models.customer import Customer
 from app.models.user import User
 from app.schemas.customer import CustomerCreate, CustomerUpdate, CustomerResponse
 from app.auth.permissions import require_permission
 
-router = APIRouter(prefix="/api/customers", tags=["customers"])
+router = APIRouter(prefix="/api/customers", tags=["customers"], route_class=DatabaseRoute)
+
+# 詳細・更新・削除で使うIDによる取得（一度だけ構築）
+CUSTOMER_BY_ID_QUERY = select(Customer).where(Customer.id == bindparam("customer_id"))
 
 
 @router.get("", response_model=List[CustomerResponse])
@@ -49,7 +52,7 @@ async def get_customer(
 
     必要な権限: customer.view
     """
-    result = await db.execute(select(Customer).where(Customer.id == customer_id))
+    result = await db.execute(CUSTOMER_BY_ID_QUERY, {"customer_id": customer_id})
     customer = result.scalar_one_or_none()
 
     if not customer:
@@ -98,7 +101,7 @@ async def create_customer(
 
     new_customer = Customer(**customer.model_dump())
     db.add(new_customer)
-    await db.commit()
+    await db.flush()
     await db.refresh(new_customer)
     return new_customer
 
@@ -115,7 +118,7 @@ async def update_customer(
 
     必要な権限: customer.update
     """
-    result = await db.execute(select(Customer).where(Customer.id == customer_id))
+    result = await db.execute(CUSTOMER_BY_ID_QUERY, {"customer_id": customer_id})
     customer = result.scalar_one_or_none()
 
     if not customer:
@@ -147,7 +150,7 @@ async def update_customer(
     for field, value in update_data.items():
         setattr(customer, field, value)
 
-    await db.commit()
+    await db.flush()
     await db.refresh(customer)
     return customer
 
@@ -163,7 +166,7 @@ async def delete_customer(
 
     必要な権限: customer.delete
     """
-    result = await db.execute(select(Customer).where(Customer.id == customer_id))
+    result = await db.execute(CUSTOMER_BY_ID_QUERY, {"customer_id": customer_id})
     customer = result.scalar_one_or_none()
 
     if not customer:
@@ -179,4 +182,4 @@ async def delete_customer(
         )
 
     await db.delete(customer)
-    await db.commit()
+    await db.flush()
@@ -4,17 +4,20 @@ DailyReport API Router
 from typing import List
 from datetime import date
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy import select
+from sqlalchemy import bindparam, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import DatabaseRoute, get_db
 from app.models.daily_report import DailyReport
 from app.models.user import User
 from app.schemas.daily_report import DailyReportCreate, DailyReportUpdate, DailyReportResponse
 from app.auth.permissions import require_permission, require_any_permission, check_permission
 from app.auth.subscription import require_daily_report_subscription
 
-router = APIRouter(prefix="/api/daily-reports", tags=["daily-reports"])
+router = APIRouter(prefix="/api/daily-reports", tags=["daily-reports"], route_class=DatabaseRoute)
+
+# 詳細・更新・削除で使うIDによる取得（一度だけ構築）
+DAILY_REPORT_BY_ID_QUERY = select(DailyReport).where(DailyReport.id == bindparam("report_id"))
 
 
 @router.get("", response_model=List[DailyReportResponse])
@@ -70,9 +73,7 @@ async def get_daily_report(
     必要な契約: DAILY_REPORT サービス
     必要な権限: report.view_all (全日報) OR report.view_self (自分の日報のみ)
     """
-    result = await db.execute(
-        select(DailyReport).where(DailyReport.id == report_id)
-    )
+    result = await db.execute(DAILY_REPORT_BY_ID_QUERY, {"report_id": report_id})
     daily_report = result.scalar_one_or_none()
 
     if not daily_report:
@@ -137,7 +138,7 @@ async def create_daily_report(
         company_id=current_user.company_id
     )
     db.add(new_daily_report)
-    await db.commit()
+    await db.flush()
     await db.refresh(new_daily_report)
     return new_daily_report
 
@@ -156,7 +157,7 @@ async def update_daily_report(
     必要な契約: DAILY_REPORT サービス
     必要な権限: report.update (全日報) OR report.update_self (自分の日報のみ)
     """
-    result = await db.execute(select(DailyReport).where(DailyReport.id == report_id))
+    result = await db.execute(DAILY_REPORT_BY_ID_QUERY, {"report_id": report_id})
     daily_report = result.scalar_one_or_none()
 
     if not daily_report:
@@ -185,7 +186,7 @@ async def update_daily_report(
     for field, value in update_data.items():
         setattr(daily_report, field, value)
 
-    await db.commit()
+    await db.flush()
     await db.refresh(daily_report)
     return daily_report
 
@@ -203,7 +204,7 @@ async def delete_daily_report(
     必要な契約: DAILY_REPORT サービス
     必要な権限: report.delete (全日報) OR report.delete_self (自分の日報のみ)
     """
-    result = await db.execute(select(DailyReport).where(DailyReport.id == report_id))
+    result = await db.execute(DAILY_REPORT_BY_ID_QUERY, {"report_id": report_id})
     daily_report = result.scalar_one_or_none()
 
     if not daily_report:
@@ -229,4 +230,4 @@ async def delete_daily_report(
             )
 
     await db.delete(daily_report)
-    await db.commit()
+    await db.flush()
@@ -6,14 +6,14 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import DatabaseRoute, get_db
 from app.models.department import Department
 from app.models.branch import Branch
 from app.models.user import User
 from app.schemas.department import DepartmentCreate, DepartmentUpdate, DepartmentResponse
 from app.auth.permissions import require_permission
 
-router = APIRouter(prefix="/api/departments", tags=["departments"])
+router = APIRouter(prefix="/api/departments", tags=["departments"], route_class=DatabaseRoute)
 
 
 @router.get("", response_model=List[DepartmentResponse])
@@ -29,7 +29,7 @@ async def get_departments(
 
     必要な権限: department.view
     """
-    query = select(Department).join(Branch).where(Branch.company_id == current_user.company_id)
+    query = select(Department).where(Department.company_id == current_user.company_id)
 
     if branch_id:
         query = query.where(Department.branch_id == branch_id)
@@ -50,11 +50,7 @@ async def get_department(
 
     必要な権限: department.view
     """
-    result = await db.execute(
-        select(Department)
-        .join(Branch)
-        .where(Department.id == department_id)
-    )
+    result = await db.execute(select(Department).where(Department.id == department_id))
     department = result.scalar_one_or_none()
 
     if not department:
@@ -63,10 +59,7 @@ async def get_department(
             detail="部署が見つかりません",
         )
 
-    result = await db.execute(select(Branch).where(Branch.id == department.branch_id))
-    branch = result.scalar_one_or_none()
-
-    if branch.company_id != current_user.company_id:
+    if department.company_id != current_user.company_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="権限がありません",
@@ -101,9 +94,9 @@ async def create_department(
             detail="他の企業の部署は作成できません",
         )
 
-    new_department = Department(**department.model_dump())
+    new_department = Department(**department.model_dump(), company_id=branch.company_id)
     db.add(new_department)
-    await db.commit()
+    await db.flush()
     await db.refresh(new_department)
     return new_department
 
@@ -129,10 +122,7 @@ async def update_department(
             detail="部署が見つかりません",
         )
 
-    result = await db.execute(select(Branch).where(Branch.id == department.branch_id))
-    branch = result.scalar_one_or_none()
-
-    if branch.company_id != current_user.company_id:
+    if department.company_id != current_user.company_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="権限がありません",
@@ -142,7 +132,7 @@ async def update_department(
     for field, value in update_data.items():
         setattr(department, field, value)
 
-    await db.commit()
+    await db.flush()
     await db.refresh(department)
     return department
 
@@ -167,14 +157,11 @@ async def delete_department(
             detail="部署が見つかりません",
         )
 
-    result = await db.execute(select(Branch).where(Branch.id == department.branch_id))
-    branch = result.scalar_one_or_none()
-
-    if branch.company_id != current_user.company_id:
+    if department.company_id != current_user.company_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="権限がありません",
         )
 
     await db.delete(department)
-    await db.commit()
+    await db.flush()
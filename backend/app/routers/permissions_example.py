@@ -5,7 +5,7 @@ Permission System Usage Examples
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import DatabaseRoute, get_db
 from app.models.user import User
 from app.auth.permissions import (
     require_permission,
@@ -14,7 +14,7 @@ from app.auth.permissions import (
     get_user_permissions,
 )
 
-router = APIRouter(prefix="/api/examples", tags=["permission-examples"])
+router = APIRouter(prefix="/api/examples", tags=["permission-examples"], route_class=DatabaseRoute)
 
 
 # 例1: 単一権限チェック
@@ -7,12 +7,12 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import DatabaseRoute, get_db
 from app.models.user import User
 from app.models.service import CompanyServiceSubscription, Service, ServiceSubscriptionHistory
 from app.auth.permissions import require_permission, require_any_permission
 
-router = APIRouter(prefix="/api/subscriptions", tags=["subscriptions"])
+router = APIRouter(prefix="/api/subscriptions", tags=["subscriptions"], route_class=DatabaseRoute)
 
 
 @router.get("", status_code=status.HTTP_200_OK)
@@ -162,8 +162,8 @@ async def subscribe_service(
     )
 
     db.add(new_subscription)
-    await db.commit()
-    await db.refresh(new_subscription)
+    # 履歴に記録する契約IDを採番（確定は get_db でまとめて行う）
+    await db.flush()
 
     # 操作履歴を記録
     history = ServiceSubscriptionHistory(
@@ -181,7 +181,7 @@ async def subscribe_service(
         changed_at=datetime.now(),
     )
     db.add(history)
-    await db.commit()
+    await db.flush()
 
     return {
         "id": new_subscription.id,
@@ -263,9 +263,6 @@ async def unsubscribe_service(
         message = f"解約予約が完了しました。{subscription.expired_date}まで利用可能です"
         change_reason = "解約予約（期限日まで継続）"
 
-    await db.commit()
-    await db.refresh(subscription)
-
     # 操作履歴を記録
     history = ServiceSubscriptionHistory(
         company_id=subscription.company_id,
@@ -282,7 +279,7 @@ async def unsubscribe_service(
         changed_at=datetime.now(),
     )
     db.add(history)
-    await db.commit()
+    await db.flush()
 
     return {
         "id": subscription.id,
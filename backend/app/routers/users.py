@@ -6,13 +6,44 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import SHARD_KEY, DatabaseRoute, ReadOnlySessionLocal, get_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate, UserResponse
+from app.auth.dependencies import USER_BY_ID_QUERY
 from app.auth.permissions import require_permission, require_any_permission, check_permission
 from app.auth.password import get_password_hash
+from app.services.tenant_shards import DEFAULT_SHARD, shard_map
 
-router = APIRouter(prefix="/api/users", tags=["users"])
+router = APIRouter(prefix="/api/users", tags=["users"], route_class=DatabaseRoute)
+
+
+async def email_in_use(db: AsyncSession, email: str) -> bool:
+    """
+    メールアドレスが使用済みか（全シャードで確認）
+
+    ログインはメールアドレスで全シャードからユーザーを検索するため、一意制約（シャード内のみ）に加えて
+    他のシャードのユーザーとも重複させない。
+
+    Args:
+        db: データベースセッション（リクエストのシャード）
+        email: メールアドレス
+
+    Returns:
+        いずれかのシャードに同じメールアドレスのユーザーが存在する場合はTrue
+    """
+    result = await db.execute(select(User.id).where(User.email == email))
+    if result.first() is not None:
+        return True
+
+    current_shard = db.info.get(SHARD_KEY, DEFAULT_SHARD)
+    for shard in shard_map.shards:
+        if shard == current_shard:
+            continue
+        async with ReadOnlySessionLocal(info={SHARD_KEY: shard}) as session:
+            result = await session.execute(select(User.id).where(User.email == email))
+            if result.first() is not None:
+                return True
+    return False
 
 
 @router.get("", response_model=List[UserResponse])
@@ -48,7 +79,7 @@ async def get_user(
 
     必要な権限: user.view
     """
-    result = await db.execute(select(User).where(User.id == user_id))
+    result = await db.execute(USER_BY_ID_QUERY, {"user_id": user_id})
     user = result.scalar_one_or_none()
 
     if not user:
@@ -83,9 +114,7 @@ async def create_user(
             detail="他の企業のユーザーは作成できません",
         )
 
-    result = await db.execute(select(User).where(User.email == user.email))
-    existing_user = result.scalar_one_or_none()
-    if existing_user:
+    if await email_in_use(db, user.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="このメールアドレスは既に使用されています",
@@ -97,7 +126,7 @@ async def create_user(
 
     new_user = User(**user_data)
     db.add(new_user)
-    await db.commit()
+    await db.flush()
     await db.refresh(new_user)
     return new_user
 
@@ -114,7 +143,7 @@ async def update_user(
 
     必要な権限: user.update (他人も更新可能) OR user.update_self (自分のみ)
     """
-    result = await db.execute(select(User).where(User.id == user_id))
+    result = await db.execute(USER_BY_ID_QUERY, {"user_id": user_id})
     user = result.scalar_one_or_none()
 
     if not user:
@@ -140,6 +169,12 @@ async def update_user(
 
     update_data = user_update.model_dump(exclude_unset=True)
 
+    if "email" in update_data and update_data["email"] != user.email and await email_in_use(db, update_data["email"]):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="このメールアドレスは既に使用されています",
+        )
+
     if "password" in update_data:
         password = update_data.pop("password")
         update_data["password_hash"] = get_password_hash(password)
@@ -147,7 +182,7 @@ async def update_user(
     for field, value in update_data.items():
         setattr(user, field, value)
 
-    await db.commit()
+    await db.flush()
     await db.refresh(user)
     return user
 
@@ -163,7 +198,7 @@ async def delete_user(
 
     必要な権限: user.delete
     """
-    result = await db.execute(select(User).where(User.id == user_id))
+    result = await db.execute(USER_BY_ID_QUERY, {"user_id": user_id})
     user = result.scalar_one_or_none()
 
     if not user:
@@ -179,4 +214,4 @@ async def delete_user(
         )
 
     await db.delete(user)
-    await db.commit()
+    await db.flush()
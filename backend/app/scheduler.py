@@ -6,29 +6,51 @@ import logging
 from datetime import date, datetime, timedelta
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from sqlalchemy import select
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import AsyncSessionLocal
+from app.config import get_settings
+from app.database import SHARD_KEY, AsyncSessionLocal, ReplicaSessionLocal, check_replica_lag
 from app.models.service import CompanyServiceSubscription, ServiceSubscriptionHistory
-from app.models.audit_log import AuditLog
+from app.models.audit_log_rollup import AuditLogRollup, BUCKET_MINUTE, BUCKET_HOUR
+from app.services.audit_archive import archive_audit_logs, purge_audit_logs
+from app.services.audit_rollup import audit_rollup_aggregator
+from app.services.tenant_shards import DEFAULT_SHARD, shard_map
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 # システム管理者ID（自動処理用）
 SYSTEM_ADMIN_ID = 1
 
 
+def system_user_id(shard: str) -> int | None:
+    """自動処理の変更者（システム管理者は default シャードにのみ存在するため、他のシャードではNone）"""
+    return SYSTEM_ADMIN_ID if shard == DEFAULT_SHARD else None
+
+# リクエストメトリクス集計の保持期間（1分単位は短期分析用、1時間単位は長期分析用）
+ROLLUP_RETENTION = {
+    BUCKET_MINUTE: timedelta(days=7),
+    BUCKET_HOUR: timedelta(days=400),
+}
+
+
 async def auto_renew_subscriptions():
     """
     サブスクリプション自動更新ジョブ
 
     翌日期限切れになるアクティブな契約の期限日を30日延長する
-    毎日実行
+    毎日実行（シャードごとに処理）
     """
     logger.info("自動更新ジョブ開始")
+    for shard in shard_map.shards:
+        await _auto_renew_subscriptions(shard)
 
-    async with AsyncSessionLocal() as db:
+
+async def _auto_renew_subscriptions(shard: str):
+    """1シャードの契約を自動更新"""
+    async with AsyncSessionLocal(info={SHARD_KEY: shard}) as db:
         try:
             # 翌日期限切れになるアクティブな契約を取得
             tomorrow = date.today() + timedelta(days=1)
@@ -50,7 +72,7 @@ async def auto_renew_subscriptions():
                 history = ServiceSubscriptionHistory(
                     company_id=subscription.company_id,
                     subscription_id=subscription.id,
-                    changed_by_user_id=SYSTEM_ADMIN_ID,
+                    changed_by_user_id=system_user_id(shard),
                     change_type="update",
                     old_status="active",
                     new_status="active",
@@ -65,7 +87,7 @@ async def auto_renew_subscriptions():
                 renewed_count += 1
 
             await db.commit()
-            logger.info(f"自動更新完了: {renewed_count}件の契約を更新しました")
+            logger.info(f"自動更新完了（{shard}）: {renewed_count}件の契約を更新しました")
 
         except Exception as e:
             logger.error(f"自動更新ジョブでエラーが発生しました: {e}")
@@ -77,25 +99,31 @@ async def cleanup_old_audit_logs():
     """
     古い操作履歴の削除ジョブ
 
-    90日以上前の操作履歴を削除する
+    保持期間（AUDIT_RETENTION_DAYS）を過ぎた操作履歴を圧縮アーカイブへ退避してから削除する
+    アーカイブに失敗した場合は削除しない
     毎日実行
     """
     logger.info("操作履歴クリーンアップジョブ開始")
 
     async with AsyncSessionLocal() as db:
         try:
-            # 90日前の日付を計算
-            cutoff_date = datetime.now() - timedelta(days=90)
-
-            # 90日以上前の操作履歴を削除
-            result = await db.execute(
-                select(AuditLog).where(AuditLog.created_at < cutoff_date)
-            )
-            old_logs = result.scalars().all()
-
-            deleted_count = len(old_logs)
-            for log in old_logs:
-                await db.delete(log)
+            cutoff_date = datetime.now().astimezone() - timedelta(days=settings.AUDIT_RETENTION_DAYS)
+
+            if settings.AUDIT_ARCHIVE_ENABLED:
+                entries = await archive_audit_logs(db, cutoff_date, settings.AUDIT_ARCHIVE_DIR)
+                archived_count = sum(entry["row_count"] for entry in entries)
+                logger.info(f"操作履歴をアーカイブしました: {archived_count}件（{len(entries)}ファイル）")
+
+            deleted_count = await purge_audit_logs(db, cutoff_date)
+
+            # 保持期間を過ぎたリクエストメトリクス集計を削除
+            for bucket_minutes, retention in ROLLUP_RETENTION.items():
+                await db.execute(
+                    delete(AuditLogRollup).where(
+                        AuditLogRollup.bucket_minutes == bucket_minutes,
+                        AuditLogRollup.bucket_start < datetime.now().astimezone() - retention,
+                    )
+                )
 
             await db.commit()
             logger.info(f"操作履歴クリーンアップ完了: {deleted_count}件の古い記録を削除しました")
@@ -106,16 +134,49 @@ async def cleanup_old_audit_logs():
             raise
 
 
+async def flush_audit_rollups():
+    """
+    リクエストメトリクス集計の書き込みジョブ
+
+    プロセス内に溜まった1分単位の集計差分を audit_log_rollups へ UPSERT する
+    10秒ごとに実行
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            flushed_count = await audit_rollup_aggregator.flush(db)
+            if flushed_count:
+                logger.debug(f"リクエストメトリクス集計を書き込みました: {flushed_count}件")
+        except Exception as e:
+            logger.error(f"リクエストメトリクス集計の書き込みでエラーが発生しました: {e}")
+
+
+async def monitor_replica_lag():
+    """
+    読み取りレプリカの遅延計測ジョブ
+
+    遅延が REPLICA_MAX_LAG_SECONDS を超えている間、参照系リクエストはプライマリで処理される
+    10秒ごとに実行（レプリカ設定時のみ）
+    """
+    lag = await check_replica_lag()
+    if lag is not None and lag > settings.REPLICA_MAX_LAG_SECONDS:
+        logger.warning(f"読み取りレプリカの遅延が大きいためプライマリを使用します: {lag:.1f}秒")
+
+
 async def expire_cancelled_subscriptions():
     """
     期限切れ処理ジョブ
 
     期限日を過ぎた解約済み契約を期限切れ状態に変更する
-    毎日実行
+    毎日実行（シャードごとに処理）
     """
     logger.info("期限切れ処理ジョブ開始")
+    for shard in shard_map.shards:
+        await _expire_cancelled_subscriptions(shard)
 
-    async with AsyncSessionLocal() as db:
+
+async def _expire_cancelled_subscriptions(shard: str):
+    """1シャードの解約済み契約を期限切れにする"""
+    async with AsyncSessionLocal(info={SHARD_KEY: shard}) as db:
         try:
             # 期限切れになった解約済み契約を取得
             today = date.today()
@@ -137,7 +198,7 @@ async def expire_cancelled_subscriptions():
                 history = ServiceSubscriptionHistory(
                     company_id=subscription.company_id,
                     subscription_id=subscription.id,
-                    changed_by_user_id=SYSTEM_ADMIN_ID,
+                    changed_by_user_id=system_user_id(shard),
                     change_type="update",
                     old_status=old_status,
                     new_status="expired",
@@ -152,7 +213,7 @@ async def expire_cancelled_subscriptions():
                 expired_count += 1
 
             await db.commit()
-            logger.info(f"期限切れ処理完了: {expired_count}件の契約を期限切れにしました")
+            logger.info(f"期限切れ処理完了（{shard}）: {expired_count}件の契約を期限切れにしました")
 
         except Exception as e:
             logger.error(f"期限切れ処理ジョブでエラーが発生しました: {e}")
@@ -196,6 +257,27 @@ def start_scheduler():
     )
     logger.info("操作履歴クリーンアップジョブを登録しました（毎日 01:00）")
 
+    # リクエストメトリクス集計ジョブ: 10秒ごとに実行
+    scheduler.add_job(
+        flush_audit_rollups,
+        IntervalTrigger(seconds=10),
+        id="flush_audit_rollups",
+        name="リクエストメトリクス集計",
+        replace_existing=True,
+    )
+    logger.info("リクエストメトリクス集計ジョブを登録しました（10秒ごと）")
+
+    # 読み取りレプリカの遅延計測ジョブ: 10秒ごとに実行（レプリカ設定時のみ）
+    if ReplicaSessionLocal is not None:
+        scheduler.add_job(
+            monitor_replica_lag,
+            IntervalTrigger(seconds=10),
+            id="monitor_replica_lag",
+            name="読み取りレプリカ遅延計測",
+            replace_existing=True,
+        )
+        logger.info("読み取りレプリカ遅延計測ジョブを登録しました（10秒ごと）")
+
     scheduler.start()
     logger.info("スケジューラーを起動しました")
 
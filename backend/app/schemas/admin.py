@@ -0,0 +1,58 @@
+"""
+Admin Schemas
+"""
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+class PoolStatsResponse(BaseModel):
+    """コネクションプール状態レスポンススキーマ（リクエストを処理したワーカーの値）"""
+
+    pool: str = Field(..., description="プール（primary / replica）")
+    size: int = Field(..., description="pool_size")
+    max_overflow: int = Field(..., description="max_overflow")
+    checked_in: int = Field(..., description="待機中の接続数")
+    checked_out: int = Field(..., description="使用中の接続数")
+    overflow: int = Field(..., description="pool_size を超えて作成した接続数（負の値は未作成の枠）")
+    waiting: int = Field(..., description="接続の取得を待っているタスク数")
+    checkout_count: int = Field(..., description="接続の取得回数（起動以降）")
+    checkout_wait_avg_ms: Optional[float] = Field(None, description="接続の取得待ち時間の平均（ミリ秒）")
+    checkout_wait_p95_ms: Optional[float] = Field(
+        None, description="接続の取得待ち時間の95パーセンタイル（ミリ秒、ヒストグラムからの推定値）"
+    )
+    checkout_timeouts: int = Field(..., description="接続の取得がタイムアウトした回数")
+    disconnects: int = Field(..., description="切断を検出して接続を破棄した回数")
+
+
+class WorkerPoolStatsResponse(BaseModel):
+    """ワーカーのコネクションプール状態レスポンススキーマ"""
+
+    pid: int = Field(..., description="ワーカーのプロセスID")
+    pgbouncer_mode: bool = Field(..., description="PgBouncer 経由で接続しているか（アプリ側のプールなし）")
+    pre_ping: bool = Field(..., description="取得のたびに接続を確認するか")
+    recycle_seconds: int = Field(..., description="接続を作り直すまでの秒数（-1 は無効）")
+    timeout_seconds: float = Field(..., description="接続の取得を待つ最大秒数")
+    pools: list[PoolStatsResponse] = Field(..., description="生成済みのプール（PgBouncer モードでは空）")
+
+
+class SlowQueryPlanResponse(BaseModel):
+    """実行時間が閾値を超えたSQLの実行計画レスポンススキーマ"""
+
+    captured_at: datetime = Field(..., description="取得日時")
+    route: Optional[str] = Field(None, description="SQLを実行したルート（リクエスト外の場合はNone）")
+    fingerprint: str = Field(..., description="SQLの形状のフィンガープリント")
+    statement: str = Field(..., description="正規化したSQL（パラメータは ? に置換）")
+    parameter_types: list[str] = Field(..., description="パラメータの型（値は保持しない）")
+    duration_ms: float = Field(..., description="閾値を超えた実行の実行時間（ミリ秒）")
+    analyzed: bool = Field(..., description="EXPLAIN ANALYZE で再実行したか（更新系のSQLは EXPLAIN のみ）")
+    plan: list[str] = Field(..., description="実行計画（EXPLAIN の出力行）")
+    error: Optional[str] = Field(None, description="実行計画を取得できなかった場合のエラー")
+
+
+class SlowQueryPlansResponse(BaseModel):
+    """ワーカーの実行計画一覧レスポンススキーマ"""
+
+    pid: int = Field(..., description="ワーカーのプロセスID")
+    threshold_ms: float = Field(..., description="実行計画を取得する実行時間の閾値（ミリ秒、0 は無効）")
+    plans: list[SlowQueryPlanResponse] = Field(..., description="保持している実行計画（新しい順）")
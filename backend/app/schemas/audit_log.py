@@ -0,0 +1,68 @@
+"""
+Audit Log Schemas
+"""
+from datetime import datetime
+from typing import Any, List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class LatencyStats(BaseModel):
+    """レイテンシ・スループット統計ベーススキーマ"""
+
+    request_count: int = Field(..., description="リクエスト数")
+    error_count: int = Field(..., description="サーバーエラー数（5xx）")
+    client_error_count: int = Field(..., description="クライアントエラー数（4xx）")
+    error_rate: float = Field(..., description="サーバーエラー率（0〜1）")
+    throughput_rpm: float = Field(..., description="スループット（リクエスト/分）")
+    avg_ms: Optional[float] = Field(None, description="平均レスポンス時間（ミリ秒）")
+    min_ms: Optional[int] = Field(None, description="最小レスポンス時間（ミリ秒）")
+    max_ms: Optional[int] = Field(None, description="最大レスポンス時間（ミリ秒）")
+    p50_ms: Optional[float] = Field(None, description="50パーセンタイル（ミリ秒、ヒストグラムからの推定値）")
+    p95_ms: Optional[float] = Field(None, description="95パーセンタイル（ミリ秒、ヒストグラムからの推定値）")
+    p99_ms: Optional[float] = Field(None, description="99パーセンタイル（ミリ秒、ヒストグラムからの推定値）")
+
+
+class RouteStatsResponse(LatencyStats):
+    """ルート別統計レスポンススキーマ"""
+
+    route: str = Field(..., description="ルートテンプレート")
+    method: str = Field(..., description="HTTPメソッド")
+
+
+class CompanyStatsResponse(LatencyStats):
+    """企業別統計レスポンススキーマ"""
+
+    company_id: Optional[int] = Field(None, description="企業ID（未認証リクエストはNULL）")
+
+
+class TimeBucketStatsResponse(LatencyStats):
+    """時間区間別統計レスポンススキーマ"""
+
+    bucket_start: datetime = Field(..., description="区間の開始時刻")
+
+
+class AuditLogResponse(BaseModel):
+    """操作履歴レスポンススキーマ"""
+
+    id: int = Field(..., description="操作履歴ID")
+    user_id: Optional[int] = Field(None, description="操作ユーザーID")
+    company_id: Optional[int] = Field(None, description="企業ID")
+    method: str = Field(..., description="HTTPメソッド")
+    path: str = Field(..., description="リクエストパス")
+    route: Optional[str] = Field(None, description="ルートテンプレート")
+    query_params: Optional[Any] = Field(None, description="クエリパラメータ")
+    request_body: Optional[Any] = Field(None, description="リクエストボディ（機密情報はマスク済み）")
+    status_code: int = Field(..., description="レスポンスステータスコード")
+    response_time_ms: Optional[int] = Field(None, description="レスポンス時間（ミリ秒）")
+    ip_address: Optional[str] = Field(None, description="クライアントIPアドレス")
+    user_agent: Optional[str] = Field(None, description="User-Agent")
+    created_at: datetime = Field(..., description="記録日時")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class AuditLogPageResponse(BaseModel):
+    """操作履歴検索レスポンススキーマ"""
+
+    items: List[AuditLogResponse] = Field(..., description="操作履歴（新しい順）")
+    next_cursor: Optional[str] = Field(None, description="次ページ取得用のカーソル（最終ページの場合はNULL）")
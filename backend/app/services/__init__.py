@@ -0,0 +1,3 @@
+"""
+Business Logic Services
+"""
@@ -0,0 +1,249 @@
+"""
+Audit Analytics Service
+集計テーブル（audit_log_rollups）からレイテンシ・スループット・エラー率を算出する
+
+audit_logs を直接走査せず、事前集計したヒストグラムを合算してパーセンタイルを推定するため、
+90日分の範囲でも集計行数（1時間単位）に比例した時間で応答できる。
+"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.audit_log_rollup import AuditLogRollup, LATENCY_BUCKETS, BUCKET_MINUTE, BUCKET_HOUR
+from app.services.audit_rollup import truncate_to_bucket
+
+settings = get_settings()
+
+# この期間以下の範囲は1分単位の集計行を使う（それより長い範囲は1時間単位）
+MINUTE_BUCKET_MAX_RANGE = timedelta(hours=6)
+
+# 時系列の区間指定
+INTERVALS = ("minute", "hour", "day")
+
+PERCENTILES = (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99))
+
+
+def normalize_range(start: datetime | None, end: datetime | None) -> tuple[datetime, datetime]:
+    """
+    集計範囲を正規化（省略時は直近24時間、タイムゾーンなしはUTCとみなす）
+
+    Returns:
+        (start, end)
+    """
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(hours=24)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    return start, end
+
+
+def choose_bucket_minutes(start: datetime, end: datetime) -> int:
+    """集計範囲に応じて使用する集計粒度を選択"""
+    return BUCKET_MINUTE if end - start <= MINUTE_BUCKET_MAX_RANGE else BUCKET_HOUR
+
+
+def estimate_percentile(
+    buckets: list[int],
+    quantile: float,
+    latency_min_ms: int | None,
+    latency_max_ms: int | None,
+) -> float | None:
+    """
+    ヒストグラムからパーセンタイルを推定（バケット内は線形補間）
+
+    Args:
+        buckets: 各バケットの件数（LATENCY_BUCKETS と同順）
+        quantile: 分位点（0〜1）
+        latency_min_ms: 最小レスポンス時間（推定値の下限に使用）
+        latency_max_ms: 最大レスポンス時間（上限なしバケットの上端・推定値の上限に使用）
+
+    Returns:
+        推定レスポンス時間（ミリ秒、件数0の場合はNone）
+    """
+    total = sum(buckets)
+    if total == 0:
+        return None
+
+    rank = quantile * total
+    cumulative = 0
+    lower_bound = 0
+    for (upper_bound, _), count in zip(LATENCY_BUCKETS, buckets):
+        if upper_bound is None:
+            upper_bound = max(latency_max_ms or lower_bound, lower_bound)
+        if count and cumulative + count >= rank:
+            estimate = lower_bound + (upper_bound - lower_bound) * (rank - cumulative) / count
+            if latency_min_ms is not None:
+                estimate = max(estimate, latency_min_ms)
+            if latency_max_ms is not None:
+                estimate = min(estimate, latency_max_ms)
+            return round(estimate, 1)
+        cumulative += count
+        lower_bound = upper_bound
+
+    return float(latency_max_ms) if latency_max_ms is not None else None
+
+
+def _aggregate_columns():
+    """集計行を合算するカラム一覧"""
+    table = AuditLogRollup.__table__
+    return [
+        func.sum(table.c.request_count).label("request_count"),
+        func.sum(table.c.error_count).label("error_count"),
+        func.sum(case((table.c.status_class == 4, table.c.request_count), else_=0)).label("client_error_count"),
+        func.sum(table.c.latency_sum_ms).label("latency_sum_ms"),
+        func.min(table.c.latency_min_ms).label("latency_min_ms"),
+        func.max(table.c.latency_max_ms).label("latency_max_ms"),
+        *[func.sum(table.c[column_name]).label(column_name) for _, column_name in LATENCY_BUCKETS],
+    ]
+
+
+def _summarize(row, range_minutes: float) -> dict:
+    """合算結果の行からレイテンシ・スループット・エラー率を算出"""
+    request_count = int(row.request_count or 0)
+    buckets = [int(getattr(row, column_name) or 0) for _, column_name in LATENCY_BUCKETS]
+    summary = {
+        "request_count": request_count,
+        "error_count": int(row.error_count or 0),
+        "client_error_count": int(row.client_error_count or 0),
+        "error_rate": round(int(row.error_count or 0) / request_count, 4) if request_count else 0.0,
+        "throughput_rpm": round(request_count / range_minutes, 3) if range_minutes > 0 else 0.0,
+        "avg_ms": round(int(row.latency_sum_ms or 0) / request_count, 1) if request_count else None,
+        "min_ms": row.latency_min_ms,
+        "max_ms": row.latency_max_ms,
+    }
+    for name, quantile in PERCENTILES:
+        summary[name] = estimate_percentile(buckets, quantile, row.latency_min_ms, row.latency_max_ms)
+    return summary
+
+
+def _range_minutes(start: datetime, end: datetime, bucket_minutes: int) -> float:
+    """集計行が対象とする範囲の長さ（分、開始は集計区間の開始時刻に切り捨てる）"""
+    return (end - truncate_to_bucket(start, bucket_minutes)).total_seconds() / 60
+
+
+def _base_query(columns: list, start: datetime, end: datetime, bucket_minutes: int):
+    # 開始日時を含む集計区間（区間の途中から始まる最初の区間）も対象にする
+    return select(*columns, *_aggregate_columns()).where(
+        AuditLogRollup.bucket_minutes == bucket_minutes,
+        AuditLogRollup.bucket_start >= truncate_to_bucket(start, bucket_minutes),
+        AuditLogRollup.bucket_start < end,
+    )
+
+
+async def get_route_stats(
+    db: AsyncSession,
+    company_id: int,
+    start: datetime,
+    end: datetime,
+    method: str | None = None,
+) -> list[dict]:
+    """
+    ルート（テンプレート）・メソッドごとの統計を取得
+
+    Args:
+        db: データベースセッション
+        company_id: 企業ID
+        start: 集計開始日時
+        end: 集計終了日時
+        method: HTTPメソッドで絞り込み（オプション）
+
+    Returns:
+        統計のリスト（リクエスト数の多い順）
+    """
+    bucket_minutes = choose_bucket_minutes(start, end)
+    query = _base_query(
+        [AuditLogRollup.route, AuditLogRollup.method], start, end, bucket_minutes
+    ).where(AuditLogRollup.company_id == company_id)
+    if method:
+        query = query.where(AuditLogRollup.method == method.upper())
+    query = query.group_by(AuditLogRollup.route, AuditLogRollup.method).order_by(
+        func.sum(AuditLogRollup.request_count).desc()
+    )
+
+    result = await db.execute(query)
+    range_minutes = _range_minutes(start, end, bucket_minutes)
+    return [
+        {"route": row.route, "method": row.method, **_summarize(row, range_minutes)}
+        for row in result.all()
+    ]
+
+
+async def get_company_stats(db: AsyncSession, start: datetime, end: datetime) -> list[dict]:
+    """
+    企業（テナント）ごとの統計を取得
+
+    Args:
+        db: データベースセッション
+        start: 集計開始日時
+        end: 集計終了日時
+
+    Returns:
+        統計のリスト（リクエスト数の多い順、未認証リクエストは company_id=None）
+    """
+    bucket_minutes = choose_bucket_minutes(start, end)
+    query = (
+        _base_query([AuditLogRollup.company_id], start, end, bucket_minutes)
+        .group_by(AuditLogRollup.company_id)
+        .order_by(func.sum(AuditLogRollup.request_count).desc())
+    )
+
+    result = await db.execute(query)
+    range_minutes = _range_minutes(start, end, bucket_minutes)
+    return [
+        {"company_id": row.company_id, **_summarize(row, range_minutes)}
+        for row in result.all()
+    ]
+
+
+async def get_timeseries(
+    db: AsyncSession,
+    company_id: int,
+    start: datetime,
+    end: datetime,
+    interval: str,
+    route: str | None = None,
+) -> list[dict]:
+    """
+    時間区間ごとの統計を取得
+
+    Args:
+        db: データベースセッション
+        company_id: 企業ID
+        start: 集計開始日時
+        end: 集計終了日時
+        interval: 区間（minute / hour / day、day は設定のタイムゾーンで区切る）
+        route: ルートテンプレートで絞り込み（オプション）
+
+    Returns:
+        統計のリスト（区間の古い順）
+    """
+    if interval == "minute":
+        bucket_minutes = BUCKET_MINUTE
+        bucket_expr = AuditLogRollup.bucket_start
+        interval_minutes = 1
+    elif interval == "hour":
+        bucket_minutes = BUCKET_HOUR
+        bucket_expr = AuditLogRollup.bucket_start
+        interval_minutes = 60
+    else:
+        bucket_minutes = BUCKET_HOUR
+        bucket_expr = func.date_trunc("day", AuditLogRollup.bucket_start, settings.TIMEZONE)
+        interval_minutes = 60 * 24
+
+    bucket_column = bucket_expr.label("bucket")
+    query = _base_query([bucket_column], start, end, bucket_minutes).where(
+        AuditLogRollup.company_id == company_id
+    )
+    if route:
+        query = query.where(AuditLogRollup.route == route)
+    query = query.group_by(bucket_column).order_by(bucket_column)
+
+    result = await db.execute(query)
+    return [
+        {"bucket_start": row.bucket, **_summarize(row, interval_minutes)}
+        for row in result.all()
+    ]
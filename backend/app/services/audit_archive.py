@@ -0,0 +1,358 @@
+"""
+Audit Log Archive Service
+保持期間を過ぎた操作履歴を日付パーティション単位の圧縮ファイル（zstd NDJSON）へ退避する
+
+ディレクトリ構成:
+    {AUDIT_ARCHIVE_DIR}/
+        manifest.json                              # 全アーカイブファイルの一覧
+        date=2026-01-05/
+            audit_logs-{最小ID}-{最大ID}.ndjson.zst
+
+日付はUTCの created_at で区切り、1日分は1ファイルにまとめる。アーカイブ済みの日付を再度書き出す場合
+（削除の途中でジョブが失敗して再実行した場合や、一部を復元した後など）は、既存のファイルの行に
+まだアーカイブしていない行だけを加えたファイルで置き換えるため、同じ行が重複して残らない。
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Iterator
+
+import zstandard
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.audit_log import AuditLog, audit_logs_view
+from app.services.audit_dimensions import audit_dimension_cache
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+
+# サーバーサイドカーソルから1回に取得する行数
+FETCH_BATCH_SIZE = 5000
+
+# 削除・復元を1トランザクションで処理する行数
+DELETE_BATCH_SIZE = 10000
+RESTORE_BATCH_SIZE = 1000
+
+ZSTD_LEVEL = 10
+
+
+def _serialize_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _deserialize_record(record: dict) -> dict:
+    record = dict(record)
+    if record.get("created_at"):
+        record["created_at"] = datetime.fromisoformat(record["created_at"])
+    return record
+
+
+def read_manifest(archive_dir: str | Path) -> dict:
+    """
+    マニフェストを読み込む
+
+    Returns:
+        {"files": [...]}（未作成の場合は空）
+    """
+    manifest_path = Path(archive_dir) / MANIFEST_FILE
+    if not manifest_path.exists():
+        return {"files": []}
+    with manifest_path.open(encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_manifest(archive_dir: Path, manifest: dict):
+    """マニフェストを一時ファイル経由で置き換える（書き込み途中の状態を残さない）"""
+    manifest_path = archive_dir / MANIFEST_FILE
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def _iter_archive_lines(path: Path) -> Iterator[bytes]:
+    """アーカイブファイルを逐次展開して1行（1件のJSON）ずつ返す"""
+    with path.open("rb") as f:
+        reader = zstandard.ZstdDecompressor().stream_reader(f)
+        buffer = b""
+        for chunk in iter(lambda: reader.read(1024 * 1024), b""):
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line:
+                    yield line
+
+
+class _PartitionWriter:
+    """
+    1日分のアーカイブファイル書き込み
+
+    同じ日付のアーカイブが既にある場合は、その行を引き継いだうえで未アーカイブの行だけを追加する
+    （既存の行のIDを保持し、同じIDの行は書き込まない）。
+    """
+
+    def __init__(self, archive_dir: Path, partition_date: date, existing_entries: list[dict] | None = None):
+        self.archive_dir = archive_dir
+        self.partition_date = partition_date
+        self.partition_dir = archive_dir / f"date={partition_date.isoformat()}"
+        self.partition_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = self.partition_dir / f".audit_logs-{os.getpid()}.ndjson.zst.tmp"
+        self._file = self.tmp_path.open("wb")
+        self._writer = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(self._file, closefd=False)
+        self.row_count = 0
+        self.min_id = None
+        self.max_id = None
+        self.min_created_at = None
+        self.max_created_at = None
+        self.replaced_paths = [archive_dir / entry["path"] for entry in existing_entries or []]
+        self._archived_ids: set[int] = set()
+        for path in self.replaced_paths:
+            if path.exists():
+                self._copy_existing(path)
+            else:
+                logger.warning(f"マニフェストにあるアーカイブファイルが見つかりません: {path}")
+
+    def _track(self, row_id: int, created_at: datetime):
+        self.min_id = row_id if self.min_id is None else min(self.min_id, row_id)
+        self.max_id = row_id if self.max_id is None else max(self.max_id, row_id)
+        if self.min_created_at is None or created_at < self.min_created_at:
+            self.min_created_at = created_at
+        if self.max_created_at is None or created_at > self.max_created_at:
+            self.max_created_at = created_at
+
+    def _copy_existing(self, path: Path):
+        """同じ日付の既存のアーカイブファイルの行を引き継ぐ"""
+        for line in _iter_archive_lines(path):
+            record = _deserialize_record(json.loads(line))
+            if record["id"] in self._archived_ids:
+                continue
+            self._archived_ids.add(record["id"])
+            self._track(record["id"], record["created_at"])
+            self._writer.write(line + b"\n")
+            self.row_count += 1
+
+    def write_rows(self, rows: list[dict]):
+        lines = []
+        for row in rows:
+            if row["id"] in self._archived_ids:
+                continue
+            lines.append(json.dumps({k: _serialize_value(v) for k, v in row.items()}, ensure_ascii=False))
+            self._track(row["id"], row["created_at"])
+        if lines:
+            self._writer.write(("\n".join(lines) + "\n").encode("utf-8"))
+            self.row_count += len(lines)
+
+    def close(self) -> dict:
+        """ファイルを確定してマニフェストのエントリを返す"""
+        self._writer.close()
+        self._file.close()
+
+        final_path = self.partition_dir / f"audit_logs-{self.min_id}-{self.max_id}.ndjson.zst"
+        os.replace(self.tmp_path, final_path)
+
+        sha256 = hashlib.sha256()
+        with final_path.open("rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha256.update(chunk)
+
+        return {
+            "path": str(final_path.relative_to(self.archive_dir)),
+            "date": self.partition_date.isoformat(),
+            "row_count": self.row_count,
+            "min_id": self.min_id,
+            "max_id": self.max_id,
+            "min_created_at": self.min_created_at.isoformat(),
+            "max_created_at": self.max_created_at.isoformat(),
+            "bytes": final_path.stat().st_size,
+            "sha256": sha256.hexdigest(),
+            "archived_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+
+async def archive_audit_logs(db: AsyncSession, cutoff: datetime, archive_dir: str | Path) -> list[dict]:
+    """
+    cutoff より古い操作履歴をアーカイブファイルへ書き出す（DBからは削除しない）
+
+    サーバーサイドカーソルで created_at 順に読み出し、日付が変わるごとにファイルを確定する。
+    アーカイブ済みの日付は既存のファイルと合わせた1ファイルに置き換え、アーカイブ済みのIDは書き込まない。
+
+    Args:
+        db: データベースセッション
+        cutoff: この日時より前の操作履歴が対象
+        archive_dir: アーカイブ出力先ディレクトリ
+
+    Returns:
+        作成したファイルのマニフェストエントリ
+    """
+    archive_dir = Path(archive_dir)
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    archived_by_date: dict[str, list[dict]] = {}
+    for entry in read_manifest(archive_dir)["files"]:
+        archived_by_date.setdefault(entry["date"], []).append(entry)
+
+    # パス・User-Agent は文字列で保存する（辞書テーブルに依存せずに読めるように）
+    table = audit_logs_view
+    query = (
+        select(table)
+        .where(table.c.created_at < cutoff)
+        .order_by(table.c.created_at, table.c.id)
+        .execution_options(yield_per=FETCH_BATCH_SIZE)
+    )
+
+    entries = []
+    writer: _PartitionWriter | None = None
+    try:
+        result = await db.stream(query)
+        async for partition in result.mappings().partitions(FETCH_BATCH_SIZE):
+            # 日付ごとにまとめてからファイルへ書き込む（圧縮はスレッドで実行）
+            pending: list[dict] = []
+            for row in partition:
+                row = dict(row)
+                row_date = row["created_at"].astimezone(timezone.utc).date()
+                if writer is not None and writer.partition_date != row_date:
+                    if pending:
+                        await asyncio.to_thread(writer.write_rows, pending)
+                        pending = []
+                    entries.append(await asyncio.to_thread(writer.close))
+                    writer = None
+                if writer is None:
+                    writer = await asyncio.to_thread(
+                        _PartitionWriter, archive_dir, row_date, archived_by_date.get(row_date.isoformat())
+                    )
+                pending.append(row)
+            if pending:
+                await asyncio.to_thread(writer.write_rows, pending)
+
+        if writer is not None:
+            entries.append(await asyncio.to_thread(writer.close))
+            writer = None
+    finally:
+        if writer is not None:
+            # 書き込み途中のファイルは破棄する
+            writer._writer.close()
+            writer._file.close()
+            writer.tmp_path.unlink(missing_ok=True)
+
+    if entries:
+        manifest = read_manifest(archive_dir)
+        new_dates = {entry["date"] for entry in entries}
+        new_paths = {entry["path"] for entry in entries}
+        replaced = [f for f in manifest["files"] if f["date"] in new_dates and f["path"] not in new_paths]
+        manifest["files"] = [f for f in manifest["files"] if f["date"] not in new_dates] + entries
+        manifest["files"].sort(key=lambda f: (f["date"], f["min_id"]))
+        _write_manifest(archive_dir, manifest)
+        # マニフェストを置き換えた後で、新しいファイルに引き継いだ既存のファイルを削除する
+        for entry in replaced:
+            (archive_dir / entry["path"]).unlink(missing_ok=True)
+
+    return entries
+
+
+async def purge_audit_logs(db: AsyncSession, cutoff: datetime) -> int:
+    """
+    cutoff より古い操作履歴をバッチ単位で削除
+
+    Args:
+        db: データベースセッション
+        cutoff: この日時より前の操作履歴を削除
+
+    Returns:
+        削除件数
+    """
+    deleted_count = 0
+    while True:
+        batch_ids = (
+            select(AuditLog.id)
+            .where(AuditLog.created_at < cutoff)
+            .limit(DELETE_BATCH_SIZE)
+            .scalar_subquery()
+        )
+        result = await db.execute(delete(AuditLog).where(AuditLog.id.in_(batch_ids)))
+        await db.commit()
+        deleted_count += result.rowcount
+        if result.rowcount < DELETE_BATCH_SIZE:
+            return deleted_count
+
+
+def iter_archived_records(
+    archive_dir: str | Path,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> Iterator[dict]:
+    """
+    アーカイブから指定範囲の操作履歴を読み出す
+
+    マニフェストの日時範囲で対象ファイルを絞り込み、ファイル内は逐次展開する。
+
+    Args:
+        archive_dir: アーカイブディレクトリ
+        start: この日時以降（タイムゾーンなしはUTCとみなす）
+        end: この日時より前（タイムゾーンなしはUTCとみなす）
+
+    Yields:
+        操作履歴（created_at は datetime）
+    """
+    archive_dir = Path(archive_dir)
+    if start is not None and start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end is not None and end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+
+    for entry in read_manifest(archive_dir)["files"]:
+        if start is not None and datetime.fromisoformat(entry["max_created_at"]) < start:
+            continue
+        if end is not None and datetime.fromisoformat(entry["min_created_at"]) >= end:
+            continue
+
+        for line in _iter_archive_lines(archive_dir / entry["path"]):
+            record = _deserialize_record(json.loads(line))
+            if start is not None and record["created_at"] < start:
+                continue
+            if end is not None and record["created_at"] >= end:
+                continue
+            yield record
+
+
+async def restore_audit_logs(db: AsyncSession, records: Iterator[dict]) -> int:
+    """
+    アーカイブした操作履歴をDBへ戻す（既に存在するIDはスキップ）
+
+    Args:
+        db: データベースセッション
+        records: iter_archived_records() の結果
+
+    Returns:
+        復元を試みた件数
+    """
+    table = AuditLog.__table__
+    columns = {column.name for column in audit_logs_view.columns}
+    restored_count = 0
+    batch = []
+
+    async def flush():
+        nonlocal restored_count
+        if not batch:
+            return
+        rows = await audit_dimension_cache.encode(db, batch)
+        await db.execute(insert(table).values(rows).on_conflict_do_nothing(index_elements=["id"]))
+        await db.commit()
+        restored_count += len(batch)
+        batch.clear()
+
+    for record in records:
+        batch.append({key: value for key, value in record.items() if key in columns})
+        if len(batch) >= RESTORE_BATCH_SIZE:
+            await flush()
+    await flush()
+
+    logger.info(f"アーカイブから操作履歴を復元しました: {restored_count}件")
+    return restored_count
@@ -0,0 +1,91 @@
+"""
+Audit Log Dimension Service
+操作履歴のリクエストパス・User-Agent を辞書テーブルのIDへ変換する（プロセス内キャッシュ付き）
+"""
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.audit_dimension import AuditPath, AuditUserAgent, DIMENSION_VALUE_MAX_LENGTH
+
+# (文字列のキー, IDのキー, 辞書テーブル)
+DIMENSIONS = (
+    ("path", "path_id", AuditPath),
+    ("user_agent", "user_agent_id", AuditUserAgent),
+)
+
+# 1辞書あたりのキャッシュ上限（User-Agent は種類が増え続けることがあるため）
+CACHE_MAX_ENTRIES = 50000
+
+
+class AuditDimensionCache:
+    """
+    辞書テーブルの 値→ID キャッシュ
+
+    キャッシュにない値は辞書テーブルへ登録（既存の場合は取得）し、確定後にキャッシュへ追加する。
+    辞書テーブルの行は削除しない前提のため、キャッシュの失効は上限超過時と clear() のみ。
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._ids: dict[type, dict[str, int]] = {model: {} for _, _, model in DIMENSIONS}
+
+    def clear(self):
+        """キャッシュを破棄（辞書テーブルが作り直された場合など）"""
+        for cache in self._ids.values():
+            cache.clear()
+
+    async def encode(self, db: AsyncSession, records: list[dict]) -> list[dict]:
+        """
+        操作履歴の path / user_agent を辞書IDへ置き換える
+
+        新しい値を登録した場合は呼び出し元のトランザクションを確定してからキャッシュへ追加する
+        （後続のINSERTが失敗しても、キャッシュ済みのIDが辞書テーブルに存在するように）。
+
+        Args:
+            db: データベースセッション（未確定の変更がない状態で渡す）
+            records: audit_logs のカラム名（path / user_agent は文字列）をキーとする辞書のリスト
+
+        Returns:
+            path_id / user_agent_id に置き換えたレコードのリスト
+        """
+        encoded = [dict(record) for record in records]
+        registered: dict[type, dict[str, int]] = {}
+        for text_key, id_key, model in DIMENSIONS:
+            cache = self._ids[model]
+            values = {
+                record[text_key][:DIMENSION_VALUE_MAX_LENGTH]
+                for record in encoded
+                if record.get(text_key) is not None
+            }
+            missing = [value for value in values if value not in cache]
+            resolved = {}
+            if missing:
+                await db.execute(
+                    insert(model)
+                    .values([{"value": value} for value in missing])
+                    .on_conflict_do_nothing(index_elements=["value"])
+                )
+                result = await db.execute(select(model.value, model.id).where(model.value.in_(missing)))
+                resolved = registered[model] = dict(result.all())
+
+            for record in encoded:
+                value = record.pop(text_key, None)
+                if value is None:
+                    record[id_key] = None
+                else:
+                    value = value[:DIMENSION_VALUE_MAX_LENGTH]
+                    record[id_key] = resolved[value] if value in resolved else cache[value]
+
+        if registered:
+            await db.commit()
+            for model, resolved in registered.items():
+                cache = self._ids[model]
+                if len(cache) + len(resolved) > self.max_entries:
+                    cache.clear()
+                cache.update(resolved)
+        return encoded
+
+
+# アプリケーション全体で共有するキャッシュ
+audit_dimension_cache = AuditDimensionCache()
@@ -0,0 +1,163 @@
+"""
+Audit Log Policy Service
+ルートごとに操作履歴の記録方針（常に記録・エラー時のみ・サンプリング・メタデータのみ）を決定する
+
+設定（AUDIT_ROUTE_POLICIES）の書式:
+    "GET /api/daily-reports=sample:0.1,GET /api/customers/*=metadata,* /api/users=errors"
+
+- 左辺は「HTTPメソッド ルートテンプレート」（どちらも * などのワイルドカード可、先に書いたものが優先）
+- 右辺は always / errors / sample:<割合> / metadata / none
+- どのルールにも一致しない参照系リクエストは AUDIT_READ_POLICY に従う
+
+更新系（POST / PUT / PATCH / DELETE）とエラー応答（4xx / 5xx）は方針にかかわらず常に全項目を記録する。
+"""
+import random
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+
+from app.config import get_settings
+from app.metrics import metrics
+
+settings = get_settings()
+
+# 常に記録するHTTPメソッド
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+POLICY_ALWAYS = "always"
+POLICY_ERRORS = "errors"
+POLICY_SAMPLE = "sample"
+POLICY_METADATA = "metadata"
+POLICY_NONE = "none"
+
+POLICY_MODES = {POLICY_ALWAYS, POLICY_ERRORS, POLICY_SAMPLE, POLICY_METADATA, POLICY_NONE}
+
+records_skipped = metrics.counter("audit_records_skipped_total", "記録方針により記録しなかった操作履歴の件数")
+
+
+@dataclass(frozen=True)
+class AuditPolicy:
+    """1ルートの記録方針"""
+
+    mode: str = POLICY_ALWAYS
+    sample_rate: float = 1.0
+
+
+@dataclass(frozen=True)
+class AuditDecision:
+    """1リクエストの記録内容"""
+
+    record: bool
+    include_details: bool = True
+
+
+def parse_policy(value: str) -> AuditPolicy:
+    """
+    方針の文字列を解釈
+
+    Args:
+        value: always / errors / sample:<0〜1> / metadata / none
+
+    Returns:
+        記録方針
+
+    Raises:
+        ValueError: 書式が不正な場合
+    """
+    mode, _, argument = value.strip().partition(":")
+    mode = mode.strip().lower()
+    if mode not in POLICY_MODES:
+        raise ValueError(f"操作履歴の記録方針が不正です: {value}")
+    if mode == POLICY_SAMPLE:
+        sample_rate = float(argument)
+        if not 0 <= sample_rate <= 1:
+            raise ValueError(f"サンプリング割合は0〜1で指定してください: {value}")
+        return AuditPolicy(mode=mode, sample_rate=sample_rate)
+    if argument:
+        raise ValueError(f"操作履歴の記録方針が不正です: {value}")
+    return AuditPolicy(mode=mode)
+
+
+def parse_route_policies(value: str) -> list[tuple[str, str, AuditPolicy]]:
+    """
+    ルートごとの方針設定を解釈
+
+    Returns:
+        (メソッドのパターン, ルートのパターン, 方針) のリスト（設定順）
+
+    Raises:
+        ValueError: 書式が不正な場合
+    """
+    rules = []
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        target, separator, policy = item.rpartition("=")
+        parts = target.split()
+        if not separator or len(parts) != 2:
+            raise ValueError(f"操作履歴の記録方針の設定が不正です: {item}")
+        rules.append((parts[0].upper(), parts[1], parse_policy(policy)))
+    return rules
+
+
+class AuditPolicyResolver:
+    """ルートテンプレートから記録方針を決定（結果はルートごとにキャッシュ）"""
+
+    def __init__(self, rules: list[tuple[str, str, AuditPolicy]], default: AuditPolicy):
+        self.rules = rules
+        self.default = default
+        self._cache: dict[tuple[str, str | None], AuditPolicy] = {}
+
+    def policy_for(self, method: str, route: str | None) -> AuditPolicy:
+        """
+        リクエストに適用する方針を取得
+
+        Args:
+            method: HTTPメソッド
+            route: ルートテンプレート（未マッチの場合はNone）
+        """
+        if method in WRITE_METHODS:
+            return AuditPolicy(mode=POLICY_ALWAYS)
+        key = (method, route)
+        policy = self._cache.get(key)
+        if policy is None:
+            policy = self.default
+            for method_pattern, route_pattern, rule_policy in self.rules:
+                if fnmatchcase(method, method_pattern) and fnmatchcase(route or "", route_pattern):
+                    policy = rule_policy
+                    break
+            self._cache[key] = policy
+        return policy
+
+    def decide(self, method: str, route: str | None, status_code: int) -> AuditDecision:
+        """
+        リクエストを記録するか、どこまで記録するかを決定
+
+        Args:
+            method: HTTPメソッド
+            route: ルートテンプレート
+            status_code: レスポンスステータスコード
+
+        Returns:
+            記録内容
+        """
+        # エラー応答は常に全項目を記録する
+        if status_code >= 400:
+            return AuditDecision(record=True)
+
+        policy = self.policy_for(method, route)
+        if policy.mode == POLICY_ALWAYS:
+            return AuditDecision(record=True)
+        if policy.mode == POLICY_METADATA:
+            return AuditDecision(record=True, include_details=False)
+        if policy.mode == POLICY_SAMPLE and random.random() < policy.sample_rate:
+            return AuditDecision(record=True)
+
+        records_skipped.inc(mode=policy.mode)
+        return AuditDecision(record=False)
+
+
+# アプリケーション全体で共有する方針（設定が不正な場合は起動時にエラー）
+audit_policy_resolver = AuditPolicyResolver(
+    rules=parse_route_policies(settings.AUDIT_ROUTE_POLICIES),
+    default=parse_policy(settings.AUDIT_READ_POLICY),
+)
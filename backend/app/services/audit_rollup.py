@@ -0,0 +1,222 @@
+"""
+Audit Log Rollup Service
+リクエストメトリクスをプロセス内で1分単位・1時間単位に集計し、差分をまとめてDBへ書き込む
+"""
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.audit_log_rollup import AuditLogRollup, LATENCY_BUCKETS, BUCKET_MINUTE, BUCKET_HOUR
+
+logger = logging.getLogger(__name__)
+
+# ルートにマッチしなかったリクエスト（404など）の集計キー
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def truncate_to_bucket(moment: datetime, bucket_minutes: int = BUCKET_MINUTE) -> datetime:
+    """日時を集計区間の開始時刻に切り捨てる（タイムゾーンなしの場合はUTCとみなす）"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    moment = moment.replace(second=0, microsecond=0)
+    if bucket_minutes == BUCKET_HOUR:
+        moment = moment.replace(minute=0)
+    return moment
+
+
+def latency_bucket_index(response_time_ms: int) -> int:
+    """レスポンス時間が属するヒストグラムバケットの位置を返す"""
+    for index, (upper_bound, _) in enumerate(LATENCY_BUCKETS):
+        if upper_bound is None or response_time_ms <= upper_bound:
+            return index
+    return len(LATENCY_BUCKETS) - 1
+
+
+@dataclass
+class RollupDelta:
+    """1つの集計キーに対する未書き込みの差分"""
+
+    request_count: int = 0
+    error_count: int = 0
+    latency_sum_ms: int = 0
+    latency_min_ms: int | None = None
+    latency_max_ms: int | None = None
+    buckets: list[int] = field(default_factory=lambda: [0] * len(LATENCY_BUCKETS))
+
+    def add(self, status_code: int, response_time_ms: int):
+        self.request_count += 1
+        if status_code >= 500:
+            self.error_count += 1
+        self.latency_sum_ms += response_time_ms
+        if self.latency_min_ms is None or response_time_ms < self.latency_min_ms:
+            self.latency_min_ms = response_time_ms
+        if self.latency_max_ms is None or response_time_ms > self.latency_max_ms:
+            self.latency_max_ms = response_time_ms
+        self.buckets[latency_bucket_index(response_time_ms)] += 1
+
+    def merge(self, other: "RollupDelta"):
+        self.request_count += other.request_count
+        self.error_count += other.error_count
+        self.latency_sum_ms += other.latency_sum_ms
+        if other.latency_min_ms is not None:
+            self.latency_min_ms = (
+                other.latency_min_ms
+                if self.latency_min_ms is None
+                else min(self.latency_min_ms, other.latency_min_ms)
+            )
+        if other.latency_max_ms is not None:
+            self.latency_max_ms = (
+                other.latency_max_ms
+                if self.latency_max_ms is None
+                else max(self.latency_max_ms, other.latency_max_ms)
+            )
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+
+# 集計キー: (bucket_minutes, bucket_start, route, method, status_class, company_id)
+RollupKey = tuple[int, datetime, str, str, int, int | None]
+
+
+class AuditRollupAggregator:
+    """
+    リクエストメトリクスの集計器
+
+    リクエストごとにDBの集計行を更新すると同一行への書き込みが集中するため、
+    プロセス内で差分を溜めておき、flush() でまとめて UPSERT する。
+    """
+
+    def __init__(self):
+        self._pending: dict[RollupKey, RollupDelta] = {}
+
+    @property
+    def pending_count(self) -> int:
+        """未書き込みの集計キー数"""
+        return len(self._pending)
+
+    def record(
+        self,
+        route: str | None,
+        method: str,
+        status_code: int,
+        company_id: int | None,
+        response_time_ms: int,
+        occurred_at: datetime | None = None,
+    ):
+        """
+        1リクエスト分のメトリクスを記録
+
+        Args:
+            route: ルートテンプレート（未マッチの場合はNone）
+            method: HTTPメソッド
+            status_code: レスポンスステータスコード
+            company_id: 企業ID
+            response_time_ms: レスポンス時間（ミリ秒）
+            occurred_at: リクエスト日時（省略時は現在時刻）
+        """
+        occurred_at = occurred_at or datetime.now(timezone.utc)
+        route = route or UNMATCHED_ROUTE
+        status_class = status_code // 100
+        # 1分単位と1時間単位の両方に加算する
+        for bucket_minutes in (BUCKET_MINUTE, BUCKET_HOUR):
+            key = (
+                bucket_minutes,
+                truncate_to_bucket(occurred_at, bucket_minutes),
+                route,
+                method,
+                status_class,
+                company_id,
+            )
+            delta = self._pending.get(key)
+            if delta is None:
+                delta = self._pending[key] = RollupDelta()
+            delta.add(status_code, response_time_ms)
+
+    def drain(self) -> dict[RollupKey, RollupDelta]:
+        """未書き込みの差分を取り出してクリア"""
+        pending, self._pending = self._pending, {}
+        return pending
+
+    def restore(self, pending: dict[RollupKey, RollupDelta]):
+        """書き込みに失敗した差分を戻す（次回のflushで再試行）"""
+        for key, delta in pending.items():
+            current = self._pending.get(key)
+            if current is None:
+                self._pending[key] = delta
+            else:
+                current.merge(delta)
+
+    async def flush(self, db: AsyncSession) -> int:
+        """
+        溜まった差分を集計テーブルへ UPSERT
+
+        接続エラーなどで失敗した差分は戻して次回に再試行する。値が原因でDBに拒否された場合（DataError など）は
+        再試行しても成功せず以降の書き込みをすべて妨げるため、その回の差分は破棄する。
+
+        Args:
+            db: データベースセッション
+
+        Returns:
+            書き込んだ集計キー数
+        """
+        pending = self.drain()
+        if not pending:
+            return 0
+
+        rows = []
+        for (bucket_minutes, bucket_start, route, method, status_class, company_id), delta in pending.items():
+            row = {
+                "bucket_minutes": bucket_minutes,
+                "bucket_start": bucket_start,
+                "route": route,
+                "method": method,
+                "status_class": status_class,
+                "company_id": company_id,
+                "request_count": delta.request_count,
+                "error_count": delta.error_count,
+                "latency_sum_ms": delta.latency_sum_ms,
+                "latency_min_ms": delta.latency_min_ms,
+                "latency_max_ms": delta.latency_max_ms,
+            }
+            for (_, column_name), count in zip(LATENCY_BUCKETS, delta.buckets):
+                row[column_name] = count
+            rows.append(row)
+
+        stmt = insert(AuditLogRollup).values(rows)
+        table = AuditLogRollup.__table__
+        update_columns = {
+            "request_count": table.c.request_count + stmt.excluded.request_count,
+            "error_count": table.c.error_count + stmt.excluded.error_count,
+            "latency_sum_ms": table.c.latency_sum_ms + stmt.excluded.latency_sum_ms,
+            "latency_min_ms": func.least(table.c.latency_min_ms, stmt.excluded.latency_min_ms),
+            "latency_max_ms": func.greatest(table.c.latency_max_ms, stmt.excluded.latency_max_ms),
+        }
+        for _, column_name in LATENCY_BUCKETS:
+            update_columns[column_name] = table.c[column_name] + stmt.excluded[column_name]
+
+        try:
+            await db.execute(
+                stmt.on_conflict_do_update(
+                    constraint="uq_audit_log_rollups_key",
+                    set_=update_columns,
+                )
+            )
+            await db.commit()
+        except (DataError, IntegrityError):
+            await db.rollback()
+            logger.error(f"DBに拒否されたリクエストメトリクス集計を破棄しました: {len(rows)}件")
+            raise
+        except Exception:
+            await db.rollback()
+            self.restore(pending)
+            raise
+
+        return len(rows)
+
+
+# アプリケーション全体で共有する集計器
+audit_rollup_aggregator = AuditRollupAggregator()
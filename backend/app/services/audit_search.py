@@ -0,0 +1,118 @@
+"""
+Audit Log Search Service
+操作履歴をキーセットページネーション（created_at, id の降順）で検索する
+
+OFFSET を使わず前ページ末尾の (created_at, id) より古い行から読み始めるため、
+(company_id, created_at, id) / (user_id, created_at, id) のインデックスにより
+何ページ目でも同じコストで取得できる。
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.audit_log import AuditLog
+
+
+def encode_cursor(created_at: datetime, audit_log_id: int) -> str:
+    """次ページ取得用のカーソルを生成"""
+    payload = json.dumps([created_at.isoformat(), audit_log_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    カーソルを解釈
+
+    Returns:
+        (created_at, id)
+
+    Raises:
+        ValueError: カーソルが不正な場合
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, audit_log_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(audit_log_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError("カーソルが不正です") from e
+
+
+async def search_audit_logs(
+    db: AsyncSession,
+    company_id: int,
+    user_id: int | None = None,
+    route: str | None = None,
+    method: str | None = None,
+    status_code: int | None = None,
+    status_class: int | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    request_body_contains: dict | None = None,
+    query_params_contains: dict | None = None,
+    cursor: str | None = None,
+    limit: int = 50,
+) -> tuple[list[AuditLog], str | None]:
+    """
+    企業の操作履歴を新しい順に検索
+
+    Args:
+        db: データベースセッション
+        company_id: 企業ID
+        user_id: 操作ユーザーIDで絞り込み
+        route: ルートテンプレートで絞り込み
+        method: HTTPメソッドで絞り込み
+        status_code: ステータスコードで絞り込み
+        status_class: ステータス区分で絞り込み（4=4xx, 5=5xx など）
+        start: この日時以降
+        end: この日時より前
+        request_body_contains: リクエストボディに含まれるJSON（@> による包含検索）
+        query_params_contains: クエリパラメータに含まれるJSON（@> による包含検索）
+        cursor: 前ページの next_cursor
+        limit: 取得件数
+
+    Returns:
+        (操作履歴のリスト, 次ページのカーソル（最終ページの場合はNone）)
+
+    Raises:
+        ValueError: カーソルが不正な場合
+    """
+    query = select(AuditLog).where(AuditLog.company_id == company_id)
+    if user_id is not None:
+        query = query.where(AuditLog.user_id == user_id)
+    if route:
+        query = query.where(AuditLog.route == route)
+    if method:
+        query = query.where(AuditLog.method == method.upper())
+    if status_code is not None:
+        query = query.where(AuditLog.status_code == status_code)
+    if status_class is not None:
+        query = query.where(
+            AuditLog.status_code >= status_class * 100,
+            AuditLog.status_code < (status_class + 1) * 100,
+        )
+    if start is not None:
+        query = query.where(AuditLog.created_at >= start)
+    if end is not None:
+        query = query.where(AuditLog.created_at < end)
+    if request_body_contains is not None:
+        query = query.where(AuditLog.request_body.contains(request_body_contains))
+    if query_params_contains is not None:
+        query = query.where(AuditLog.query_params.contains(query_params_contains))
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        query = query.where(tuple_(AuditLog.created_at, AuditLog.id) < tuple_(cursor_created_at, cursor_id))
+
+    # 次ページの有無を判定するため1件多く取得
+    query = query.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(limit + 1)
+    result = await db.execute(query)
+    audit_logs = list(result.scalars().all())
+
+    next_cursor = None
+    if len(audit_logs) > limit:
+        audit_logs = audit_logs[:limit]
+        last = audit_logs[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return audit_logs, next_cursor
@@ -0,0 +1,541 @@
+"""
+Audit Log Writer Service
+操作履歴をキュー経由でまとめてDBへ書き込み、DB障害時はローカルディスクへ退避する
+
+書き込みの流れ:
+    ミドルウェア → submit() → キュー → バッチINSERT
+                                 ↓ 失敗・キュー満杯
+                      ローカルセグメントファイル（WAL）
+                                 ↓ DB復旧後
+                           一括再投入（replay）
+
+DB障害中もリクエスト処理がDBのタイムアウトを待たないよう、書き込みに失敗した後は
+しばらくDBへの書き込みを試みずに直接退避する。
+
+値が原因でDBに拒否されたバッチ（DataError など、再試行しても成功しない）は二分して書き込める行だけを書き込み、
+拒否された行は隔離ファイル（.bad）へ移す。DB障害とはみなさず、退避・再投入の対象にもしない。
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.metrics import metrics
+from app.models.audit_log import AuditLog
+from app.services.audit_dimensions import AuditDimensionCache, audit_dimension_cache
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 1セグメントファイルの上限サイズ（超えたら次のファイルへ切り替える）
+SEGMENT_MAX_BYTES = 8 * 1024 * 1024
+
+# キューからバッチを組み立てる際の最大待ち時間（秒）
+BATCH_WAIT_SECONDS = 0.5
+
+# 書き込み失敗後、DBへの書き込みを再開するまでの時間（秒）
+DB_RETRY_SECONDS = 5.0
+
+# 退避済みセグメントの再投入を確認する間隔（秒）
+REPLAY_INTERVAL_SECONDS = 5.0
+
+# JSONB で保存する項目（ミドルウェアからはシリアライズ済みの文字列で渡される）
+JSON_FIELDS = ("request_body", "query_params")
+
+SEGMENT_SUFFIX = ".wal"
+# 書き込み中のセグメント（封印時に SEGMENT_SUFFIX へリネームする）
+ACTIVE_SUFFIX = ".wal.open"
+# 再投入中のセグメント（再投入するワーカーがリネームで確保し、末尾にプロセスIDを付ける）
+REPLAYING_SUFFIX = ".wal.replaying"
+# DBに拒否された行の隔離ファイル（再投入の対象外、調査・手動での復旧用）
+QUARANTINE_SUFFIX = ".bad"
+
+records_written = metrics.counter("audit_records_written_total", "DBへ書き込んだ操作履歴の件数")
+records_spilled = metrics.counter("audit_records_spilled_total", "ローカルディスクへ退避した操作履歴の件数")
+records_replayed = metrics.counter("audit_records_replayed_total", "ローカルディスクから再投入した操作履歴の件数")
+write_failures = metrics.counter("audit_write_failures_total", "操作履歴のDB書き込み失敗回数")
+records_quarantined = metrics.counter(
+    "audit_records_quarantined_total", "DBに拒否されたため隔離ファイルへ移した操作履歴の件数"
+)
+
+
+def _serialize_record(record: dict) -> str:
+    return json.dumps(
+        {key: value.isoformat() if isinstance(value, datetime) else value for key, value in record.items()},
+        ensure_ascii=False,
+    )
+
+
+def _deserialize_record(line: bytes) -> dict:
+    record = json.loads(line)
+    if record.get("created_at"):
+        record["created_at"] = datetime.fromisoformat(record["created_at"])
+    return record
+
+
+def _drop_invalid_json(record: dict) -> dict:
+    """JSONB に格納できない request_body / query_params を NULL にする"""
+    record = dict(record)
+    for key in JSON_FIELDS:
+        value = record.get(key)
+        if not isinstance(value, str):
+            continue
+        try:
+            json.loads(value)
+        except ValueError:
+            record[key] = None
+            continue
+        # JSONB は文字列中の NUL 文字を格納できない
+        if "\\u0000" in value:
+            record[key] = None
+    return record
+
+
+def _process_exists(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class AuditWriteAheadLog:
+    """
+    操作履歴の退避先（追記専用のセグメントファイル）
+
+    ファイル名: segment-{作成時刻(ミリ秒)}-{プロセスID}-{連番}.wal（1行1レコードのJSON）
+    書き込み中は末尾に .open を付け、封印（リネーム）したものだけを再投入の対象にするため、
+    複数ワーカーで同じディレクトリを共有しても書き込み中のファイルを読むことはない。
+    再投入するワーカーは読み込む前に .replaying.{プロセスID} へリネームしてセグメントを確保するため、
+    同じセグメントを複数のワーカーが再投入することはない。
+
+    append（ディスクへの同期を含む）はイベントループを止めないよう別スレッドから呼ばれるため、
+    書き込み中のファイルの操作はロックで直列化する。
+    """
+
+    def __init__(self, directory: str | Path, segment_max_bytes: int = SEGMENT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.segment_max_bytes = segment_max_bytes
+        self._active_path: Path | None = None
+        self._active_file = None
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def _segments(self) -> list[Path]:
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob("segment-*.wal*"))
+
+    @staticmethod
+    def _created_at(path: Path) -> float:
+        """セグメントの作成時刻（UNIX時間）"""
+        return int(path.name.split("-")[1]) / 1000
+
+    @property
+    def size_bytes(self) -> int:
+        """退避中の全セグメントの合計サイズ"""
+        total = 0
+        for path in self._segments():
+            try:
+                total += path.stat().st_size
+            except FileNotFoundError:
+                pass
+        return total
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._segments())
+
+    def oldest_age_seconds(self) -> float:
+        """最も古い未投入セグメントの経過時間（再投入の遅れ）"""
+        segments = self._segments()
+        if not segments:
+            return 0.0
+        return max(time.time() - self._created_at(segments[0]), 0.0)
+
+    def append(self, records: list[dict]):
+        """レコードを書き込み中のセグメントへ追記（ディスクへの同期まで行う）"""
+        if not records:
+            return
+        with self._lock:
+            self._append(records)
+
+    def _append(self, records: list[dict]):
+        if self._active_file is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._sequence += 1
+            self._active_path = self.directory / (
+                f"segment-{int(time.time() * 1000):013d}-{os.getpid()}-{self._sequence:06d}{ACTIVE_SUFFIX}"
+            )
+            self._active_file = self._active_path.open("ab")
+
+        self._active_file.write(("\n".join(_serialize_record(r) for r in records) + "\n").encode("utf-8"))
+        self._active_file.flush()
+        os.fsync(self._active_file.fileno())
+
+        if self._active_file.tell() >= self.segment_max_bytes:
+            self._seal()
+
+    def seal(self):
+        """書き込み中のセグメントを閉じて再投入の対象にする"""
+        with self._lock:
+            self._seal()
+
+    def _seal(self):
+        if self._active_file is not None:
+            self._active_file.close()
+            os.replace(self._active_path, self._active_path.with_name(self._active_path.name[: -len(".open")]))
+            self._active_file = None
+            self._active_path = None
+
+    def recover(self):
+        """
+        異常終了したプロセスが残したセグメントを再投入の対象に戻す
+
+        書き込み中（.open）のまま残したものは封印し、再投入中（.replaying.{プロセスID}）のまま残したものは確保を解く。
+        """
+        for path in self._segments():
+            if path.name.endswith(ACTIVE_SUFFIX):
+                if path == self._active_path:
+                    continue
+                pid = int(path.name.split("-")[2])
+                if pid != os.getpid() and _process_exists(pid):
+                    continue
+                os.replace(path, path.with_name(path.name[: -len(".open")]))
+                logger.info(f"書き込み中のまま残った操作履歴の退避ファイルを封印しました: {path.name}")
+            elif REPLAYING_SUFFIX in path.name:
+                pid = int(path.name.rsplit(".", 1)[1])
+                if pid != os.getpid() and _process_exists(pid):
+                    continue
+                self.release(path)
+                logger.info(f"再投入中のまま残った操作履歴の退避ファイルを戻しました: {path.name}")
+
+    def sealed_segments(self) -> list[Path]:
+        """再投入の対象となるセグメント（古い順）"""
+        return [path for path in self._segments() if path.name.endswith(SEGMENT_SUFFIX)]
+
+    @staticmethod
+    def claim(path: Path) -> Path | None:
+        """
+        再投入するセグメントを確保（リネームは原子的なため、同時に確保できるワーカーは1つ）
+
+        Returns:
+            確保したセグメントのパス（他のワーカーが確保済みの場合はNone）
+        """
+        claimed = path.with_name(f"{path.name[: -len(SEGMENT_SUFFIX)]}{REPLAYING_SUFFIX}.{os.getpid()}")
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            return None
+        return claimed
+
+    @staticmethod
+    def release(path: Path):
+        """確保したセグメントを再投入の対象に戻す"""
+        os.replace(path, path.with_name(path.name[: path.name.index(REPLAYING_SUFFIX)] + SEGMENT_SUFFIX))
+
+    @staticmethod
+    def read_segment(path: Path) -> list[dict]:
+        """
+        セグメントを読み込む
+
+        書き込み途中で停止した場合の末尾の不完全な行は読み飛ばす。
+        """
+        records = []
+        with path.open("rb") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    records.append(_deserialize_record(line))
+                except ValueError:
+                    logger.warning(f"操作履歴の退避ファイルに不正な行があります: {path.name}:{line_number}")
+        return records
+
+    @staticmethod
+    def remove(path: Path):
+        path.unlink(missing_ok=True)
+
+    def quarantine(self, records: list[dict]) -> Path:
+        """
+        DBに拒否されたレコードを隔離ファイルへ書き込む（再投入の対象外）
+
+        Returns:
+            隔離ファイルのパス
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._sequence += 1
+            path = self.directory / (
+                f"rejected-{int(time.time() * 1000):013d}-{os.getpid()}-{self._sequence:06d}{QUARANTINE_SUFFIX}"
+            )
+        with path.open("ab") as f:
+            f.write(("\n".join(_serialize_record(r) for r in records) + "\n").encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        return path
+
+
+class AuditWriter:
+    """
+    操作履歴の書き込み器
+
+    start() 前（テストやスクリプト）は submit() 時にその場で書き込む。
+    start() 後はキューへ積むだけで戻り、バックグラウンドタスクがバッチで書き込む。
+    """
+
+    def __init__(
+        self,
+        wal_dir: str | Path,
+        session_factory=AsyncSessionLocal,
+        queue_size: int = 10000,
+        batch_size: int = 500,
+        write_timeout: float = 5.0,
+        dimensions: AuditDimensionCache = audit_dimension_cache,
+    ):
+        self.wal = AuditWriteAheadLog(wal_dir)
+        self.session_factory = session_factory
+        self.dimensions = dimensions
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.write_timeout = write_timeout
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._db_unavailable_until = 0.0
+
+    @property
+    def started(self) -> bool:
+        return self._queue is not None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        """バックグラウンドでの書き込みと再投入を開始"""
+        if self.started:
+            return
+        self.wal.recover()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [
+            asyncio.create_task(self._consume(), name="audit_writer_consume"),
+            asyncio.create_task(self._replay_loop(), name="audit_writer_replay"),
+        ]
+        logger.info("操作履歴の書き込みを開始しました")
+
+    async def stop(self):
+        """キューに残った操作履歴を書き込んで停止（書き込めない分は退避する）"""
+        if not self.started:
+            return
+        consume_task, replay_task = self._tasks
+        replay_task.cancel()
+        # 終了の合図を積み、それまでに積まれた分を書き込み終えるのを待つ
+        await self._queue.put(None)
+        await asyncio.gather(consume_task, replay_task, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        await asyncio.to_thread(self.wal.seal)
+        logger.info("操作履歴の書き込みを停止しました")
+
+    async def submit(self, record: dict):
+        """
+        操作履歴を書き込み対象に追加
+
+        Args:
+            record: audit_logs のカラム名をキーとする辞書
+        """
+        # 退避・再投入されても記録時刻が変わらないよう、ここで確定する
+        record.setdefault("created_at", datetime.now(timezone.utc))
+        if not self.started:
+            await self._write_or_spill([record])
+            return
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            await self._spill([record])
+
+    async def _insert(self, records: list[dict]):
+        retried_dimensions = False
+        sanitized = False
+        while True:
+            async with self.session_factory() as db:
+                try:
+                    encoded = await self.dimensions.encode(db, records)
+                    await db.execute(insert(AuditLog.__table__), encoded)
+                    await db.commit()
+                    return
+                except IntegrityError:
+                    await db.rollback()
+                    if retried_dimensions:
+                        raise
+                    # 辞書テーブルが作り直された場合などキャッシュ済みのIDが存在しないときは取り直す
+                    self.dimensions.clear()
+                    retried_dimensions = True
+                except DataError:
+                    await db.rollback()
+                    if sanitized:
+                        raise
+                    # ミドルウェアはJSONを検証せずに渡すため、DBに拒否された場合のみ不正な値を除外する
+                    records = [_drop_invalid_json(record) for record in records]
+                    sanitized = True
+                except Exception:
+                    await db.rollback()
+                    raise
+
+    async def _insert_valid(self, records: list[dict], timeout: float) -> list[dict]:
+        """
+        書き込めるレコードを書き込む
+
+        値が原因で拒否された場合はバッチを二分して書き込み直し、拒否された行だけを残す。
+
+        Args:
+            records: 書き込むレコード
+            timeout: 1回のINSERTのタイムアウト（秒）
+
+        Returns:
+            DBに拒否されたレコード
+
+        Raises:
+            Exception: 接続エラー・タイムアウトなど値によらない失敗の場合
+        """
+        try:
+            await asyncio.wait_for(self._insert(records), timeout=timeout)
+            return []
+        except (DataError, IntegrityError) as e:
+            if len(records) == 1:
+                logger.warning(f"操作履歴がDBに拒否されました: {e}")
+                return records
+        middle = len(records) // 2
+        return await self._insert_valid(records[:middle], timeout) + await self._insert_valid(records[middle:], timeout)
+
+    async def _quarantine(self, records: list[dict]):
+        try:
+            path = await asyncio.to_thread(self.wal.quarantine, records)
+            records_quarantined.inc(len(records))
+            logger.error(f"DBに拒否された操作履歴を隔離しました（{len(records)}件）: {path.name}")
+        except OSError as e:
+            logger.error(f"操作履歴の隔離に失敗しました（{len(records)}件を破棄）: {e}")
+
+    async def _write_or_spill(self, records: list[dict]):
+        """DBへ書き込み、失敗した場合（障害中は書き込みを試みずに）ローカルディスクへ退避"""
+        if time.monotonic() < self._db_unavailable_until:
+            await self._spill(records)
+            return
+        try:
+            rejected = await self._insert_valid(records, self.write_timeout)
+            records_written.inc(len(records) - len(rejected))
+        except Exception as e:
+            write_failures.inc()
+            self._db_unavailable_until = time.monotonic() + DB_RETRY_SECONDS
+            logger.error(f"操作履歴のDB保存に失敗したためローカルに退避します: {e}")
+            await self._spill(records)
+            return
+        if rejected:
+            await self._quarantine(rejected)
+
+    async def _spill(self, records: list[dict]):
+        try:
+            # ディスクへの同期（fsync）でイベントループを止めないよう別スレッドで書き込む
+            await asyncio.to_thread(self.wal.append, records)
+            records_spilled.inc(len(records))
+        except OSError as e:
+            logger.error(f"操作履歴の退避に失敗しました（{len(records)}件を破棄）: {e}")
+
+    async def _consume(self):
+        """キューから取り出してバッチで書き込む（None を受け取ったら終了）"""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            record = await self._queue.get()
+            if record is None:
+                break
+            batch = [record]
+            deadline = loop.time() + BATCH_WAIT_SECONDS
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    record = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if record is None:
+                    stopping = True
+                    break
+                batch.append(record)
+            await self._write_or_spill(batch)
+
+    async def replay(self) -> int:
+        """
+        退避済みの操作履歴をDBへ一括で再投入
+
+        セグメント単位で1トランザクションとし、成功したセグメントのみ削除する。
+        DBに拒否された行は隔離ファイルへ移し、残りの行を書き込んだうえでセグメントを削除する。
+        接続エラーなどで失敗した場合はセグメントの確保を解き、以降のセグメントを次回に回す。
+        他のワーカーが確保済みのセグメントは読み飛ばす。
+
+        Returns:
+            再投入した件数
+        """
+        if time.monotonic() < self._db_unavailable_until:
+            return 0
+        # 書き込み中のセグメントも対象にする（以降の退避は新しいセグメントへ）
+        await asyncio.to_thread(self.wal.seal)
+
+        replayed_count = 0
+        for segment in self.wal.sealed_segments():
+            path = self.wal.claim(segment)
+            if path is None:
+                continue
+            records = await asyncio.to_thread(self.wal.read_segment, path)
+            try:
+                rejected = await self._insert_valid(records, self.write_timeout * 4) if records else []
+            except Exception as e:
+                self.wal.release(path)
+                write_failures.inc()
+                self._db_unavailable_until = time.monotonic() + DB_RETRY_SECONDS
+                logger.warning(f"退避した操作履歴の再投入に失敗しました（次回再試行）: {e}")
+                break
+            if rejected:
+                await self._quarantine(rejected)
+            self.wal.remove(path)
+            records_replayed.inc(len(records) - len(rejected))
+            replayed_count += len(records) - len(rejected)
+
+        if replayed_count:
+            logger.info(f"退避した操作履歴を再投入しました: {replayed_count}件")
+        return replayed_count
+
+    async def _replay_loop(self):
+        while True:
+            await asyncio.sleep(REPLAY_INTERVAL_SECONDS)
+            if self.wal.segment_count:
+                try:
+                    await self.replay()
+                except Exception as e:
+                    logger.error(f"操作履歴の再投入でエラーが発生しました: {e}")
+
+
+# アプリケーション全体で共有する書き込み器
+audit_writer = AuditWriter(
+    wal_dir=settings.AUDIT_WAL_DIR,
+    queue_size=settings.AUDIT_QUEUE_SIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    write_timeout=settings.AUDIT_WRITE_TIMEOUT_SECONDS,
+)
+
+metrics.gauge("audit_spill_bytes", "ローカルディスクに退避中の操作履歴のサイズ（バイト）", lambda: audit_writer.wal.size_bytes)
+metrics.gauge("audit_spill_segments", "ローカルディスクに退避中のセグメント数", lambda: audit_writer.wal.segment_count)
+metrics.gauge("audit_replay_lag_seconds", "最も古い未投入セグメントの経過時間（秒）", lambda: audit_writer.wal.oldest_age_seconds())
+metrics.gauge("audit_queue_depth", "書き込み待ちの操作履歴の件数", lambda: audit_writer.queue_depth)
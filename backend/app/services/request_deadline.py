@@ -0,0 +1,175 @@
+"""
+Request Deadline Service
+ルートごとにリクエストの制限時間（デッドライン）を決定し、リクエスト中のSQLへ statement_timeout として伝える
+
+設定（REQUEST_DEADLINES）の書式:
+    "GET /api/subscriptions/history=5,POST /api/*/import=60,GET /api/health=0"
+
+- 左辺は「HTTPメソッド ルートテンプレート」（どちらも * などのワイルドカード可、先に書いたものが優先）
+- 右辺は制限時間（秒、0 で無制限）
+- どのルールにも一致しないリクエストは REQUEST_DEADLINE_SECONDS に従う
+
+DatabaseRoute がハンドラーの開始時にデッドラインを設定し、トランザクションのSQLの前に残り時間を
+トランザクション内の statement_timeout として設定する（app.database._apply_statement_timeout）。
+残り時間を使い切った後のSQLは実行せずに DeadlineExceeded を送出する。
+"""
+import math
+import time
+from contextvars import ContextVar, Token
+from fnmatch import fnmatchcase
+
+from sqlalchemy import Engine, event
+from sqlalchemy.exc import DBAPIError
+
+from app.config import get_settings
+from app.metrics import metrics
+
+settings = get_settings()
+
+# statement_timeout によるキャンセル（query_canceled）
+QUERY_CANCELED_SQLSTATE = "57014"
+
+deadline_exceeded = metrics.counter(
+    "request_deadline_exceeded_total",
+    "制限時間を超えて 503 を返したリクエスト数",
+)
+
+
+class DeadlineExceeded(RuntimeError):
+    """リクエストの制限時間を超えた"""
+
+
+def parse_route_deadlines(value: str) -> list[tuple[str, str, float]]:
+    """
+    ルートごとの制限時間の設定を解釈
+
+    Returns:
+        (メソッドのパターン, ルートのパターン, 秒数) のリスト（設定順）
+
+    Raises:
+        ValueError: 書式が不正な場合
+    """
+    rules = []
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        target, separator, seconds = item.rpartition("=")
+        parts = target.split()
+        if not separator or len(parts) != 2:
+            raise ValueError(f"リクエストの制限時間の設定が不正です: {item}")
+        try:
+            deadline = float(seconds)
+        except ValueError:
+            raise ValueError(f"リクエストの制限時間の設定が不正です: {item}") from None
+        if deadline < 0:
+            raise ValueError(f"リクエストの制限時間は0以上で指定してください: {item}")
+        rules.append((parts[0].upper(), parts[1], deadline))
+    return rules
+
+
+class DeadlineResolver:
+    """ルートテンプレートから制限時間を決定（結果はルートごとにキャッシュ）"""
+
+    def __init__(self, rules: list[tuple[str, str, float]], default: float):
+        self.rules = rules
+        self.default = default
+        self._cache: dict[tuple[str, str], float] = {}
+
+    def deadline_for(self, method: str, route: str) -> float:
+        """
+        リクエストに適用する制限時間を取得
+
+        Args:
+            method: HTTPメソッド
+            route: ルートテンプレート
+
+        Returns:
+            秒数（0 は無制限）
+        """
+        key = (method, route)
+        deadline = self._cache.get(key)
+        if deadline is None:
+            deadline = self.default
+            for method_pattern, route_pattern, rule_deadline in self.rules:
+                if fnmatchcase(method, method_pattern) and fnmatchcase(route, route_pattern):
+                    deadline = rule_deadline
+                    break
+            self._cache[key] = deadline
+        return deadline
+
+
+deadline_resolver = DeadlineResolver(
+    parse_route_deadlines(settings.REQUEST_DEADLINES),
+    settings.REQUEST_DEADLINE_SECONDS,
+)
+
+# 現在のリクエストのデッドライン（time.monotonic() の値）
+_deadline: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+
+
+def start_deadline(seconds: float) -> Token:
+    """現在のリクエストのデッドラインを設定（0 以下は無制限）"""
+    return _deadline.set(time.monotonic() + seconds if seconds > 0 else None)
+
+
+def reset_deadline(token: Token):
+    """デッドラインを元に戻す"""
+    _deadline.reset(token)
+
+
+def remaining_seconds() -> float | None:
+    """デッドラインまでの残り秒数（デッドラインがない場合はNone）"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def statement_timeout_ms() -> int | None:
+    """
+    トランザクションに設定する statement_timeout（ミリ秒）
+
+    Returns:
+        残り時間のミリ秒数（デッドラインがない場合はNone）
+
+    Raises:
+        DeadlineExceeded: 残り時間がない場合
+    """
+    remaining = remaining_seconds()
+    if remaining is None:
+        return None
+    if remaining <= 0:
+        raise DeadlineExceeded("リクエストの制限時間を超えました")
+    return max(math.ceil(remaining * 1000), 1)
+
+
+def is_deadline_error(error: BaseException) -> bool:
+    """
+    制限時間の超過（DeadlineExceeded または statement_timeout によるキャンセル）か
+
+    SQLAlchemy が変換した DBAPIError のほか、ドライバーの例外（asyncpg の QueryCanceledError など）も
+    SQLSTATE で判定する。
+    """
+    if isinstance(error, DeadlineExceeded):
+        return True
+    if isinstance(error, DBAPIError):
+        error = error.orig
+    return getattr(error, "sqlstate", None) == QUERY_CANCELED_SQLSTATE
+
+
+def check_deadline():
+    """
+    残り時間を使い切っていないか確認
+
+    Raises:
+        DeadlineExceeded: 残り時間がない場合
+    """
+    remaining = remaining_seconds()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded("リクエストの制限時間を超えました")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _check_deadline(conn, cursor, statement, parameters, context, executemany):
+    """残り時間を使い切った後のSQLを実行しない"""
+    check_deadline()
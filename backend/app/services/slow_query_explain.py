@@ -0,0 +1,172 @@
+"""
+Slow Query Explain Service
+実行時間が閾値（SQL_EXPLAIN_THRESHOLD_MS）を超えたSQLの実行計画を取得し、ワーカーごとのリングバッファに保持する
+
+サーバー側の auto_explain を使えない環境でも、本番環境での実行計画の変化を確認するためのもの。
+参照系のSQLは別の接続で EXPLAIN (ANALYZE, BUFFERS) により再実行し（トランザクションはロールバック）、
+更新系のSQLは再実行せず EXPLAIN のみ取得する。実行計画の取得はイベントループのタスクとして
+リクエストの処理とは別に行い、同時に1件まで・同一形状のSQLは SQL_EXPLAIN_COOLDOWN_SECONDS に1回までに制限する。
+同期エンジン（マイグレーション・スクリプト）のSQLは対象外。
+"""
+import asyncio
+import logging
+import random
+import re
+import time
+from collections import deque
+from contextvars import Context
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from sqlalchemy import Engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import get_settings
+from app.metrics import metrics
+from app.services.sql_commenter import strip_comment
+from app.services.sql_instrumentation import current_request_stats, normalize_statement, statement_fingerprint
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 実行計画を取得する接続の実行オプション（取得用のSQL自体は対象外にする）
+EXPLAIN_OPTION = "slow_query_explain"
+
+# 実行計画を取得する文（先頭のキーワード）
+_EXPLAINABLE_COMMANDS = {"SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "MERGE"}
+# 再実行すると副作用のある文（更新を含む CTE・行ロック・アドバイザリロック）
+_SIDE_EFFECT_PATTERN = re.compile(
+    r"\b(?:INSERT|UPDATE|DELETE|MERGE)\b|\bFOR\s+(?:NO\s+KEY\s+)?(?:UPDATE|SHARE)\b|\bFOR\s+KEY\s+SHARE\b|\bpg_advisory",
+    re.IGNORECASE,
+)
+
+slow_statements = metrics.counter(
+    "db_slow_statements_total",
+    "実行時間が SQL_EXPLAIN_THRESHOLD_MS を超えたSQLの数",
+)
+captured_explains = metrics.counter(
+    "db_explain_captures_total",
+    "取得した実行計画の数",
+)
+
+
+@dataclass
+class CapturedPlan:
+    """取得した実行計画"""
+
+    captured_at: datetime
+    route: str | None
+    fingerprint: str
+    statement: str
+    parameter_types: list[str]
+    duration_ms: float
+    analyzed: bool
+    plan: list[str] = field(default_factory=list)
+    error: str | None = None
+
+
+_plans: deque[CapturedPlan] = deque(maxlen=max(settings.SQL_EXPLAIN_BUFFER_SIZE, 1))
+_last_captured: dict[str, float] = {}
+_pending: set[asyncio.Task] = set()
+
+
+def statement_command(statement: str) -> str:
+    """SQLの先頭のキーワード（大文字）"""
+    words = statement.lstrip(" \t\r\n(").split(None, 1)
+    return words[0].upper() if words else ""
+
+
+def is_read_statement(statement: str) -> bool:
+    """再実行しても副作用のない参照系のSQLか（EXPLAIN ANALYZE の対象）"""
+    return statement_command(statement) in ("SELECT", "WITH") and not _SIDE_EFFECT_PATTERN.search(statement)
+
+
+def parameter_shape(parameters) -> list[str]:
+    """パラメータの形状（値は保持せず型名のみ）"""
+    if isinstance(parameters, dict):
+        return [f"{key}:{type(value).__name__}" for key, value in parameters.items()]
+    return [type(value).__name__ for value in parameters or ()]
+
+
+def captured_plans() -> list[CapturedPlan]:
+    """保持している実行計画（新しい順）"""
+    return list(reversed(_plans))
+
+
+def clear_captured_plans():
+    """保持している実行計画を破棄"""
+    _plans.clear()
+    _last_captured.clear()
+
+
+async def capture_plan(sync_engine: Engine, statement: str, parameters, captured: CapturedPlan) -> CapturedPlan:
+    """
+    別の接続で実行計画を取得してリングバッファに追加
+
+    Args:
+        sync_engine: SQLを実行したエンジン（同じプール・実行オプションの接続を使う）
+        statement: ドライバーへ渡したSQL
+        parameters: ドライバーへ渡したパラメータ
+        captured: 記録先（plan / error を設定する）
+
+    Returns:
+        記録した実行計画
+    """
+    prefix = "EXPLAIN (ANALYZE, BUFFERS) " if captured.analyzed else "EXPLAIN "
+    try:
+        async with AsyncEngine(sync_engine).connect() as conn:
+            conn = await conn.execution_options(**{EXPLAIN_OPTION: True})
+            await conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(settings.SQL_EXPLAIN_TIMEOUT_MS)}")
+            result = await conn.exec_driver_sql(prefix + strip_comment(statement), parameters)
+            captured.plan = [row[0] for row in result]
+            await conn.rollback()
+    except Exception as e:
+        captured.error = str(e)[:500]
+        logger.warning(f"実行計画を取得できませんでした [{captured.fingerprint}]: {e}")
+    _plans.append(captured)
+    captured_explains.inc(analyzed=str(captured.analyzed).lower())
+    return captured
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_explain_timer(conn, cursor, statement, parameters, context, executemany):
+    if settings.SQL_EXPLAIN_THRESHOLD_MS and context is not None:
+        context.explain_started_at = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _capture_slow_statement(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "explain_started_at", None)
+    if started is None:
+        return
+    duration_ms = (time.perf_counter() - started) * 1000
+    if duration_ms < settings.SQL_EXPLAIN_THRESHOLD_MS or context.execution_options.get(EXPLAIN_OPTION):
+        return
+    slow_statements.inc()
+
+    if executemany or not conn.dialect.is_async or statement_command(statement) not in _EXPLAINABLE_COMMANDS:
+        return
+    if _pending or random.random() >= settings.SQL_EXPLAIN_SAMPLE_RATE:
+        return
+    fingerprint = statement_fingerprint(statement)
+    now = time.monotonic()
+    if now - _last_captured.get(fingerprint, float("-inf")) < settings.SQL_EXPLAIN_COOLDOWN_SECONDS:
+        return
+    _last_captured[fingerprint] = now
+
+    stats = current_request_stats()
+    captured = CapturedPlan(
+        captured_at=datetime.now(timezone.utc),
+        route=stats.route if stats is not None else None,
+        fingerprint=fingerprint,
+        statement=normalize_statement(statement),
+        parameter_types=parameter_shape(parameters),
+        duration_ms=round(duration_ms, 1),
+        analyzed=is_read_statement(statement),
+    )
+    # リクエストの集計・SQLコメントを引き継がないよう空のコンテキストで実行
+    task = asyncio.get_running_loop().create_task(
+        capture_plan(conn.engine, statement, parameters, captured), context=Context()
+    )
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
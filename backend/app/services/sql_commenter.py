@@ -0,0 +1,80 @@
+"""
+SQL Commenter Service
+リクエスト中に実行するSQLの末尾に、発行元のルートテンプレート・ハンドラー名（と任意でリクエストID）を
+sqlcommenter 形式のコメントとして付加する
+
+例: SELECT ... FROM users WHERE id = $1 /*controller='get_user',route='%2Fapi%2Fusers%2F%7Buser_id%7D'*/
+
+コメントはルートごとに固定の文字列のため、ドライバーのステートメントキャッシュはルート×SQLの単位で効く。
+pg_stat_statements の queryid はコメントを無視して計算されるため、同じSQLを複数のルートが
+発行する場合、記録されるSQL文（とコメント）は最初に実行したルートのものになる。
+リクエストIDを含めると（SQL_COMMENTER_REQUEST_ID）SQL文が毎回変わり、ステートメントキャッシュが効かなくなる。
+"""
+import re
+from contextvars import ContextVar, Token
+from urllib.parse import quote, unquote
+
+from sqlalchemy import Engine, event
+
+# 末尾の sqlcommenter 形式のコメント
+COMMENT_PATTERN = re.compile(r"\s*/\*((?:[\w-]+='[^']*',?)+)\*/\s*$")
+_TAG_PATTERN = re.compile(r"([\w-]+)='([^']*)'")
+
+_sql_comment: ContextVar[str | None] = ContextVar("sql_comment", default=None)
+
+
+def render_comment(tags: dict[str, str]) -> str:
+    """
+    sqlcommenter 形式のコメントを生成（キーの昇順、値はURLエンコード）
+
+    Args:
+        tags: キーと値（値がNoneのキーは省略）
+
+    Returns:
+        コメント文字列
+    """
+    body = ",".join(
+        f"{quote(key, safe='')}='{quote(str(value), safe='')}'"
+        for key, value in sorted(tags.items())
+        if value is not None
+    )
+    return f"/*{body}*/"
+
+
+def parse_comment(statement: str) -> dict[str, str]:
+    """
+    SQL末尾の sqlcommenter 形式のコメントを解釈
+
+    Returns:
+        キーと値（コメントがない場合は空）
+    """
+    match = COMMENT_PATTERN.search(statement)
+    if not match:
+        return {}
+    return {unquote(key): unquote(value) for key, value in _TAG_PATTERN.findall(match.group(1))}
+
+
+def strip_comment(statement: str) -> str:
+    """SQL末尾の sqlcommenter 形式のコメントを除去"""
+    return COMMENT_PATTERN.sub("", statement)
+
+
+def set_sql_comment(comment: str | None) -> Token:
+    """現在のリクエストで付加するコメントを設定"""
+    return _sql_comment.set(comment)
+
+
+def reset_sql_comment(token: Token):
+    """付加するコメントを元に戻す"""
+    _sql_comment.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute", retval=True)
+def _append_comment(conn, cursor, statement, parameters, context, executemany):
+    comment = _sql_comment.get()
+    if comment is None:
+        return statement, parameters
+    # pyformat / format のドライバー（psycopg2）では % をエスケープ
+    if conn.dialect.paramstyle in ("pyformat", "format"):
+        comment = comment.replace("%", "%%")
+    return f"{statement} {comment}", parameters
@@ -0,0 +1,164 @@
+"""
+SQL Instrumentation Service
+リクエストごとのSQL実行回数・DB時間・同一形状のSQLの繰り返し（N+1）を計測する
+
+SQLAlchemy の Engine イベントで全エンジンのSQL実行を捕捉し、ミドルウェアが開始した
+リクエスト単位の集計（コンテキスト変数）に記録する。リクエスト外（スケジューラー・
+操作履歴の書き込み器など）のSQLは記録しない。
+"""
+import hashlib
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar, Token
+from functools import lru_cache
+
+from sqlalchemy import Engine, event
+
+from app.config import get_settings
+from app.services.sql_commenter import strip_comment
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+REPEAT_ACTION_WARN = "warn"
+REPEAT_ACTION_RAISE = "raise"
+
+# 形状の正規化（バインドパラメータ・IN リストの長さ・空白の違いを同一視）
+# asyncpg の方言はパラメータに型のキャストを付ける（$1::INTEGER, $2::TIMESTAMP WITH TIME ZONE, $3::NUMERIC(10, 2) など）
+_PARAMETER_CAST = (
+    r"::\w+(?:\s+(?:VARYING|PRECISION))?(?:\s*\([\d\s,]*\))?(?:\s+WITH(?:OUT)?\s+TIME\s+ZONE)?(?:\[\])*"
+)
+_PARAMETER_PATTERN = re.compile(rf"(?:\$\d+|%\([^)]+\)s|%s|(?<!:):\w+|\?)(?:{_PARAMETER_CAST})?", re.IGNORECASE)
+_PARAMETER_LIST_PATTERN = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+class RepeatedStatementError(RuntimeError):
+    """同一形状のSQLが1リクエスト内で閾値回数に達した（SQL_REPEAT_ACTION=raise の場合）"""
+
+
+@lru_cache(maxsize=2048)
+def normalize_statement(statement: str) -> str:
+    """
+    SQLを形状（パラメータを型のキャストごと ? に置き換え、IN リストを1要素にまとめた文字列）へ正規化
+
+    末尾の sqlcommenter 形式のコメント（ルート・リクエストID）は除去する。
+
+    Args:
+        statement: ドライバーへ渡すSQL
+
+    Returns:
+        正規化したSQL
+    """
+    normalized = _PARAMETER_PATTERN.sub("?", strip_comment(statement))
+    normalized = _PARAMETER_LIST_PATTERN.sub("(?)", normalized)
+    return _WHITESPACE_PATTERN.sub(" ", normalized).strip()
+
+
+@lru_cache(maxsize=2048)
+def statement_fingerprint(statement: str) -> str:
+    """SQLの形状のフィンガープリント（16桁の16進数）"""
+    return hashlib.sha1(normalize_statement(statement).encode("utf-8")).hexdigest()[:16]
+
+
+class RequestQueryStats:
+    """1リクエストのSQL実行の集計"""
+
+    def __init__(self):
+        self.count = 0
+        # 処理したルート（"GET /api/users/{user_id}"、DatabaseRoute が設定）
+        self.route: str | None = None
+        self.total_seconds = 0.0
+        self.fingerprints: Counter[str] = Counter()
+        # フィンガープリント → 正規化したSQL（ログ出力用）
+        self.statements: dict[str, str] = {}
+
+    @property
+    def total_ms(self) -> float:
+        return self.total_seconds * 1000
+
+    def record_statement(self, statement: str) -> int:
+        """
+        SQLの実行開始を記録
+
+        Returns:
+            このリクエストで同一形状のSQLを実行した回数（今回を含む）
+        """
+        fingerprint = statement_fingerprint(statement)
+        self.count += 1
+        self.fingerprints[fingerprint] += 1
+        if fingerprint not in self.statements:
+            self.statements[fingerprint] = normalize_statement(statement)
+        return self.fingerprints[fingerprint]
+
+    def record_duration(self, seconds: float):
+        """SQLの実行時間を記録"""
+        self.total_seconds += seconds
+
+    def repeated(self, threshold: int) -> list[tuple[str, str, int]]:
+        """
+        閾値回数以上繰り返した形状
+
+        Returns:
+            (フィンガープリント, 正規化したSQL, 回数) のリスト（回数の多い順）
+        """
+        return [
+            (fingerprint, self.statements[fingerprint], count)
+            for fingerprint, count in self.fingerprints.most_common()
+            if count >= threshold
+        ]
+
+
+_request_stats: ContextVar[RequestQueryStats | None] = ContextVar("request_query_stats", default=None)
+
+
+def start_request_stats() -> tuple[RequestQueryStats, Token]:
+    """現在のリクエストの集計を開始"""
+    stats = RequestQueryStats()
+    return stats, _request_stats.set(stats)
+
+
+def finish_request_stats(token: Token):
+    """現在のリクエストの集計を終了"""
+    _request_stats.reset(token)
+
+
+def current_request_stats() -> RequestQueryStats | None:
+    """現在のリクエストの集計（リクエスト外の場合はNone）"""
+    return _request_stats.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats.get()
+    if stats is None:
+        return
+    repeat_count = stats.record_statement(statement)
+    threshold = settings.SQL_REPEAT_THRESHOLD
+    if threshold and repeat_count == threshold and settings.SQL_REPEAT_ACTION == REPEAT_ACTION_RAISE:
+        raise RepeatedStatementError(
+            f"同一形状のSQLが1リクエストで{threshold}回実行されました（N+1の可能性）: "
+            f"{normalize_statement(statement)[:200]}"
+        )
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats.get()
+    if stats is None:
+        return
+    started = conn.info.get("query_started_at")
+    if started:
+        stats.record_duration(time.perf_counter() - started.pop())
+
+
+@event.listens_for(Engine, "handle_error")
+def _discard_query_start(context):
+    """失敗したSQLの開始時刻を破棄（after_cursor_execute は呼ばれないため）"""
+    if context.connection is not None:
+        started = context.connection.info.get("query_started_at")
+        if started:
+            started.pop()
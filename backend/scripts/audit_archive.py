@@ -0,0 +1,119 @@
+"""
+操作履歴アーカイブ管理スクリプト
+
+保持期間を過ぎて削除された操作履歴のアーカイブ（AUDIT_ARCHIVE_DIR）を一覧・検索・復元します。
+
+使い方:
+  python scripts/audit_archive.py list
+  python scripts/audit_archive.py query --start 2026-01-01 --end 2026-01-08 [--company-id 1] [--user-id 2] [--path-prefix /api/users]
+  python scripts/audit_archive.py restore --start 2026-01-01 --end 2026-01-08 [--yes]
+
+オプション:
+  --dir: アーカイブディレクトリ（デフォルト: 設定の AUDIT_ARCHIVE_DIR）
+  --start / --end: 対象期間（ISO 8601形式、タイムゾーンなしはUTC、end は含まない）
+  --yes: 確認をスキップして実行（restore のみ）
+"""
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# backend ディレクトリをPythonパスに追加
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.services.audit_archive import read_manifest, iter_archived_records, restore_audit_logs
+
+settings = get_settings()
+
+
+def _filter_records(records, args):
+    """コマンドライン引数の条件で絞り込み"""
+    for record in records:
+        if args.company_id is not None and record.get("company_id") != args.company_id:
+            continue
+        if args.user_id is not None and record.get("user_id") != args.user_id:
+            continue
+        if args.path_prefix and not (record.get("path") or "").startswith(args.path_prefix):
+            continue
+        yield record
+
+
+def cmd_list(args):
+    """アーカイブファイルの一覧を表示"""
+    files = read_manifest(args.dir)["files"]
+    if not files:
+        print("アーカイブはありません")
+        return
+
+    total_rows = 0
+    total_bytes = 0
+    for entry in files:
+        print(f"{entry['date']}  {entry['row_count']:>8}件  {entry['bytes']:>10}B  {entry['path']}")
+        total_rows += entry["row_count"]
+        total_bytes += entry["bytes"]
+    print(f"\n合計: {len(files)}ファイル / {total_rows}件 / {total_bytes}B")
+
+
+def cmd_query(args):
+    """アーカイブを検索して NDJSON で標準出力へ書き出す"""
+    records = iter_archived_records(args.dir, args.start, args.end)
+    for record in _filter_records(records, args):
+        record["created_at"] = record["created_at"].isoformat()
+        print(json.dumps(record, ensure_ascii=False))
+
+
+async def cmd_restore(args):
+    """アーカイブの操作履歴をDBへ戻す"""
+    if not args.yes:
+        response = input(f"{args.start} 〜 {args.end} の操作履歴をDBへ復元しますか？ [y/N]: ")
+        if response.lower() != "y":
+            print("キャンセルしました")
+            return
+
+    engine = create_async_engine(settings.DATABASE_URL_ASYNC)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with async_session() as session:
+            records = _filter_records(iter_archived_records(args.dir, args.start, args.end), args)
+            restored_count = await restore_audit_logs(session, records)
+        print(f"+ 復元: {restored_count} 件（既存のIDはスキップ）")
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="操作履歴アーカイブ管理")
+    parser.add_argument("--dir", default=settings.AUDIT_ARCHIVE_DIR, help="アーカイブディレクトリ")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("list", help="アーカイブファイルの一覧")
+
+    for name, help_text in (("query", "アーカイブを検索"), ("restore", "アーカイブをDBへ復元")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("--start", type=datetime.fromisoformat, required=True, help="開始日時（含む）")
+        sub.add_argument("--end", type=datetime.fromisoformat, required=True, help="終了日時（含まない）")
+        sub.add_argument("--company-id", type=int, default=None, help="企業IDで絞り込み")
+        sub.add_argument("--user-id", type=int, default=None, help="ユーザーIDで絞り込み")
+        sub.add_argument("--path-prefix", default=None, help="リクエストパスの前方一致で絞り込み")
+        if name == "restore":
+            sub.add_argument("--yes", action="store_true", help="確認をスキップ")
+
+    args = parser.parse_args()
+    if args.command == "list":
+        cmd_list(args)
+    elif args.command == "query":
+        cmd_query(args)
+    else:
+        asyncio.run(cmd_restore(args))
+
+
+if __name__ == "__main__":
+    main()
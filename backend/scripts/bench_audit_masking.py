@@ -0,0 +1,93 @@
+"""
+操作履歴マスク処理のマイクロベンチマーク
+
+従来方式（json.loads → mask_sensitive_data → json.dumps）と
+バイト列スキャン方式（mask_sensitive_body）の処理時間を比較します。
+
+使い方:
+  python scripts/bench_audit_masking.py [--number 20000]
+
+オプション:
+  --number: 1ペイロードあたりの実行回数（デフォルト: 20000）
+"""
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+# backend ディレクトリをPythonパスに追加
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.middleware.audit_logger import mask_sensitive_body, mask_sensitive_data
+
+
+# 実際のAPIリクエストに近いペイロード
+PAYLOADS = {
+    "日報作成": {
+        "user_id": 12,
+        "report_date": "2026-01-05",
+    },
+    "顧客作成": {
+        "company_id": 3,
+        "assigned_user_id": 12,
+        "name": "山田太郎",
+        "company_name": "山田商事株式会社",
+        "address": "東京都千代田区丸の内1-1-1",
+        "phone": "03-1234-5678",
+        "email": "yamada@example.co.jp",
+        "notes": "月次定例訪問。次回は新商品の提案を予定。" * 4,
+    },
+    "顧客更新（ネスト）": {
+        "name": "大阪物産",
+        "contacts": [
+            {"name": "佐藤", "email": "sato@example.co.jp", "phone": "06-1111-2222"},
+            {"name": "鈴木", "email": "suzuki@example.co.jp", "phone": "06-3333-4444"},
+        ],
+        "tags": ["重要", "関西", "定期訪問"],
+    },
+    "ログイン": {
+        "email": "sales@example.com",
+        "password": "password123",
+    },
+    "ユーザー作成": {
+        "company_id": 1,
+        "name": "営業担当A",
+        "email": "sales-a@company1.example.com",
+        "role": "staff",
+        "position": "主任",
+        "password": "password123",
+    },
+}
+
+
+def legacy_mask(body: bytes) -> bytes:
+    """従来方式: パース → マスク → 再シリアライズ"""
+    return json.dumps(mask_sensitive_data(json.loads(body.decode("utf-8")))).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="操作履歴マスク処理のベンチマーク")
+    parser.add_argument("--number", type=int, default=20000, help="1ペイロードあたりの実行回数")
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"{'ペイロード':<16}{'サイズ':>8}{'従来(µs)':>12}{'新方式(µs)':>14}{'高速化':>10}")
+    print("=" * 72)
+
+    for name, payload in PAYLOADS.items():
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+        legacy = timeit.timeit(lambda: legacy_mask(body), number=args.number)
+        fast = timeit.timeit(lambda: mask_sensitive_body(body), number=args.number)
+
+        legacy_us = legacy / args.number * 1_000_000
+        fast_us = fast / args.number * 1_000_000
+        print(f"{name:<16}{len(body):>8}{legacy_us:>12.2f}{fast_us:>14.2f}{legacy_us / fast_us:>9.1f}x")
+
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
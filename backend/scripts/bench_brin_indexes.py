@@ -0,0 +1,143 @@
+"""
+時系列インデックス（btree / BRIN）のベンチマーク
+
+追記のみの時系列テーブルを一時テーブルとして作成し、btree と BRIN について
+書き込み時間・インデックスサイズ・範囲検索のレイテンシを比較します。
+あわせて実テーブルの時系列カラムの物理的な並び（pg_stats.correlation）を表示します。
+correlation が 1 に近いほど BRIN が有効です（ANALYZE 済みの場合のみ表示）。
+
+使い方:
+  python scripts/bench_brin_indexes.py [--rows 500000] [--batch 5000] [--repeat 20]
+
+オプション:
+  --rows: 投入する行数（デフォルト: 500000）
+  --batch: 1回のINSERTの行数（デフォルト: 5000、操作履歴の書き込み器のバッチに相当）
+  --repeat: 範囲検索の実行回数（中央値を表示、デフォルト: 20）
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# backend ディレクトリをPythonパスに追加
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import get_settings
+
+settings = get_settings()
+
+INDEX_DEFINITIONS = {
+    "btree": "CREATE INDEX ON {table} (created_at)",
+    "brin": (
+        "CREATE INDEX ON {table} USING brin (created_at timestamptz_minmax_multi_ops) "
+        "WITH (pages_per_range = 32, autosummarize = on)"
+    ),
+}
+
+# 範囲検索の対象期間（投入データは1秒に1行）
+RANGE_WINDOWS = {
+    "1時間": "1 hour",
+    "1日": "1 day",
+}
+
+# 物理的な並びを確認する実テーブルのカラム
+REAL_COLUMNS = (
+    ("audit_logs", "created_at"),
+    ("service_subscription_history", "changed_at"),
+    ("visit_records", "visit_datetime"),
+)
+
+
+async def bench_index(conn, kind: str, rows: int, batch: int, repeat: int) -> dict:
+    """1種類のインデックスについて計測"""
+    table = f"bench_{kind}"
+    await conn.exec_driver_sql(
+        f"CREATE TEMP TABLE {table} (id bigserial PRIMARY KEY, created_at timestamptz NOT NULL, payload text)"
+    )
+    await conn.exec_driver_sql(INDEX_DEFINITIONS[kind].format(table=table))
+
+    # 書き込み（時刻順に追記）
+    started = time.perf_counter()
+    for offset in range(0, rows, batch):
+        count = min(batch, rows - offset)
+        await conn.exec_driver_sql(
+            f"INSERT INTO {table} (created_at, payload) "
+            f"SELECT timestamptz '2026-01-01' + make_interval(secs => g), repeat('x', 200) "
+            f"FROM generate_series({offset}, {offset + count - 1}) AS g"
+        )
+    insert_seconds = time.perf_counter() - started
+    await conn.exec_driver_sql(f"ANALYZE {table}")
+
+    result = await conn.exec_driver_sql(
+        f"SELECT pg_relation_size(indexrelid) FROM pg_index WHERE indrelid = '{table}'::regclass AND NOT indisprimary"
+    )
+    index_bytes = result.scalar_one()
+
+    # 範囲検索（中央付近の期間）
+    latencies = {}
+    for label, window in RANGE_WINDOWS.items():
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await conn.exec_driver_sql(
+                f"SELECT count(*), max(payload) FROM {table} "
+                f"WHERE created_at >= timestamptz '2026-01-01' + make_interval(secs => {rows // 2}) "
+                f"AND created_at < timestamptz '2026-01-01' + make_interval(secs => {rows // 2}) + interval '{window}'"
+            )
+            timings.append((time.perf_counter() - started) * 1000)
+        latencies[label] = statistics.median(timings)
+
+    await conn.exec_driver_sql(f"DROP TABLE {table}")
+    return {"insert_seconds": insert_seconds, "index_bytes": index_bytes, "latencies": latencies}
+
+
+async def show_correlations(conn):
+    """実テーブルの時系列カラムの物理的な並びを表示"""
+    print("\n=== 実テーブルの物理的な並び（pg_stats.correlation） ===")
+    for table, column in REAL_COLUMNS:
+        result = await conn.exec_driver_sql(
+            "SELECT correlation FROM pg_stats WHERE schemaname = 'public' AND tablename = $1 AND attname = $2",
+            (table, column),
+        )
+        correlation = result.scalar_one_or_none()
+        value = f"{correlation:.3f}" if correlation is not None else "統計なし（ANALYZE 未実行）"
+        print(f"{table}.{column}: {value}")
+
+
+async def main(rows: int, batch: int, repeat: int):
+    engine = create_async_engine(settings.DATABASE_URL_ASYNC)
+    try:
+        async with engine.connect() as conn:
+            results = {}
+            for kind in INDEX_DEFINITIONS:
+                results[kind] = await bench_index(conn, kind, rows, batch, repeat)
+                await conn.commit()
+
+            print(f"=== {rows}行（{batch}行ずつ投入） ===")
+            print(f"{'':8}{'書き込み(秒)':>14}{'インデックス(KB)':>18}", end="")
+            for label in RANGE_WINDOWS:
+                print(f"{label + '検索(ms)':>14}", end="")
+            print()
+            for kind, result in results.items():
+                print(f"{kind:8}{result['insert_seconds']:>14.2f}{result['index_bytes'] / 1024:>18.0f}", end="")
+                for label in RANGE_WINDOWS:
+                    print(f"{result['latencies'][label]:>14.2f}", end="")
+                print()
+
+            await show_correlations(conn)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="時系列インデックス（btree / BRIN）のベンチマーク")
+    parser.add_argument("--rows", type=int, default=500000, help="投入する行数")
+    parser.add_argument("--batch", type=int, default=5000, help="1回のINSERTの行数")
+    parser.add_argument("--repeat", type=int, default=20, help="範囲検索の実行回数")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.batch, args.repeat))
@@ -0,0 +1,134 @@
+"""
+構築済みステートメントのベンチマーク
+
+リクエストごとに実行するクエリ（ユーザー取得・権限の UNION）について、呼び出しのたびに select() を
+構築する場合・lambda_stmt の場合・一度だけ構築したステートメント（bindparam）の場合の
+1回あたりのCPU時間を比較します。DBの待ち時間を除くため、インメモリの SQLite で実行します。
+
+  - 構築+キャッシュキー: ステートメントの構築とコンパイルキャッシュのキー生成のみ
+  - 実行: ORM セッションでの実行・結果の取得まで（SQLAlchemy 側の処理の合計）
+
+使い方:
+  python scripts/bench_statement_cache.py [--iterations 20000]
+
+オプション:
+  --iterations: 1ケースあたりの実行回数（デフォルト: 20000）
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# backend ディレクトリをPythonパスに追加
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import create_engine, lambda_stmt, select, union
+from sqlalchemy.orm import Session
+
+from app.auth.dependencies import USER_BY_ID_QUERY
+from app.auth.permissions import USER_PERMISSIONS_QUERY
+from app.database import Base
+from app.models import (
+    Company,
+    GroupRole,
+    GroupRolePermission,
+    Role,
+    User,
+    UserGroupAssignment,
+    UserRoleAssignment,
+)
+
+USER_ID = 1
+
+
+def build_user_query(user_id: int):
+    return select(User).where(User.id == user_id)
+
+
+def lambda_user_query(user_id: int):
+    return lambda_stmt(lambda: select(User).where(User.id == user_id))
+
+
+def build_permissions_query(user_id: int):
+    direct_query = (
+        select(Role.code)
+        .join(UserRoleAssignment, UserRoleAssignment.role_id == Role.id)
+        .where(UserRoleAssignment.user_id == user_id)
+    )
+    group_query = (
+        select(Role.code)
+        .join(GroupRolePermission, GroupRolePermission.role_id == Role.id)
+        .join(UserGroupAssignment, UserGroupAssignment.group_role_id == GroupRolePermission.group_role_id)
+        .where(UserGroupAssignment.user_id == user_id)
+    )
+    return union(direct_query, group_query)
+
+
+def lambda_permissions_query(user_id: int):
+    return lambda_stmt(lambda: build_permissions_query(user_id))
+
+
+# (クエリ, 方式) → (呼び出しごとのステートメントとパラメータを返す関数, 結果の取得方法)
+CASES = {
+    ("ユーザー取得", "毎回構築"): (lambda: (build_user_query(USER_ID), None), "scalars"),
+    ("ユーザー取得", "lambda_stmt"): (lambda: (lambda_user_query(USER_ID), None), "scalars"),
+    ("ユーザー取得", "構築済み"): (lambda: (USER_BY_ID_QUERY, {"user_id": USER_ID}), "scalars"),
+    ("権限UNION", "毎回構築"): (lambda: (build_permissions_query(USER_ID), None), "scalars"),
+    ("権限UNION", "lambda_stmt"): (lambda: (lambda_permissions_query(USER_ID), None), "scalars"),
+    ("権限UNION", "構築済み"): (lambda: (USER_PERMISSIONS_QUERY, {"user_id": USER_ID}), "scalars"),
+}
+
+
+def create_database():
+    """ベンチマーク用のインメモリ SQLite（権限チェックに必要なテーブルのみ）"""
+    engine = create_engine("sqlite://")
+    tables = [
+        model.__table__
+        for model in (Company, User, Role, GroupRole, GroupRolePermission, UserRoleAssignment, UserGroupAssignment)
+    ]
+    Base.metadata.create_all(engine, tables=tables)
+    with Session(engine) as session:
+        session.add(Company(id=1, name="ベンチマーク"))
+        session.add(User(id=USER_ID, company_id=1, email="bench@example.com", password_hash="x", name="bench", role="営業"))
+        session.add(Role(id=1, code="user.view", name="ユーザー閲覧", resource_type="user"))
+        session.add(UserRoleAssignment(company_id=1, user_id=USER_ID, role_id=1, granted_at=datetime.now(timezone.utc)))
+        session.commit()
+    return engine
+
+
+def measure(func, iterations: int) -> float:
+    """1回あたりの時間（マイクロ秒）"""
+    for _ in range(min(iterations, 100)):
+        func()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def main(iterations: int):
+    engine = create_database()
+    print(f"=== 1回あたりのCPU時間（マイクロ秒、{iterations}回の平均） ===")
+    print(f"{'クエリ':<12}{'方式':<14}{'構築+キャッシュキー':>20}{'実行':>12}")
+    with Session(engine) as session:
+        for (query, mode), (make, fetch) in CASES.items():
+
+            def build_only():
+                statement, _ = make()
+                statement._generate_cache_key()
+
+            def execute():
+                statement, params = make()
+                getattr(session.execute(statement, params), fetch)().all()
+
+            print(f"{query:<12}{mode:<14}{measure(build_only, iterations):>20.1f}{measure(execute, iterations):>12.1f}")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="構築済みステートメントのベンチマーク")
+    parser.add_argument("--iterations", type=int, default=20000, help="1ケースあたりの実行回数")
+    args = parser.parse_args()
+    main(args.iterations)
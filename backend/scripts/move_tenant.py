@@ -0,0 +1,360 @@
+"""
+テナント（企業）のシャード間移動スクリプト
+
+企業の行を移動元のシャードから移動先のシャードへ一括でコピーし、設定（TENANT_SHARDS）の切り替え後に
+移動元の行を削除します。移動対象のテーブルと行の選択条件は app.services.tenant_shards.tenant_move_plan で
+モデルから決定します（操作履歴 audit_* は default に残します）。
+
+手順:
+  1. 移動先のデータベースを作成してマイグレーションを適用（DATABASE_URL を移動先にして alembic upgrade head）
+  2. DATABASE_SHARDS に移動先を追加し、全シャードのIDの採番を揃える（align-sequences、初回のみ）
+  3. 企業の更新を止めてから copy（移動元は REPEATABLE READ の一貫したスナップショットで読む）
+  4. TENANT_SHARDS に企業と移動先を追加してアプリケーションを再起動
+  5. purge で移動元の行を削除（移動先との件数を比較し、差がある場合は中止）
+
+使い方:
+  python scripts/move_tenant.py plan --company-id 42 [--source default]
+  python scripts/move_tenant.py align-sequences [--yes]
+  python scripts/move_tenant.py copy --company-id 42 --target shard1 [--source default] [--batch 5000]
+  python scripts/move_tenant.py purge --company-id 42 --source default [--force] [--yes]
+
+オプション:
+  --company-id: 移動する企業ID
+  --source: 移動元のシャード（デフォルト: default）
+  --target: 移動先のシャード（DATABASE_SHARDS に定義した名前）
+  --batch: 1回にコピーする行数（デフォルト: 5000）
+  --force: 移動元と移動先の件数が一致しなくても削除する（purge のみ）
+  --yes: 確認をスキップして実行
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# backend ディレクトリをPythonパスに追加
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import app.models  # noqa: F401  モデルをメタデータに登録
+from app.config import get_settings
+from app.database import Base
+from app.services.tenant_shards import TENANT_ROOT_TABLE, shard_map, tenant_move_plan
+
+settings = get_settings()
+
+# IDの採番の間隔（シャード i は i 番目の剰余のIDを採番し、シャード間でIDが重ならないようにする）
+SEQUENCE_STEP = 100
+
+
+def aligned_next(after: int, step: int, offset: int) -> int:
+    """after より大きく、step で割った余りが offset になる最小の値"""
+    value = after + 1
+    return value + (offset - value) % step
+
+
+def _quote(name: str) -> str:
+    return f'"{name}"'
+
+
+def select_columns(table, tenant_conditions: dict[str, str]) -> str:
+    """
+    移動元から読み出す列
+
+    企業外の行を参照しうる ON DELETE SET NULL の外部キー（システム管理者による変更など）は、
+    参照先が移動対象でない場合に NULL にする。
+    """
+    columns = []
+    for column in table.columns:
+        expression = _quote(column.name)
+        for fk in column.foreign_keys:
+            parent = fk.column.table.name
+            if fk.ondelete == "SET NULL" and parent in tenant_conditions:
+                expression = (
+                    f"CASE WHEN {expression} IN (SELECT {fk.column.name} FROM {parent} "
+                    f"WHERE {tenant_conditions[parent]}) THEN {expression} END"
+                )
+        columns.append(expression)
+    return ", ".join(columns)
+
+
+async def connect(shard: str, **options):
+    """
+    シャードへ接続してトランザクションを開始
+
+    Args:
+        shard: シャード名
+        options: 接続の実行オプション（isolation_level など）
+
+    Returns:
+        (エンジン, 接続)
+    """
+    engine = create_async_engine(shard_map.url_for(shard))
+    conn = await engine.connect()
+    if options:
+        conn = await conn.execution_options(**options)
+    await conn.exec_driver_sql("SELECT 1")
+    return engine, conn
+
+
+async def raw_connection(conn):
+    """SQLAlchemy の接続と同じトランザクションの asyncpg 接続（COPY・executemany 用）"""
+    return (await conn.get_raw_connection()).driver_connection
+
+
+async def count_rows(raw, plan, company_id: int) -> dict[str, int]:
+    """移動対象のテーブルごとの企業の行数"""
+    counts = {}
+    for item in plan:
+        counts[item.table.name] = await raw.fetchval(
+            f"SELECT count(*) FROM {item.table.name} WHERE {item.condition}", company_id
+        )
+    return counts
+
+
+async def ensure_sequence_ahead(raw, table: str, offset: int):
+    """移動先のIDの採番を、コピーした行のIDより後ろに進める（採番の間隔・剰余は維持）"""
+    sequence = await raw.fetchval("SELECT pg_get_serial_sequence($1, 'id')", table)
+    if sequence is None:
+        return
+    increment, last_value = await raw.fetchrow(
+        "SELECT increment_by, last_value FROM pg_sequences WHERE schemaname || '.' || sequencename = $1",
+        sequence,
+    )
+    max_id = await raw.fetchval(f"SELECT max(id) FROM {table}")
+    if max_id is None or (last_value is not None and last_value >= max_id):
+        return
+    await raw.execute("SELECT setval($1, $2, false)", sequence, aligned_next(max_id, increment, offset % increment))
+
+
+async def copy_shared_tables(source_raw, target_raw, shared):
+    """
+    共有の行（権限・サービスなどのマスタ、システムグループ）の不足している行を移動先へコピー
+
+    移動先に同じIDで異なる内容の行がある場合は中止する（外部キーの参照先が変わるため）。
+    """
+    for item in shared:
+        table = item.table
+        columns = [column.name for column in table.columns]
+        column_sql = ", ".join(_quote(name) for name in columns)
+        select_sql = f"SELECT {column_sql} FROM {table.name} WHERE {item.condition} ORDER BY id"
+        rows = [tuple(row) for row in await source_raw.fetch(select_sql)]
+        placeholders = ", ".join(f"${i}" for i in range(1, len(columns) + 1))
+        await target_raw.executemany(
+            f"INSERT INTO {table.name} ({column_sql}) VALUES ({placeholders}) ON CONFLICT DO NOTHING", rows
+        )
+        target_sql = f"SELECT {column_sql} FROM {table.name} WHERE id = ANY($1)"
+        target_rows = {row[0]: tuple(row) for row in await target_raw.fetch(target_sql, [row[0] for row in rows])}
+        mismatched = [row[0] for row in rows if target_rows.get(row[0]) != row]
+        if mismatched:
+            raise SystemExit(
+                f"共有テーブル {table.name} の内容が移動元と一致しません（ID: {mismatched[:10]}）。"
+                "移動先のマスタは移動元からコピーしてください"
+            )
+        print(f"  {table.name:32} 共有 {len(rows)}件")
+
+
+async def cmd_plan(args):
+    """移動対象のテーブル・条件と行数を表示"""
+    plan, shared = tenant_move_plan(Base.metadata)
+    engine, conn = await connect(args.source)
+    try:
+        counts = await count_rows(await raw_connection(conn), plan, args.company_id)
+    finally:
+        await conn.close()
+        await engine.dispose()
+
+    print(f"=== 企業 {args.company_id} の移動対象（{args.source}） ===")
+    for item in plan:
+        print(f"{counts[item.table.name]:>10}件  {item.table.name:32} {item.condition}")
+    print("\n共有の行:")
+    for item in shared:
+        print(f"{'':>12}{item.table.name:32} {item.condition}")
+    print(f"現在の配置先: {shard_map.shard_for(args.company_id)}")
+
+
+async def cmd_align_sequences(args):
+    """全シャードのIDの採番を、シャードごとに異なる剰余で揃える"""
+    plan, shared = tenant_move_plan(Base.metadata)
+    tables = list(dict.fromkeys(item.table.name for item in plan + shared))
+    shards = shard_map.shards
+    if len(shards) > SEQUENCE_STEP:
+        raise SystemExit(f"シャードは{SEQUENCE_STEP}個までです")
+    if not args.yes:
+        response = input(f"{', '.join(shards)} のIDの採番を {SEQUENCE_STEP} 間隔に変更しますか？ [y/N]: ")
+        if response.lower() != "y":
+            print("キャンセルしました")
+            return
+
+    connections = {shard: await connect(shard) for shard in shards}
+    try:
+        raws = {shard: await raw_connection(conn) for shard, (engine, conn) in connections.items()}
+        for table in tables:
+            # 全シャードで採番済みの最大値より後ろから採番を始める
+            global_max = 0
+            sequences = {}
+            for shard, raw in raws.items():
+                sequence = await raw.fetchval("SELECT pg_get_serial_sequence($1, 'id')", table)
+                if sequence is None:
+                    continue
+                sequences[shard] = sequence
+                last_value = await raw.fetchval(
+                    "SELECT last_value FROM pg_sequences WHERE schemaname || '.' || sequencename = $1", sequence
+                )
+                max_id = await raw.fetchval(f"SELECT max(id) FROM {table}")
+                global_max = max(global_max, last_value or 0, max_id or 0)
+            for index, shard in enumerate(shards):
+                if shard not in sequences:
+                    continue
+                restart = aligned_next(global_max, SEQUENCE_STEP, index)
+                await raws[shard].execute(f"ALTER SEQUENCE {sequences[shard]} INCREMENT BY {SEQUENCE_STEP}")
+                await raws[shard].execute("SELECT setval($1, $2, false)", sequences[shard], restart)
+            print(f"  {table:32} {global_max} 以降")
+        for engine, conn in connections.values():
+            await conn.commit()
+    finally:
+        for engine, conn in connections.values():
+            await conn.close()
+            await engine.dispose()
+
+
+async def cmd_copy(args):
+    """企業の行を移動先へコピー（移動先では1トランザクション）"""
+    if args.source == args.target:
+        raise SystemExit("移動元と移動先が同じです")
+    plan, shared = tenant_move_plan(Base.metadata)
+    conditions = {item.table.name: item.condition for item in plan}
+    target_offset = shard_map.shards.index(args.target)
+
+    source_engine, source = await connect(args.source, isolation_level="REPEATABLE READ", postgresql_readonly=True)
+    target_engine, target = await connect(args.target)
+    try:
+        source_raw = await raw_connection(source)
+        target_raw = await raw_connection(target)
+
+        if not await source_raw.fetchval(f"SELECT 1 FROM {TENANT_ROOT_TABLE} WHERE id = $1", args.company_id):
+            raise SystemExit(f"移動元（{args.source}）に企業 {args.company_id} がありません")
+        if await target_raw.fetchval(f"SELECT 1 FROM {TENANT_ROOT_TABLE} WHERE id = $1", args.company_id):
+            raise SystemExit(f"移動先（{args.target}）に企業 {args.company_id} が既にあります")
+
+        print(f"=== 企業 {args.company_id}: {args.source} → {args.target} ===")
+        await copy_shared_tables(source_raw, target_raw, shared)
+
+        copied = {}
+        for item in plan:
+            table = item.table
+            columns = [column.name for column in table.columns]
+            select_sql = (
+                f"SELECT {select_columns(table, conditions)} FROM {table.name} "
+                f"WHERE {item.condition} AND id > $2 ORDER BY id LIMIT $3"
+            )
+            total = 0
+            last_id = 0
+            while True:
+                rows = await source_raw.fetch(select_sql, args.company_id, last_id, args.batch)
+                if not rows:
+                    break
+                await target_raw.copy_records_to_table(
+                    table.name, records=[tuple(row) for row in rows], columns=columns
+                )
+                total += len(rows)
+                last_id = rows[-1]["id"]
+            await ensure_sequence_ahead(target_raw, table.name, target_offset)
+            copied[table.name] = total
+            print(f"  {table.name:32} {total}件")
+
+        # 移動先の件数を確認してから確定
+        target_counts = await count_rows(target_raw, plan, args.company_id)
+        mismatched = {name: (count, target_counts[name]) for name, count in copied.items() if target_counts[name] != count}
+        if mismatched:
+            raise SystemExit(f"移動先の件数が一致しません（コピー件数, 移動先の件数）: {mismatched}")
+        await target.commit()
+    finally:
+        await source.close()
+        await target.close()
+        await source_engine.dispose()
+        await target_engine.dispose()
+
+    print(f"\n+ コピー完了: {sum(copied.values())}件")
+    print(f"次の手順: TENANT_SHARDS に {args.company_id}={args.target} を追加して再起動し、purge で移動元の行を削除")
+
+
+async def cmd_purge(args):
+    """移動元の企業の行を削除（企業の削除で関連する行は ON DELETE CASCADE で削除される）"""
+    current = shard_map.shard_for(args.company_id)
+    if current == args.source:
+        raise SystemExit(
+            f"企業 {args.company_id} の配置先がまだ {args.source} です（TENANT_SHARDS を切り替えてから実行してください）"
+        )
+    plan, _ = tenant_move_plan(Base.metadata)
+
+    source_engine, source = await connect(args.source)
+    target_engine, target = await connect(current)
+    try:
+        source_raw = await raw_connection(source)
+        target_raw = await raw_connection(target)
+        if not await target_raw.fetchval(f"SELECT 1 FROM {TENANT_ROOT_TABLE} WHERE id = $1", args.company_id):
+            raise SystemExit(f"配置先（{current}）に企業 {args.company_id} がありません")
+
+        # コピー後に移動元で増えた行（更新を止めずにコピーした場合）がないか確認
+        source_counts = await count_rows(source_raw, plan, args.company_id)
+        target_counts = await count_rows(target_raw, plan, args.company_id)
+        mismatched = {
+            name: (count, target_counts[name]) for name, count in source_counts.items() if count != target_counts[name]
+        }
+        if mismatched:
+            print(f"移動元と配置先の件数が一致しません（移動元, 配置先）: {mismatched}")
+            if not args.force:
+                raise SystemExit("中止しました（--force で削除）")
+
+        if not args.yes:
+            response = input(f"{args.source} の企業 {args.company_id} の行（{sum(source_counts.values())}件）を削除しますか？ [y/N]: ")
+            if response.lower() != "y":
+                print("キャンセルしました")
+                return
+        await source_raw.execute(f"DELETE FROM {TENANT_ROOT_TABLE} WHERE id = $1", args.company_id)
+        await source.commit()
+    finally:
+        await source.close()
+        await target.close()
+        await source_engine.dispose()
+        await target_engine.dispose()
+    print(f"+ 削除完了: {args.source} の企業 {args.company_id}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="テナント（企業）のシャード間移動")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    plan_parser = subparsers.add_parser("plan", help="移動対象のテーブル・行数を表示")
+    plan_parser.add_argument("--company-id", type=int, required=True, help="企業ID")
+    plan_parser.add_argument("--source", default="default", help="移動元のシャード")
+
+    align_parser = subparsers.add_parser("align-sequences", help="全シャードのIDの採番を揃える")
+    align_parser.add_argument("--yes", action="store_true", help="確認をスキップ")
+
+    copy_parser = subparsers.add_parser("copy", help="企業の行を移動先へコピー")
+    copy_parser.add_argument("--company-id", type=int, required=True, help="企業ID")
+    copy_parser.add_argument("--source", default="default", help="移動元のシャード")
+    copy_parser.add_argument("--target", required=True, help="移動先のシャード")
+    copy_parser.add_argument("--batch", type=int, default=5000, help="1回にコピーする行数")
+
+    purge_parser = subparsers.add_parser("purge", help="移動元の企業の行を削除")
+    purge_parser.add_argument("--company-id", type=int, required=True, help="企業ID")
+    purge_parser.add_argument("--source", default="default", help="移動元のシャード")
+    purge_parser.add_argument("--force", action="store_true", help="件数が一致しなくても削除")
+    purge_parser.add_argument("--yes", action="store_true", help="確認をスキップ")
+
+    args = parser.parse_args()
+    commands = {
+        "plan": cmd_plan,
+        "align-sequences": cmd_align_sequences,
+        "copy": cmd_copy,
+        "purge": cmd_purge,
+    }
+    asyncio.run(commands[args.command](args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+pg_stat_statements のルート別レポート
+
+pg_stat_statements に記録されたSQLを、末尾の sqlcommenter 形式のコメント（SQL_COMMENTER_ENABLED）
+からアプリケーションのルートへ対応付け、ルート別の実行回数・実行時間を集計します。
+アプリケーションのルート一覧と突き合わせ、HTTPメソッドとハンドラーのモジュールもあわせて表示します。
+
+pg_stat_statements はコメントを除いたSQLでまとめるため、同じSQLを複数のルートが発行する場合は
+最初に実行したルートに計上されます（コメントのないSQLは「(ルート不明)」）。
+機能を有効にした後は pg_stat_statements_reset() で統計をリセットしてから計測してください。
+
+使い方:
+  python scripts/pg_stat_statements_report.py [--limit 200] [--top 20] [--route /api/daily-reports]
+
+オプション:
+  --limit: 対象とするSQLの件数（合計実行時間の多い順、デフォルト: 200）
+  --top: SQLごとの明細を表示する件数（デフォルト: 20）
+  --route: 指定したルートテンプレートのSQLのみ表示
+"""
+import argparse
+import asyncio
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+# backend ディレクトリをPythonパスに追加
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from fastapi.routing import APIRoute
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import get_settings
+from app.services.sql_commenter import parse_comment, strip_comment
+
+settings = get_settings()
+
+UNKNOWN_ROUTE = "(ルート不明)"
+
+STATEMENTS_SQL = text(
+    "SELECT queryid, calls, total_exec_time, mean_exec_time, rows, query "
+    "FROM pg_stat_statements "
+    "WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database()) "
+    "ORDER BY total_exec_time DESC "
+    "LIMIT :limit"
+)
+
+
+def app_routes() -> dict[str, list[tuple[str, str]]]:
+    """アプリケーションのルート一覧（ルートテンプレート → [(HTTPメソッド, ハンドラー)]）"""
+    from app.main import app
+
+    routes = defaultdict(list)
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            handler = f"{route.endpoint.__module__}.{route.endpoint.__name__}"
+            for method in sorted(route.methods):
+                routes[route.path_format].append((method, handler))
+    return routes
+
+
+async def fetch_statements(limit: int) -> list[dict]:
+    """pg_stat_statements を取得"""
+    engine = create_async_engine(settings.DATABASE_URL_ASYNC)
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(STATEMENTS_SQL, {"limit": limit})
+            return [dict(row._mapping) for row in result]
+    finally:
+        await engine.dispose()
+
+
+def main(limit: int, top: int, route_filter: str | None):
+    statements = asyncio.run(fetch_statements(limit))
+    routes = app_routes()
+
+    by_route: dict[str, dict] = defaultdict(lambda: {"calls": 0, "total_ms": 0.0, "statements": 0, "controllers": set()})
+    for statement in statements:
+        tags = parse_comment(statement["query"])
+        route = tags.get("route", UNKNOWN_ROUTE)
+        statement["route"] = route
+        summary = by_route[route]
+        summary["calls"] += statement["calls"]
+        summary["total_ms"] += statement["total_exec_time"]
+        summary["statements"] += 1
+        if "controller" in tags:
+            summary["controllers"].add(tags["controller"])
+
+    print(f"=== ルート別（合計実行時間の多い順、上位{limit}件のSQLが対象） ===")
+    print(f"{'合計(ms)':>12}{'実行回数':>10}{'SQL数':>7}  ルート / ハンドラー")
+    for route, summary in sorted(by_route.items(), key=lambda item: item[1]["total_ms"], reverse=True):
+        if route_filter and route != route_filter:
+            continue
+        handlers = routes.get(route)
+        if handlers:
+            targets = ", ".join(f"{method} {handler}" for method, handler in handlers)
+        elif route == UNKNOWN_ROUTE:
+            targets = "-"
+        else:
+            targets = f"アプリに存在しないルート（{', '.join(sorted(summary['controllers']))}）"
+        print(f"{summary['total_ms']:>12.1f}{summary['calls']:>10}{summary['statements']:>7}  {route}")
+        print(f"{'':31}{targets}")
+
+    # 記録のないルート
+    if not route_filter:
+        missing = sorted(set(routes) - set(by_route))
+        if missing:
+            print(f"\n=== SQLの記録がないルート（{len(missing)}件） ===")
+            for route in missing:
+                print(f"  {route}")
+
+    print(f"\n=== SQL明細（上位{top}件） ===")
+    shown = 0
+    for statement in statements:
+        if route_filter and statement["route"] != route_filter:
+            continue
+        query = " ".join(strip_comment(statement["query"]).split())
+        print(
+            f"[{statement['queryid']}] {statement['route']}  "
+            f"合計 {statement['total_exec_time']:.1f}ms / {statement['calls']}回 / "
+            f"平均 {statement['mean_exec_time']:.2f}ms / {statement['rows']}行"
+        )
+        print(f"  {query[:300]}")
+        shown += 1
+        if shown >= top:
+            break
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="pg_stat_statements のルート別レポート")
+    parser.add_argument("--limit", type=int, default=200, help="対象とするSQLの件数")
+    parser.add_argument("--top", type=int, default=20, help="SQLごとの明細を表示する件数")
+    parser.add_argument("--route", default=None, help="表示するルートテンプレート")
+    args = parser.parse_args()
+    main(args.limit, args.top, args.route)
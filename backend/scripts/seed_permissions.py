@@ -97,6 +97,9 @@ PERMISSIONS = [
     # システム管理
     {"code": "admin.access", "name": "管理画面アクセス", "resource_type": "admin", "description": "管理画面にアクセスする権限"},
     {"code": "admin.system_settings", "name": "システム設定", "resource_type": "admin", "description": "システム設定を変更する権限"},
+
+    # 操作履歴
+    {"code": "audit.view", "name": "操作履歴閲覧", "resource_type": "audit", "description": "自社の操作履歴と集計を閲覧する権限"},
 ]
 
 
@@ -158,11 +158,11 @@ async def seed_test_data():
 
             departments = []
             for dept_data in departments_data:
-                dept = Department(**dept_data)
+                branch = next(b for b in branches if b.id == dept_data["branch_id"])
+                dept = Department(**dept_data, company_id=branch.company_id)
                 session.add(dept)
                 await session.flush()
                 departments.append(dept)
-                branch = next(b for b in branches if b.id == dept.branch_id)
                 print(f"+ 作成部署: {dept.name} (支店: {branch.name})")
 
             await session.commit()
@@ -272,6 +272,7 @@ async def seed_test_data():
 
                 # グループロール割り当て
                 user_group = UserGroupAssignment(
+                    company_id=user.company_id,
                     user_id=user.id,
                     group_role_id=group_role.id,
                     assigned_at=datetime.now(),
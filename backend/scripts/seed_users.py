@@ -239,6 +239,7 @@ async def seed_users(clear_existing: bool = False):
 
                 # グループロール割り当て
                 user_group = UserGroupAssignment(
+                    company_id=user.company_id,
                     user_id=user.id,
                     group_role_id=group_role.id,
                     assigned_at=datetime.now(),
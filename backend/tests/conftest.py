@@ -3,19 +3,22 @@ pytest設定とフィクスチャ
 """
 import asyncio
 import pytest
+from contextlib import contextmanager
 from typing import AsyncGenerator
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import NullPool
-from sqlalchemy import select
+from sqlalchemy import event, select
 
 from app.main import app
 from app.database import Base, get_db
 from app.config import get_settings
 from app.models.role import Role
+from app.models.user import User
 from app.models.group_role import GroupRole
 from app.models.group_role_permission import GroupRolePermission
 from app.models.user_group_assignment import UserGroupAssignment
+from app.services.audit_dimensions import audit_dimension_cache
 
 settings = get_settings()
 
@@ -67,6 +70,8 @@ async def seed_test_permissions(session: AsyncSession):
         {"code": "report.update_self", "name": "自分の日報更新", "resource_type": "report"},
         {"code": "report.delete", "name": "日報削除", "resource_type": "report"},
         {"code": "report.delete_self", "name": "自分の日報削除", "resource_type": "report"},
+        {"code": "audit.view", "name": "操作履歴閲覧", "resource_type": "audit"},
+        {"code": "admin.access", "name": "管理画面アクセス", "resource_type": "admin"},
     ]
 
     role_objects = []
@@ -106,6 +111,9 @@ async def db_session() -> AsyncGenerator[AsyncSession, None]:
         await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
 
+    # テーブルを作り直したため操作履歴の辞書IDキャッシュを破棄
+    audit_dimension_cache.clear()
+
     # セッション提供
     async with TestSessionLocal() as session:
         # 権限データを投入
@@ -134,7 +142,9 @@ async def assign_admin_permissions(session: AsyncSession, user_id: int):
             admin_group_id = admin_group.id
 
     if admin_group_id:
+        user = await session.get(User, user_id)
         assignment = UserGroupAssignment(
+            company_id=user.company_id,
             user_id=user_id,
             group_role_id=admin_group_id,
             assigned_by=user_id,  # 自己割り当て
@@ -144,12 +154,41 @@ async def assign_admin_permissions(session: AsyncSession, user_id: int):
         await session.commit()
 
 
+@pytest.fixture
+def capture_statements(db_session: AsyncSession):
+    """
+    テスト用エンジンで実行したSQLを記録するコンテキストマネージャーを返すフィクスチャ
+
+    使い方:
+        with capture_statements() as statements:
+            await client.get(...)
+    """
+    engine = db_session.bind.sync_engine
+
+    @contextmanager
+    def capture():
+        statements: list[str] = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+    return capture
+
+
 @pytest.fixture
 async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
     """テスト用HTTPクライアント"""
 
     async def override_get_db():
+        # get_db と同様にハンドラーの終了後にコミットする
         yield db_session
+        await db_session.commit()
 
     app.dependency_overrides[get_db] = override_get_db
 
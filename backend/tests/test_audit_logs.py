@@ -1,16 +1,41 @@
 """
 操作履歴（Audit Logs）のテスト
 """
+import json
 import pytest
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from httpx import AsyncClient
 from sqlalchemy import select
+from sqlalchemy.exc import DataError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.middleware.audit_logger import OTHER_METHOD, mask_sensitive_body, normalize_method
 from app.models.audit_log import AuditLog
+from app.models.audit_log_rollup import AuditLogRollup, BUCKET_MINUTE, BUCKET_HOUR
+from app.services.audit_analytics import estimate_percentile
+from app.services.audit_archive import (
+    _PartitionWriter,
+    _write_manifest,
+    archive_audit_logs,
+    iter_archived_records,
+    purge_audit_logs,
+    read_manifest,
+    restore_audit_logs,
+)
+from app.services.audit_search import decode_cursor, encode_cursor
+from app.services.audit_policy import AuditPolicy, AuditPolicyResolver, parse_policy, parse_route_policies
+from app.services.audit_rollup import AuditRollupAggregator, UNMATCHED_ROUTE, latency_bucket_index
+from app.services.audit_dimensions import AuditDimensionCache
+from app.services.audit_writer import AuditWriter, AuditWriteAheadLog, _drop_invalid_json
 from app.models.user import User
 
 
+
+async def _new_audit_log(db_session: AsyncSession, **fields) -> AuditLog:
+    """パス・User-Agent を辞書テーブルへ登録して操作履歴を作成"""
+    (record,) = await AuditDimensionCache().encode(db_session, [fields])
+    return AuditLog(**record)
+
 @pytest.mark.asyncio
 async def test_audit_log_on_login(client: AsyncClient, db_session: AsyncSession):
     """ログイン時に操作履歴が記録されることを確認"""
@@ -37,8 +62,8 @@ async def test_audit_log_on_login(client: AsyncClient, db_session: AsyncSession)
     assert audit_log.status_code == 200
     assert audit_log.request_body is not None
     # パスワードがマスクされているか確認
-    assert "***MASKED***" in audit_log.request_body
-    assert "password123" not in audit_log.request_body
+    assert audit_log.request_body["password"] == "***MASKED***"
+    assert "password123" not in json.dumps(audit_log.request_body)
 
 
 @pytest.mark.asyncio
@@ -150,7 +175,8 @@ async def test_cleanup_old_audit_logs(db_session: AsyncSession):
     """90日以上前の操作履歴が削除されることを確認"""
     # テスト用の古い操作履歴を作成
     old_date = datetime.now() - timedelta(days=91)
-    old_audit_log = AuditLog(
+    old_audit_log = await _new_audit_log(
+        db_session,
         method="GET",
         path="/api/test/old",
         status_code=200,
@@ -159,7 +185,8 @@ async def test_cleanup_old_audit_logs(db_session: AsyncSession):
     db_session.add(old_audit_log)
 
     # 新しい操作履歴も作成
-    new_audit_log = AuditLog(
+    new_audit_log = await _new_audit_log(
+        db_session,
         method="GET",
         path="/api/test/new",
         status_code=200,
@@ -195,6 +222,75 @@ async def test_cleanup_old_audit_logs(db_session: AsyncSession):
     assert result.scalar_one_or_none() is not None
 
 
+@pytest.mark.asyncio
+async def test_archive_and_purge_old_audit_logs(db_session: AsyncSession, tmp_path):
+    """古い操作履歴がアーカイブされてから削除され、アーカイブから検索・復元できることを確認"""
+    now = datetime.now(timezone.utc)
+    old_dates = [now - timedelta(days=95), now - timedelta(days=95, minutes=5), now - timedelta(days=92)]
+    for index, created_at in enumerate(old_dates):
+        db_session.add(await _new_audit_log(
+            db_session,
+            method="POST",
+            path=f"/api/test/archived/{index}",
+            status_code=201,
+            request_body='{"name": "山田"}',
+            created_at=created_at,
+        ))
+    db_session.add(await _new_audit_log(db_session, method="GET", path="/api/test/recent", status_code=200))
+    await db_session.commit()
+
+    cutoff = now - timedelta(days=90)
+    entries = await archive_audit_logs(db_session, cutoff, tmp_path)
+
+    # 日付ごとにファイルが分かれ、マニフェストに記録される
+    assert [entry["row_count"] for entry in entries] == [2, 1]
+    assert read_manifest(tmp_path)["files"] == entries
+    for entry in entries:
+        assert (tmp_path / entry["path"]).exists()
+
+    assert await purge_audit_logs(db_session, cutoff) == 3
+    result = await db_session.execute(select(AuditLog))
+    assert [audit_log.path for audit_log in result.scalars().all()] == ["/api/test/recent"]
+
+    # 期間指定で検索
+    records = list(iter_archived_records(tmp_path, now - timedelta(days=93), now))
+    assert [record["path"] for record in records] == ["/api/test/archived/2"]
+    assert records[0]["request_body"] == {"name": "山田"}
+
+    # 復元（2回実行しても重複しない）
+    archived = list(iter_archived_records(tmp_path))
+    assert await restore_audit_logs(db_session, iter(archived)) == 3
+    await restore_audit_logs(db_session, iter(archived))
+    result = await db_session.execute(select(AuditLog).where(AuditLog.path.like("/api/test/archived/%")))
+    assert len(result.scalars().all()) == 3
+
+    # 復元した行を再度アーカイブしても、日付ごとに1ファイルのまま重複しない
+    rerun_entries = await archive_audit_logs(db_session, cutoff, tmp_path)
+    assert [entry["row_count"] for entry in rerun_entries] == [2, 1]
+    assert read_manifest(tmp_path)["files"] == rerun_entries
+    assert len(list(tmp_path.glob("date=*/*.ndjson.zst"))) == 2
+    assert len(list(iter_archived_records(tmp_path))) == 3
+
+
+def test_archive_partition_skips_already_archived_ids(tmp_path):
+    """同じ日付の既存アーカイブの行を引き継ぎ、アーカイブ済みのIDは書き込まないことを確認"""
+    created_at = datetime(2026, 1, 5, 10, 0, tzinfo=timezone.utc)
+    rows = [{"id": row_id, "path": f"/api/items/{row_id}", "created_at": created_at} for row_id in (1, 2, 3)]
+
+    first = _PartitionWriter(tmp_path, created_at.date())
+    first.write_rows(rows[:2])
+    entry = first.close()
+
+    # 削除の途中で失敗して再実行した場合（ID 2 はアーカイブ済みで削除されていない）
+    rerun = _PartitionWriter(tmp_path, created_at.date(), [entry])
+    rerun.write_rows(rows[1:])
+    rerun_entry = rerun.close()
+    assert rerun.replaced_paths == [tmp_path / entry["path"]]
+    assert (rerun_entry["row_count"], rerun_entry["min_id"], rerun_entry["max_id"]) == (3, 1, 3)
+    _write_manifest(tmp_path, {"files": [rerun_entry]})
+    assert [record["id"] for record in iter_archived_records(tmp_path)] == [1, 2, 3]
+
+
 @pytest.mark.asyncio
 async def test_audit_log_masks_sensitive_fields(client: AsyncClient, db_session: AsyncSession):
     """機密情報フィールドがマスクされることを確認"""
@@ -219,8 +315,608 @@ async def test_audit_log_masks_sensitive_fields(client: AsyncClient, db_session:
     assert audit_log.request_body is not None
 
     # 機密情報がマスクされていることを確認
-    assert "***MASKED***" in audit_log.request_body
-    assert "secret_password" not in audit_log.request_body
-    assert "secret_token" not in audit_log.request_body
+    assert audit_log.request_body["password"] == "***MASKED***"
+    assert audit_log.request_body["token"] == "***MASKED***"
+    assert "secret_password" not in json.dumps(audit_log.request_body)
+    assert "secret_token" not in json.dumps(audit_log.request_body)
     # メールアドレスは機密情報ではないので記録される
-    assert "sales@example.com" in audit_log.request_body
+    assert audit_log.request_body["email"] == "sales@example.com"
+
+
+def test_mask_sensitive_body_returns_original_bytes_without_sensitive_keys():
+    """機密キーを含まないボディは元のバイト列がそのまま返されることを確認"""
+    body = '{"name": "顧客A", "email": "a@example.com", "tags": ["重要"]}'.encode("utf-8")
+
+    assert mask_sensitive_body(body) is body
+
+
+def test_mask_sensitive_body_masks_scalar_and_nested_values():
+    """機密キーの値がスカラー・ネストに関わらずマスクされることを確認"""
+    body = (
+        b'{"email": "a@example.com", "Password": "p\\"w", '
+        b'"token": {"value": "}", "items": [1, 2]}, '
+        b'"users": [{"api_key": 123, "name": "x"}]}'
+    )
+
+    masked = mask_sensitive_body(body)
+
+    assert json.loads(masked) == {
+        "email": "a@example.com",
+        "Password": "***MASKED***",
+        "token": "***MASKED***",
+        "users": [{"api_key": "***MASKED***", "name": "x"}],
+    }
+
+
+def test_mask_sensitive_body_handles_escaped_keys():
+    """Unicodeエスケープされた機密キーもマスクされることを確認"""
+    body = b'{"pa\\u0073sword": "secret_password"}'
+
+    masked = mask_sensitive_body(body)
+
+    assert b"secret_password" not in masked
+    assert json.loads(masked) == {"password": "***MASKED***"}
+
+
+def test_mask_sensitive_body_ignores_keys_inside_strings():
+    """文字列値の中に含まれる機密キー風の文字列はマスクされないことを確認"""
+    body = b'{"notes": "\\"password\\": is not a key"}'
+
+    assert json.loads(mask_sensitive_body(body)) == {"notes": '"password": is not a key'}
+
+
+def test_mask_sensitive_body_skips_non_json():
+    """JSON以外のボディ（フォーム形式など）は記録対象外になることを確認"""
+    assert mask_sensitive_body(b"username=a&password=secret") is None
+    assert mask_sensitive_body(b"") is None
+
+
+@pytest.mark.asyncio
+async def test_audit_log_records_route_template(client: AsyncClient, db_session: AsyncSession, auth_headers):
+    """パスパラメータを含むリクエストでルートテンプレートが記録されることを確認"""
+    response = await client.get("/api/users/99999", headers=auth_headers)
+    assert response.status_code == 404
+
+    result = await db_session.execute(
+        select(AuditLog).where(AuditLog.path == "/api/users/99999")
+    )
+    audit_log = result.scalar_one_or_none()
+
+    assert audit_log is not None
+    assert audit_log.route == "/api/users/{user_id}"
+
+
+def test_rollup_aggregator_groups_by_minute_and_status_class():
+    """集計器が分・ルート・メソッド・ステータス区分・企業ごとに集約することを確認"""
+    aggregator = AuditRollupAggregator()
+    occurred_at = datetime(2026, 1, 5, 10, 30, 15, tzinfo=timezone.utc)
+
+    aggregator.record("/api/users/{user_id}", "GET", 200, 1, 8, occurred_at)
+    aggregator.record("/api/users/{user_id}", "GET", 204, 1, 120, occurred_at + timedelta(seconds=30))
+    aggregator.record("/api/users/{user_id}", "GET", 503, 1, 3000, occurred_at)
+    aggregator.record(None, "GET", 404, None, 1, occurred_at)
+
+    pending = aggregator.drain()
+    bucket_start = datetime(2026, 1, 5, 10, 30, tzinfo=timezone.utc)
+
+    ok = pending[(BUCKET_MINUTE, bucket_start, "/api/users/{user_id}", "GET", 2, 1)]
+    assert ok.request_count == 2
+    assert ok.error_count == 0
+    assert ok.latency_sum_ms == 128
+    assert (ok.latency_min_ms, ok.latency_max_ms) == (8, 120)
+    assert ok.buckets[latency_bucket_index(8)] == 1
+    assert ok.buckets[latency_bucket_index(120)] == 1
+
+    error = pending[(BUCKET_MINUTE, bucket_start, "/api/users/{user_id}", "GET", 5, 1)]
+    assert error.error_count == 1
+
+    assert (BUCKET_MINUTE, bucket_start, UNMATCHED_ROUTE, "GET", 4, None) in pending
+
+    # 1時間単位の行にも同じ値が加算される
+    hourly = pending[(BUCKET_HOUR, datetime(2026, 1, 5, 10, 0, tzinfo=timezone.utc), "/api/users/{user_id}", "GET", 2, 1)]
+    assert hourly.request_count == 2
+    assert aggregator.pending_count == 0
+
+
+class _FailingRollupSession:
+    """集計の書き込みが指定の例外で失敗するセッション"""
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+    async def execute(self, statement):
+        raise self.error
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_rollup_aggregator_restores_only_after_transient_errors():
+    """接続エラーでは差分を戻して再試行し、DBに拒否された差分は破棄して以降の書き込みを妨げないことを確認"""
+    aggregator = AuditRollupAggregator()
+    aggregator.record("/api/customers", "GET", 200, 1, 10)
+
+    with pytest.raises(ConnectionRefusedError):
+        await aggregator.flush(_FailingRollupSession(ConnectionRefusedError("database is down")))
+    assert aggregator.pending_count == 2
+
+    rejected = DataError("INSERT INTO audit_log_rollups", None, ValueError("value too long"))
+    with pytest.raises(DataError):
+        await aggregator.flush(_FailingRollupSession(rejected))
+    assert aggregator.pending_count == 0
+
+
+def test_normalize_method_groups_unknown_methods():
+    """既知のHTTPメソッドはそのまま、それ以外は OTHER として記録することを確認"""
+    assert normalize_method("GET") == "GET"
+    assert normalize_method("PATCH") == "PATCH"
+    assert normalize_method("UNSUBSCRIBE") == OTHER_METHOD
+    assert normalize_method("PROPFIND") == OTHER_METHOD
+
+
+@pytest.mark.asyncio
+async def test_rollup_aggregator_flush_is_incremental(db_session: AsyncSession):
+    """集計の書き込みが既存行へ加算されることを確認"""
+    aggregator = AuditRollupAggregator()
+    occurred_at = datetime(2026, 1, 5, 10, 30, tzinfo=timezone.utc)
+
+    aggregator.record("/api/customers", "GET", 200, None, 40, occurred_at)
+    assert await aggregator.flush(db_session) == 2
+
+    aggregator.record("/api/customers", "GET", 200, None, 5, occurred_at)
+    assert await aggregator.flush(db_session) == 2
+
+    result = await db_session.execute(
+        select(AuditLogRollup).where(
+            AuditLogRollup.route == "/api/customers",
+            AuditLogRollup.bucket_minutes == BUCKET_MINUTE,
+        )
+    )
+    rollup = result.scalar_one()
+
+    assert rollup.request_count == 2
+    assert rollup.latency_sum_ms == 45
+    assert (rollup.latency_min_ms, rollup.latency_max_ms) == (5, 40)
+    assert rollup.bucket_le_10ms == 1
+    assert rollup.bucket_le_50ms == 1
+
+
+def test_estimate_percentile_interpolates_within_bucket():
+    """ヒストグラムからのパーセンタイル推定がバケット内で補間されることを確認"""
+    # 10ms以下: 50件、25ms以下: 40件、50ms以下: 10件
+    buckets = [50, 40, 10, 0, 0, 0, 0, 0, 0, 0]
+
+    assert estimate_percentile(buckets, 0.50, 1, 48) == 10.0
+    assert estimate_percentile(buckets, 0.95, 1, 48) == 37.5
+    assert estimate_percentile(buckets, 0.99, 1, 48) == 47.5
+    assert estimate_percentile([0] * 10, 0.5, None, None) is None
+
+
+def test_estimate_percentile_uses_max_for_unbounded_bucket():
+    """上限なしバケットでは最大値を上端として推定することを確認"""
+    buckets = [0, 0, 0, 0, 0, 0, 0, 0, 0, 2]
+
+    assert estimate_percentile(buckets, 0.99, 6000, 9000) == 8960.0
+
+
+@pytest.mark.asyncio
+async def test_route_analytics_from_rollups(client: AsyncClient, db_session: AsyncSession, auth_headers):
+    """ルート別統計が集計テーブルから算出されることを確認"""
+    result = await db_session.execute(select(User).where(User.email == "sales@example.com"))
+    user = result.scalar_one()
+
+    aggregator = AuditRollupAggregator()
+    occurred_at = datetime.now(timezone.utc) - timedelta(minutes=5)
+    for response_time_ms in (5, 20, 30, 400):
+        aggregator.record("/api/customers", "GET", 200, user.company_id, response_time_ms, occurred_at)
+    aggregator.record("/api/customers", "GET", 500, user.company_id, 1200, occurred_at)
+    # 他社のデータは含まれない
+    aggregator.record("/api/customers", "GET", 200, None, 1, occurred_at)
+    await aggregator.flush(db_session)
+
+    response = await client.get("/api/audit-logs/analytics/routes", headers=auth_headers)
+    assert response.status_code == 200
+
+    stats = {(item["route"], item["method"]): item for item in response.json()}
+    customers = stats[("/api/customers", "GET")]
+    assert customers["request_count"] == 5
+    assert customers["error_count"] == 1
+    assert customers["error_rate"] == 0.2
+    assert customers["min_ms"] == 5
+    assert customers["max_ms"] == 1200
+    assert customers["p50_ms"] is not None
+    assert customers["p50_ms"] <= customers["p95_ms"] <= customers["p99_ms"]
+
+
+@pytest.mark.asyncio
+async def test_route_analytics_includes_partial_first_hour(client: AsyncClient, db_session: AsyncSession, auth_headers):
+    """1時間単位の集計を使う範囲でも、開始日時を含む最初の1時間の集計行が対象になることを確認"""
+    result = await db_session.execute(select(User).where(User.email == "sales@example.com"))
+    user = result.scalar_one()
+
+    start = datetime.now(timezone.utc).replace(minute=30, second=0, microsecond=0) - timedelta(hours=10)
+    aggregator = AuditRollupAggregator()
+    # 開始日時より後（同じ1時間の集計行に入る）
+    aggregator.record("/api/customers", "GET", 200, user.company_id, 10, start + timedelta(minutes=10))
+    await aggregator.flush(db_session)
+
+    response = await client.get(
+        "/api/audit-logs/analytics/routes",
+        params={"start": start.isoformat(), "end": (start + timedelta(hours=8)).isoformat()},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    stats = {(item["route"], item["method"]): item for item in response.json()}
+    assert stats[("/api/customers", "GET")]["request_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_timeseries_analytics_rejects_long_minute_range(client: AsyncClient, auth_headers):
+    """1分単位の時系列で24時間を超える範囲が拒否されることを確認"""
+    response = await client.get(
+        "/api/audit-logs/analytics/timeseries",
+        params={"interval": "minute", "start": "2026-01-01T00:00:00Z", "end": "2026-01-03T00:00:00Z"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_analytics_requires_authentication(client: AsyncClient):
+    """認証なしで集計APIにアクセスできないことを確認"""
+    response = await client.get("/api/audit-logs/analytics/routes")
+    assert response.status_code == 401
+
+
+class _PassthroughDimensions(AuditDimensionCache):
+    """書き込み器のテスト用（辞書IDへの変換を行わない）"""
+
+    async def encode(self, db, records):
+        return records
+
+
+class _FakeSession:
+    """書き込み器のテスト用セッション（available=False の間は接続エラー）"""
+
+    def __init__(self, store: dict):
+        self.store = store
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, statement, rows):
+        if not self.store["available"]:
+            raise ConnectionRefusedError("database is down")
+        # audit_logs.method は String(10)
+        if any(len(row["method"]) > 10 for row in rows):
+            raise DataError("INSERT INTO audit_logs", None, ValueError("value too long for type character varying(10)"))
+        self.store["rows"].extend(rows)
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_audit_writer_spills_and_replays_when_database_is_down(tmp_path):
+    """DB障害中の操作履歴がローカルに退避され、復旧後に再投入されることを確認"""
+    store = {"available": False, "rows": []}
+    writer = AuditWriter(
+        wal_dir=tmp_path,
+        session_factory=lambda: _FakeSession(store),
+        dimensions=_PassthroughDimensions(),
+    )
+
+    await writer.submit({"method": "GET", "path": "/api/users", "status_code": 200})
+    await writer.submit({"method": "POST", "path": "/api/customers", "status_code": 201})
+    assert store["rows"] == []
+    assert writer.wal.size_bytes > 0
+
+    # 障害中は再投入しない
+    assert await writer.replay() == 0
+
+    store["available"] = True
+    writer._db_unavailable_until = 0
+    assert await writer.replay() == 2
+    assert [row["path"] for row in store["rows"]] == ["/api/users", "/api/customers"]
+    # 退避時に確定した記録時刻が維持される
+    assert all(isinstance(row["created_at"], datetime) for row in store["rows"])
+    assert writer.wal.segment_count == 0
+    assert writer.wal.oldest_age_seconds() == 0.0
+
+
+@pytest.mark.asyncio
+async def test_audit_writer_quarantines_rejected_rows(tmp_path):
+    """DBに拒否された行だけが隔離され、残りの行は書き込まれ、DB障害とはみなされないことを確認"""
+    store = {"available": True, "rows": []}
+    writer = AuditWriter(
+        wal_dir=tmp_path,
+        session_factory=lambda: _FakeSession(store),
+        dimensions=_PassthroughDimensions(),
+    )
+    now = datetime.now(timezone.utc)
+    batch = [{"method": "GET", "path": f"/api/items/{index}", "status_code": 200, "created_at": now} for index in range(7)]
+    batch[3] = {"method": "UNSUBSCRIBE", "path": "/x", "status_code": 405, "created_at": now}
+
+    await writer._write_or_spill(batch)
+    assert len(store["rows"]) == 6
+    assert writer._db_unavailable_until == 0
+    assert writer.wal.segment_count == 0
+    [quarantined] = tmp_path.glob("*.bad")
+    assert [record["method"] for record in writer.wal.read_segment(quarantined)] == ["UNSUBSCRIBE"]
+
+    # 障害中に退避したセグメントに含まれていた場合も、再投入で隔離してセグメントを削除する
+    store["available"] = False
+    await writer._write_or_spill(batch)
+    store["available"] = True
+    writer._db_unavailable_until = 0
+    assert await writer.replay() == 6
+    assert len(store["rows"]) == 12
+    assert writer.wal.segment_count == 0
+    assert len(list(tmp_path.glob("*.bad"))) == 2
+
+
+@pytest.mark.asyncio
+async def test_audit_writer_flushes_queue_on_stop(tmp_path):
+    """start() 後はキュー経由でまとめて書き込まれ、stop() で残りが書き込まれることを確認"""
+    store = {"available": True, "rows": []}
+    writer = AuditWriter(
+        wal_dir=tmp_path,
+        session_factory=lambda: _FakeSession(store),
+        dimensions=_PassthroughDimensions(),
+    )
+
+    await writer.start()
+    for index in range(5):
+        await writer.submit({"method": "GET", "path": f"/api/items/{index}", "status_code": 200})
+    await writer.stop()
+
+    assert len(store["rows"]) == 5
+    assert not writer.started
+    assert writer.wal.segment_count == 0
+
+
+def test_audit_wal_skips_truncated_line(tmp_path):
+    """書き込み途中で停止したセグメントの不完全な行が読み飛ばされることを確認"""
+    wal = AuditWriteAheadLog(tmp_path)
+    wal.append([{"method": "GET", "path": "/api/a", "status_code": 200}])
+    wal._active_file.write(b'{"method": "GET", "pa')
+    wal.seal()
+
+    segments = wal.sealed_segments()
+    assert len(segments) == 1
+    records = wal.read_segment(segments[0])
+    assert [record["path"] for record in records] == ["/api/a"]
+
+
+@pytest.mark.asyncio
+async def test_audit_writer_skips_segment_claimed_by_other_worker(tmp_path):
+    """他のワーカーが確保したセグメントは再投入せず、確保したワーカーが停止していれば戻されることを確認"""
+    store = {"available": True, "rows": []}
+    writer = AuditWriter(
+        wal_dir=tmp_path,
+        session_factory=lambda: _FakeSession(store),
+        dimensions=_PassthroughDimensions(),
+    )
+    writer.wal.append([{"method": "GET", "path": "/api/users", "status_code": 200}])
+    writer.wal.seal()
+    [segment] = writer.wal.sealed_segments()
+
+    # 同じディレクトリを共有する別のワーカー（確保はリネームのため、同じセグメントを確保できるのは1つ）
+    other = AuditWriteAheadLog(tmp_path)
+    claimed = other.claim(segment)
+    assert claimed is not None
+    assert other.claim(segment) is None
+
+    assert await writer.replay() == 0
+    assert store["rows"] == []
+
+    # 確保したワーカーが異常終了した場合は再投入の対象に戻す
+    dead = claimed.with_name(claimed.name.rsplit(".", 1)[0] + ".999999999")
+    claimed.rename(dead)
+    writer.wal.recover()
+    assert writer.wal.sealed_segments() == [segment]
+    assert await writer.replay() == 1
+    assert writer.wal.segment_count == 0
+
+
+@pytest.mark.asyncio
+async def test_audit_writer_releases_segment_when_replay_fails(tmp_path):
+    """再投入に失敗したセグメントは確保が解かれ、次回の再投入の対象に残ることを確認"""
+    store = {"available": False, "rows": []}
+    writer = AuditWriter(
+        wal_dir=tmp_path,
+        session_factory=lambda: _FakeSession(store),
+        dimensions=_PassthroughDimensions(),
+    )
+    writer.wal.append([{"method": "GET", "path": "/api/users", "status_code": 200}])
+
+    assert await writer.replay() == 0
+    assert len(writer.wal.sealed_segments()) == 1
+
+
+def test_parse_route_policies():
+    """ルートごとの記録方針の設定が解釈されることを確認"""
+    rules = parse_route_policies("GET /api/daily-reports=sample:0.1, * /api/customers/*=metadata")
+    assert rules == [
+        ("GET", "/api/daily-reports", AuditPolicy(mode="sample", sample_rate=0.1)),
+        ("*", "/api/customers/*", AuditPolicy(mode="metadata")),
+    ]
+    assert parse_route_policies("") == []
+
+    with pytest.raises(ValueError):
+        parse_policy("sample:2")
+    with pytest.raises(ValueError):
+        parse_route_policies("/api/users=always")
+
+
+def test_audit_policy_resolver_decisions():
+    """記録方針に応じて記録有無・記録項目が決まり、更新系とエラーは常に記録されることを確認"""
+    resolver = AuditPolicyResolver(
+        rules=parse_route_policies(
+            "GET /api/daily-reports=none,GET /api/customers/*=metadata,GET /api/users=errors"
+        ),
+        default=parse_policy("always"),
+    )
+
+    assert resolver.decide("GET", "/api/daily-reports", 200).record is False
+    assert resolver.decide("GET", "/api/users", 200).record is False
+    assert resolver.decide("GET", "/api/users", 404).record is True
+
+    metadata_only = resolver.decide("GET", "/api/customers/{customer_id}", 200)
+    assert metadata_only.record is True
+    assert metadata_only.include_details is False
+
+    # 更新系は方針にかかわらず全項目を記録
+    write = resolver.decide("POST", "/api/daily-reports", 201)
+    assert write.record is True
+    assert write.include_details is True
+
+    # ルールに一致しない参照系はデフォルトの方針
+    assert resolver.decide("GET", "/api/branches", 200).record is True
+
+
+def test_audit_policy_sampling_rate():
+    """サンプリング方針で指定した割合程度が記録されることを確認"""
+    resolver = AuditPolicyResolver(rules=[], default=parse_policy("sample:0.1"))
+    recorded = sum(resolver.decide("GET", "/api/items", 200).record for _ in range(10000))
+    assert 700 < recorded < 1300
+
+
+def test_audit_search_cursor_roundtrip():
+    """検索カーソルのエンコード・デコードを確認"""
+    created_at = datetime(2026, 1, 5, 10, 30, 15, 123456, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_search_audit_logs_keyset_pagination(client: AsyncClient, db_session: AsyncSession, auth_headers):
+    """操作履歴検索がカーソルで重複・欠落なくページングされ、他社の記録を含まないことを確認"""
+    result = await db_session.execute(select(User).where(User.email == "sales@example.com"))
+    user = result.scalar_one()
+
+    base_time = datetime.now(timezone.utc) - timedelta(hours=1)
+    for index in range(5):
+        db_session.add(await _new_audit_log(
+            db_session,
+            user_id=user.id,
+            company_id=user.company_id,
+            method="GET",
+            path=f"/api/test/items/{index}",
+            route="/api/test/items/{item_id}",
+            status_code=500 if index == 0 else 200,
+            # 同時刻の記録も id で順序が決まる
+            created_at=base_time + timedelta(minutes=index // 2),
+        ))
+    db_session.add(await _new_audit_log(
+        db_session,
+        method="GET",
+        path="/api/test/items/other",
+        route="/api/test/items/{item_id}",
+        status_code=200,
+        created_at=base_time,
+    ))
+    await db_session.commit()
+
+    paths = []
+    cursor = None
+    while True:
+        params = {"route": "/api/test/items/{item_id}", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/api/audit-logs", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+        paths.extend(item["path"] for item in data["items"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert paths == [f"/api/test/items/{index}" for index in (4, 3, 2, 1, 0)]
+
+    response = await client.get(
+        "/api/audit-logs",
+        params={"route": "/api/test/items/{item_id}", "status_class": 5},
+        headers=auth_headers,
+    )
+    assert [item["path"] for item in response.json()["items"]] == ["/api/test/items/0"]
+
+    response = await client.get("/api/audit-logs", params={"cursor": "invalid"}, headers=auth_headers)
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_search_audit_logs_by_json_containment(client: AsyncClient, db_session: AsyncSession, auth_headers):
+    """リクエストボディ・クエリパラメータの包含検索で絞り込めることを確認"""
+    result = await db_session.execute(select(User).where(User.email == "sales@example.com"))
+    user = result.scalar_one()
+
+    for customer_id in (41, 42):
+        db_session.add(await _new_audit_log(
+            db_session,
+            user_id=user.id,
+            company_id=user.company_id,
+            method="PUT",
+            path=f"/api/customers/{customer_id}",
+            route="/api/customers/{customer_id}",
+            request_body=json.dumps({"customer_id": customer_id, "name": "山田商事"}, ensure_ascii=False),
+            status_code=200,
+        ))
+    db_session.add(await _new_audit_log(
+        db_session,
+        user_id=user.id,
+        company_id=user.company_id,
+        method="GET",
+        path="/api/customers",
+        route="/api/customers",
+        query_params=json.dumps({"assigned_user_id": "7"}),
+        status_code=200,
+    ))
+    await db_session.commit()
+
+    response = await client.get(
+        "/api/audit-logs",
+        params={"request_body_contains": json.dumps({"customer_id": 42})},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [item["path"] for item in items] == ["/api/customers/42"]
+    assert items[0]["request_body"] == {"customer_id": 42, "name": "山田商事"}
+
+    response = await client.get(
+        "/api/audit-logs",
+        params={"query_params_contains": json.dumps({"assigned_user_id": "7"})},
+        headers=auth_headers,
+    )
+    assert [item["path"] for item in response.json()["items"]] == ["/api/customers"]
+
+    response = await client.get(
+        "/api/audit-logs",
+        params={"request_body_contains": "[1, 2]"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 400
+
+
+def test_drop_invalid_json_keeps_valid_values():
+    """DBに拒否された場合に不正なJSONのみ除外されることを確認"""
+    record = _drop_invalid_json({
+        "request_body": '{"name": "a"',
+        "query_params": '{"skip": "0"}',
+        "path": "/api/items",
+    })
+    assert record == {"request_body": None, "query_params": '{"skip": "0"}', "path": "/api/items"}
+    assert _drop_invalid_json({"request_body": '{"a": "\\u0000"}'})["request_body"] is None
@@ -2,12 +2,20 @@
 認証APIテスト
 """
 import pytest
+from sqlalchemy import select
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from datetime import datetime, timezone
+
 from app.models.company import Company
+from app.models.role import Role
 from app.models.user import User
+from app.models.user_role_assignment import UserRoleAssignment
+from app.auth import repository
+from app.auth.dependencies import USER_BY_ID_QUERY
 from app.auth.password import get_password_hash
+from app.auth.permissions import get_user_permissions
 
 
 @pytest.mark.asyncio
@@ -141,3 +149,115 @@ async def test_get_me_invalid_token(client: AsyncClient):
         headers={"Authorization": "Bearer invalid_token"},
     )
     assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_auth_fast_path_matches_orm(client: AsyncClient, db_session: AsyncSession, monkeypatch):
+    """高速パス（asyncpg 直接実行）のユーザー・権限が ORM のクエリと一致すること"""
+    company = Company(name="テスト株式会社")
+    db_session.add(company)
+    await db_session.flush()
+
+    user = User(
+        company_id=company.id,
+        name="テストユーザー",
+        email="fast@example.com",
+        password_hash=get_password_hash("password123"),
+        role="manager",
+        position="マネージャー",
+    )
+    db_session.add(user)
+    await db_session.flush()
+
+    # グループ権限と、グループ権限と重複する個別権限
+    role = (await db_session.execute(select(Role).where(Role.code == "user.view"))).scalar_one()
+    db_session.add(
+        UserRoleAssignment(company_id=company.id, user_id=user.id, role_id=role.id, granted_at=datetime.now(timezone.utc))
+    )
+    await client.assign_admin_permissions(user.id)
+
+    orm_user = (await db_session.execute(USER_BY_ID_QUERY, {"user_id": user.id})).scalar_one()
+    orm_permissions = await get_user_permissions(db_session, user.id)
+
+    monkeypatch.setattr(repository.settings, "AUTH_FAST_PATH", True)
+    conn = await repository.fast_path_connection(db_session)
+    assert conn is not None
+
+    fast_user = await repository.fetch_auth_user(conn, user.id)
+    assert fast_user is not None
+    for field in repository.AuthUser.__slots__:
+        assert getattr(fast_user, field) == getattr(orm_user, field)
+    assert await repository.fetch_auth_user(conn, user.id + 1000) is None
+
+    assert await repository.fetch_user_permissions(conn, user.id) == orm_permissions
+    assert await get_user_permissions(db_session, user.id) == orm_permissions
+    assert await repository.fetch_user_permissions(conn, user.id + 1000) == set()
+
+
+@pytest.mark.asyncio
+async def test_auth_fast_path_as_first_query_runs_in_transaction(db_session: AsyncSession, monkeypatch):
+    """高速パスがトランザクションの最初のクエリでも READ ONLY トランザクション内で実行され、ORM と同じ結果になること"""
+    company = Company(name="テスト株式会社")
+    db_session.add(company)
+    await db_session.flush()
+    user = User(
+        company_id=company.id,
+        name="テストユーザー",
+        email="fast@example.com",
+        password_hash=get_password_hash("password123"),
+        role="manager",
+    )
+    db_session.add(user)
+    await db_session.commit()
+    orm_user = (await db_session.execute(USER_BY_ID_QUERY, {"user_id": user.id})).scalar_one()
+
+    monkeypatch.setattr(repository.settings, "AUTH_FAST_PATH", True)
+    read_only_engine = db_session.bind.execution_options(postgresql_readonly=True)
+    async with AsyncSession(read_only_engine) as session:
+        conn = await repository.fast_path_connection(session)
+        rows = await repository._fetch(conn, "SELECT current_setting('transaction_read_only')")
+        fast_user = await repository.fetch_auth_user(conn, user.id)
+        await session.rollback()
+
+    for field in repository.AuthUser.__slots__:
+        assert getattr(fast_user, field) == getattr(orm_user, field)
+    # 最初のクエリも BEGIN READ ONLY の後に実行されている（トランザクション外では off）
+    assert rows[0][0] == "on"
+
+
+@pytest.mark.asyncio
+async def test_get_me_with_auth_fast_path(client: AsyncClient, db_session: AsyncSession, monkeypatch):
+    """AUTH_FAST_PATH が有効でも /me と権限チェックが ORM の場合と同じ結果になること"""
+    company = Company(name="テスト株式会社")
+    db_session.add(company)
+    await db_session.flush()
+
+    user = User(
+        company_id=company.id,
+        name="テストユーザー",
+        email="fast@example.com",
+        password_hash=get_password_hash("password123"),
+        role="manager",
+    )
+    db_session.add(user)
+    await db_session.commit()
+
+    login_response = await client.post(
+        "/api/auth/login",
+        json={"email": "fast@example.com", "password": "password123"},
+    )
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    orm_response = await client.get("/api/auth/me", headers=headers)
+    monkeypatch.setattr(repository.settings, "AUTH_FAST_PATH", True)
+    fast_response = await client.get("/api/auth/me", headers=headers)
+
+    assert fast_response.status_code == 200
+    assert fast_response.json() == orm_response.json()
+
+    # 権限がない場合は 403、付与後は 200
+    response = await client.get("/api/users", headers=headers)
+    assert response.status_code == 403
+    await client.assign_admin_permissions(user.id)
+    response = await client.get("/api/users", headers=headers)
+    assert response.status_code == 200
@@ -1,13 +1,18 @@
 """
 Customers CRUD API Tests
 """
+from datetime import date
+
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import func, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.company import Company
 from app.models.user import User
 from app.models.customer import Customer
+from app.models.daily_report import DailyReport
+from app.models.visit_record import VisitRecord
 from app.auth.password import get_password_hash
 
 
@@ -195,6 +200,62 @@ async def test_delete_customer(client: AsyncClient, db_session: AsyncSession):
     assert response.status_code == 204
 
 
+@pytest.mark.asyncio
+async def test_delete_customer_with_many_visit_records(client: AsyncClient, db_session: AsyncSession, capture_statements):
+    """訪問記録が大量にある顧客の削除でも、訪問記録を読み込まずDB側のカスケードで削除すること"""
+    company = Company(name="テスト企業")
+    db_session.add(company)
+    await db_session.flush()
+
+    user = User(
+        company_id=company.id,
+        name="営業担当",
+        email="sales@example.com",
+        password_hash=get_password_hash("password123"),
+        role="user",
+    )
+    db_session.add(user)
+    await db_session.flush()
+
+    report = DailyReport(company_id=company.id, user_id=user.id, report_date=date(2026, 1, 5))
+    db_session.add(report)
+    await db_session.flush()
+
+    customers = {}
+    for count in (1, 100_000):
+        customer = Customer(company_id=company.id, name=f"訪問記録{count}件の顧客")
+        db_session.add(customer)
+        await db_session.flush()
+        await db_session.execute(
+            text(
+                "INSERT INTO visit_records (company_id, daily_report_id, customer_id, visit_datetime, remote) "
+                "SELECT :company_id, :report_id, :customer_id, now(), false FROM generate_series(1, :count)"
+            ),
+            {"company_id": company.id, "report_id": report.id, "customer_id": customer.id, "count": count},
+        )
+        customers[count] = customer
+    await db_session.commit()
+
+    await client.assign_admin_permissions(user.id)
+    login_response = await client.post(
+        "/api/auth/login",
+        json={"email": "sales@example.com", "password": "password123"},
+    )
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    statement_counts = {}
+    for count, customer in customers.items():
+        with capture_statements() as statements:
+            response = await client.delete(f"/api/customers/{customer.id}", headers=headers)
+        assert response.status_code == 204
+        assert not any("visit_records" in statement for statement in statements)
+        statement_counts[count] = len(statements)
+
+    assert statement_counts[1] == statement_counts[100_000]
+    remaining = await db_session.execute(select(func.count()).select_from(VisitRecord))
+    assert remaining.scalar_one() == 0
+
+
 # ========================================
 # 権限テスト (Permission Tests)
 # ========================================
@@ -0,0 +1,660 @@
+"""
+データベース接続・セッション管理のテスト
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import asyncpg
+import pytest
+from fastapi import APIRouter, FastAPI, HTTPException, Request
+from httpx import AsyncClient
+from pydantic import BaseModel, model_validator
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy import exc as sqlalchemy_exc
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.util import greenlet_spawn
+
+from app import database
+from app.auth import dependencies
+from app.auth.dependencies import USER_BY_ID_QUERY, get_current_user
+from app.auth.jwt import create_access_token
+from app.auth.permissions import USER_PERMISSIONS_QUERY
+from app.database import (
+    READ_YOUR_WRITES_HEADER,
+    SHARD_KEY,
+    Base,
+    DatabaseRoute,
+    InstrumentedAsyncQueuePool,
+    commits_per_request,
+    connection_hold,
+    get_db,
+    is_pinned_to_primary,
+    pool_checkout_wait,
+    read_your_writes_token,
+    replica_lag_from_status,
+    use_replica,
+)
+from app.metrics import MetricsRegistry
+from app.models.company import Company
+from app.models.user import User
+from app.services.request_deadline import (
+    DeadlineExceeded,
+    DeadlineResolver,
+    is_deadline_error,
+    parse_route_deadlines,
+    reset_deadline,
+    start_deadline,
+)
+from app.services.slow_query_explain import is_read_statement, parameter_shape
+from app.services.sql_commenter import parse_comment, render_comment, strip_comment
+from app.services.sql_instrumentation import (
+    RepeatedStatementError,
+    finish_request_stats,
+    normalize_statement,
+    start_request_stats,
+    statement_fingerprint,
+)
+from app.services.tenant_shards import DEFAULT_SHARD, ShardMap, parse_shard_map, tenant_move_plan
+
+
+def _request(method: str = "GET", token: str | None = None, access_token: str | None = None) -> Request:
+    """テスト用のリクエストを生成"""
+    headers = []
+    if token is not None:
+        headers.append((READ_YOUR_WRITES_HEADER.lower().encode("latin-1"), token.encode("latin-1")))
+    if access_token is not None:
+        headers.append((b"authorization", f"Bearer {access_token}".encode("latin-1")))
+    return Request({"type": "http", "method": method, "path": "/", "headers": headers})
+
+
+def test_read_your_writes_token_pins_to_primary():
+    """更新直後のトークンが有効な間はプライマリに固定されること"""
+    assert is_pinned_to_primary(_request(token=read_your_writes_token()))
+    assert not is_pinned_to_primary(_request())
+    # 期限切れ・不正な値・有効期間より先の期限は無視
+    assert not is_pinned_to_primary(_request(token=f"{time.time() - 1:.3f}"))
+    assert not is_pinned_to_primary(_request(token="invalid"))
+    assert not is_pinned_to_primary(_request(token=f"{time.time() + 3600:.3f}"))
+
+
+def test_use_replica_only_for_reads_within_lag(monkeypatch):
+    """参照系リクエストのみ、遅延が許容範囲内の場合にレプリカを使用すること"""
+    monkeypatch.setattr(database, "ReplicaSessionLocal", database.AsyncSessionLocal)
+    monkeypatch.setattr(database.replica_state, "lag_seconds", 0.5)
+
+    assert use_replica(_request("GET"))
+    assert not use_replica(_request("POST"))
+    assert not use_replica(_request("GET", token=read_your_writes_token()))
+
+    monkeypatch.setattr(database.replica_state, "lag_seconds", database.settings.REPLICA_MAX_LAG_SECONDS + 1)
+    assert not use_replica(_request("GET"))
+
+    monkeypatch.setattr(database.replica_state, "lag_seconds", None)
+    assert not use_replica(_request("GET"))
+
+
+def test_replica_lag_requires_streaming_receiver():
+    """WAL レシーバーが停止している場合は、受信位置と適用位置が一致していても遅延中とみなすこと"""
+    assert replica_lag_from_status(True, True, True, 120.0) == (0.0, None)
+    assert replica_lag_from_status(True, True, False, 3.5) == (3.5, None)
+    lag, error = replica_lag_from_status(True, False, True, 0.1)
+    assert lag is None and error
+    lag, error = replica_lag_from_status(False, False, None, None)
+    assert lag is None and error
+
+
+def test_use_replica_disabled_without_replica(monkeypatch):
+    """レプリカ未設定の場合は常にプライマリを使用すること"""
+    monkeypatch.setattr(database, "ReplicaSessionLocal", None)
+    monkeypatch.setattr(database.replica_state, "lag_seconds", 0.0)
+    assert not use_replica(_request("GET"))
+
+
+@pytest.mark.asyncio
+async def test_health_reports_replica(client: AsyncClient):
+    """ヘルスチェックにレプリカの状態が含まれること"""
+    response = await client.get("/health")
+    assert response.status_code == 200
+    replica = response.json()["replica"]
+    assert replica["enabled"] is (database.ReplicaSessionLocal is not None)
+    assert "lag_seconds" in replica
+
+
+@pytest.mark.asyncio
+async def test_get_db_uses_read_only_transaction_for_get(db_session: AsyncSession):
+    """GET のセッションは READ ONLY トランザクションで、コミットしないこと"""
+    before = commits_per_request.count(kind="read")
+    sessions = get_db(_request("GET"))
+    session = await sessions.__anext__()
+    session.add(Company(name="参照専用"))
+    with pytest.raises(DBAPIError):
+        await session.flush()
+    await sessions.aclose()
+
+    assert commits_per_request.count(kind="read") == before + 1
+    assert commits_per_request.sum(kind="read") == 0
+
+
+@pytest.mark.asyncio
+async def test_get_db_commits_write_once(db_session: AsyncSession):
+    """更新系リクエストはハンドラー終了後に1回だけコミットすること"""
+    before_count = commits_per_request.count(kind="write")
+    before_sum = commits_per_request.sum(kind="write")
+    sessions = get_db(_request("POST"))
+    session = await sessions.__anext__()
+    session.add(Company(name="一括確定"))
+    await session.flush()
+    with pytest.raises(StopAsyncIteration):
+        await sessions.__anext__()
+
+    assert commits_per_request.count(kind="write") == before_count + 1
+    assert commits_per_request.sum(kind="write") == before_sum + 1
+    result = await db_session.execute(select(Company).where(Company.name == "一括確定"))
+    assert result.scalar_one_or_none() is not None
+
+
+def test_histogram_render():
+    """ヒストグラムが累積バケット・合計・件数で出力されること"""
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "テスト", buckets=(0.1, 1))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(2)
+
+    rendered = registry.render()
+    assert 'test_seconds_bucket{le="0.1"} 1' in rendered
+    assert 'test_seconds_bucket{le="1"} 2' in rendered
+    assert 'test_seconds_bucket{le="+Inf"} 3' in rendered
+    assert "test_seconds_sum 2.55" in rendered
+    assert "test_seconds_count 3" in rendered
+    assert histogram.quantile(0.5) == 1
+    assert histogram.quantile(0.95) is None
+
+
+class _TrackingSession:
+    """コミット・解放の順序を記録するセッション"""
+
+    def __init__(self, events: list[str], read_only: bool = False):
+        self.events = events
+        self.info = {"read_only": read_only}
+
+    async def commit(self):
+        self.events.append("commit")
+
+    async def close(self):
+        self.events.append("close")
+
+
+@pytest.mark.asyncio
+async def test_database_route_releases_session_before_serialization():
+    """ハンドラーの終了直後、レスポンスのシリアライズ前にセッションが解放されること"""
+    events: list[str] = []
+
+    class Item(BaseModel):
+        name: str
+
+        @model_validator(mode="before")
+        @classmethod
+        def track(cls, data):
+            events.append("serialize")
+            return data
+
+    router = APIRouter(route_class=DatabaseRoute)
+
+    @router.post("/items", response_model=Item)
+    async def create_item():
+        database._request_session.set(_TrackingSession(events))
+        events.append("handler")
+        return {"name": "テスト"}
+
+    test_app = FastAPI()
+    test_app.include_router(router)
+    async with AsyncClient(app=test_app, base_url="http://test") as ac:
+        response = await ac.post("/items")
+
+    assert response.status_code == 200
+    assert events == ["handler", "commit", "close", "serialize"]
+
+
+def test_instrumented_pool_records_wait_and_hold_time():
+    """接続の取得待ち時間と保持時間が計測されること"""
+
+    class _Connection:
+        def rollback(self):
+            pass
+
+        def close(self):
+            pass
+
+    pool = InstrumentedAsyncQueuePool(_Connection, pool_size=1, max_overflow=0)
+    pool.metrics_label = "test"
+    connection = pool.connect()
+    connection.close()
+
+    assert pool_checkout_wait.count(pool="test") == 1
+    assert connection_hold.count(pool="test") == 1
+    assert pool.waiting == 0
+    assert database.pool_checked_out.value(pool="test") == 0
+    assert pool.recreate().metrics_label == "test"
+
+
+@pytest.mark.asyncio
+async def test_instrumented_pool_counts_only_blocked_checkouts():
+    """待ちタスク数はプールを使い切って待つ取得のみ数え、待ちの開始時とタイムアウトを含む終了時にゲージを更新すること"""
+
+    class _Connection:
+        def rollback(self):
+            pass
+
+        def close(self):
+            pass
+
+    observed: list[int] = []
+
+    class _RecordingPool(InstrumentedAsyncQueuePool):
+        def _update_gauges(self):
+            super()._update_gauges()
+            observed.append(database.pool_waiting.value(pool="waiting-test"))
+
+    pool = _RecordingPool(_Connection, pool_size=1, max_overflow=0, timeout=0.01)
+    pool.metrics_label = "waiting-test"
+    connection = await greenlet_spawn(pool.connect)
+    assert observed == [0]
+
+    with pytest.raises(sqlalchemy_exc.TimeoutError):
+        await greenlet_spawn(pool.connect)
+    assert observed == [0, 1, 0]
+    assert database.pool_waiting.value(pool="waiting-test") == 0
+    connection.close()
+
+
+def test_engines_are_created_on_first_use(monkeypatch):
+    """エンジンはセッションの初回使用時に生成され、プールの設定値が反映されること"""
+    monkeypatch.setattr(database, "_async_engines", {})
+    session = database.ReadOnlySessionLocal()
+    assert database._async_engines == {}
+
+    bind = session.sync_session.get_bind()
+    assert set(database._async_engines) == {
+        (DEFAULT_SHARD, database.ROLE_PRIMARY),
+        (DEFAULT_SHARD, database.ROLE_PRIMARY_READ_ONLY),
+    }
+    assert bind.pool is database.get_async_engine().sync_engine.pool
+    assert bind.pool.size() == database.settings.DB_POOL_SIZE
+
+
+def test_replica_engine_requires_setting(monkeypatch):
+    """読み取りレプリカ未設定の場合は replica のエンジンを生成しないこと"""
+    monkeypatch.setattr(database, "_async_engines", {})
+    monkeypatch.setattr(database.settings, "DATABASE_URL_ASYNC_REPLICA", None)
+    with pytest.raises(RuntimeError):
+        database.get_async_engine(database.ROLE_REPLICA)
+
+
+def test_pool_stats_reports_created_pools(monkeypatch):
+    """生成済みのプールのみ、設定値とともに状態が返されること"""
+    monkeypatch.setattr(database, "_async_engines", {})
+    assert database.pool_stats() == []
+
+    database.get_async_engine(database.ROLE_PRIMARY_READ_ONLY)
+    stats = database.pool_stats()
+    assert [item["pool"] for item in stats] == ["primary"]
+    assert stats[0]["size"] == database.settings.DB_POOL_SIZE
+    assert stats[0]["checked_out"] == 0
+    assert stats[0]["waiting"] == 0
+
+
+@pytest.mark.asyncio
+async def test_admin_db_pool_endpoint(client: AsyncClient, auth_headers):
+    """管理者がコネクションプールの状態を取得できること"""
+    response = await client.get("/api/admin/db-pool", headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["pre_ping"] == database.settings.DB_POOL_PRE_PING
+    assert isinstance(data["pools"], list)
+
+
+def test_pgbouncer_mode_engine_options(monkeypatch):
+    """PgBouncer モードではアプリ側で接続を保持せず、ステートメント名を一意にすること"""
+    monkeypatch.setattr(database.settings, "DB_PGBOUNCER_PREPARED_STATEMENTS", False)
+    options = database.async_engine_options(pgbouncer_mode=True)
+    assert options["poolclass"] is database.InstrumentedNullPool
+    assert "pool_size" not in options
+    connect_args = options["connect_args"]
+    assert connect_args["statement_cache_size"] == 0
+    assert connect_args["prepared_statement_cache_size"] == 0
+    name_func = connect_args["prepared_statement_name_func"]
+    assert name_func() != name_func()
+
+    # PgBouncer がプリペアドステートメントを引き継ぐ場合はキャッシュを残す
+    monkeypatch.setattr(database.settings, "DB_PGBOUNCER_PREPARED_STATEMENTS", True)
+    connect_args = database.async_engine_options(pgbouncer_mode=True)["connect_args"]
+    assert "statement_cache_size" not in connect_args
+
+    options = database.async_engine_options(pgbouncer_mode=False)
+    assert options["poolclass"] is database.InstrumentedAsyncQueuePool
+    assert options["pool_size"] == database.settings.DB_POOL_SIZE
+
+
+def test_normalize_statement_groups_statement_shapes():
+    """パラメータの値・IN リストの長さ・空白が異なるSQLを同じ形状とみなすこと"""
+    assert normalize_statement("SELECT * FROM users WHERE id = $1") == "SELECT * FROM users WHERE id = ?"
+    assert normalize_statement("SELECT * FROM users\n WHERE id IN ($1, $2, $3)") == normalize_statement(
+        "SELECT * FROM users WHERE id IN ($1)"
+    )
+
+
+def test_normalize_statement_strips_asyncpg_parameter_casts():
+    """asyncpg の方言がパラメータに付ける型のキャストを除き、IN リストの長さが異なるSQLを同じ形状とみなすこと"""
+    dialect = postgresql.asyncpg.dialect()
+
+    def compiled(statement) -> str:
+        return str(statement.compile(dialect=dialect, compile_kwargs={"render_postcompile": True}))
+
+    two = compiled(select(Company.id).where(Company.id.in_([1, 2])))
+    three = compiled(select(Company.id).where(Company.id.in_([1, 2, 3])))
+    assert "::INTEGER" in two
+    assert statement_fingerprint(two) == statement_fingerprint(three)
+    assert normalize_statement(two).endswith("WHERE companies.id IN (?)")
+
+    timestamp = compiled(select(Company.id).where(Company.created_at > datetime(2026, 1, 1, tzinfo=timezone.utc)))
+    assert normalize_statement(timestamp).endswith("WHERE companies.created_at > ?")
+    # 列のキャストは形状の一部として残す
+    assert normalize_statement("SELECT id::text FROM companies WHERE id = $1") == "SELECT id::text FROM companies WHERE id = ?"
+
+
+def test_request_stats_detect_repeated_statements():
+    """リクエスト内のSQL実行回数と同一形状の繰り返しが記録されること"""
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        stats, token = start_request_stats()
+        try:
+            for value in range(3):
+                conn.execute(text("SELECT :value"), {"value": value})
+            conn.execute(text("SELECT 1, 2"))
+        finally:
+            finish_request_stats(token)
+        # リクエスト外のSQLは記録しない
+        conn.execute(text("SELECT 1"))
+
+    assert stats.count == 4
+    assert stats.total_ms > 0
+    repeated = stats.repeated(3)
+    assert [(statement, count) for _, statement, count in repeated] == [("SELECT ?", 3)]
+
+
+def test_request_stats_raise_on_repeated_statements(monkeypatch):
+    """SQL_REPEAT_ACTION=raise の場合、閾値回数に達したSQLで例外になること"""
+    monkeypatch.setattr(database.settings, "SQL_REPEAT_THRESHOLD", 2)
+    monkeypatch.setattr(database.settings, "SQL_REPEAT_ACTION", "raise")
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        stats, token = start_request_stats()
+        try:
+            conn.execute(text("SELECT :value"), {"value": 1})
+            with pytest.raises(RepeatedStatementError):
+                conn.execute(text("SELECT :value"), {"value": 2})
+        finally:
+            finish_request_stats(token)
+
+
+@pytest.mark.asyncio
+async def test_query_stats_headers(client: AsyncClient, auth_headers):
+    """レスポンスヘッダーにSQL実行回数とDB時間が含まれること"""
+    response = await client.get("/api/companies", headers=auth_headers)
+    assert response.status_code == 200
+    assert int(response.headers["X-DB-Query-Count"]) >= 1
+    assert float(response.headers["X-DB-Time-Ms"]) >= 0
+
+
+def test_sql_comment_round_trip():
+    """sqlcommenter 形式のコメントを生成・解釈・除去できること"""
+    comment = render_comment({"route": "/api/users/{user_id}", "controller": "get_user", "request_id": None})
+    assert comment == "/*controller='get_user',route='%2Fapi%2Fusers%2F%7Buser_id%7D'*/"
+
+    statement = f"SELECT * FROM users WHERE id = $1 {comment}"
+    assert parse_comment(statement) == {"controller": "get_user", "route": "/api/users/{user_id}"}
+    assert strip_comment(statement) == "SELECT * FROM users WHERE id = $1"
+    assert parse_comment("SELECT 1") == {}
+
+
+@pytest.mark.asyncio
+async def test_database_route_tags_sql_with_route(monkeypatch):
+    """SQL_COMMENTER_ENABLED の場合、リクエスト中のSQLにルートのコメントが付加されること"""
+    monkeypatch.setattr(database.settings, "SQL_COMMENTER_ENABLED", True)
+    engine = create_engine("sqlite://")
+    statements: list[str] = []
+    event.listen(engine, "after_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+
+    router = APIRouter(route_class=DatabaseRoute)
+
+    @router.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        with engine.connect() as conn:
+            conn.exec_driver_sql("SELECT 1")
+        return {"id": item_id}
+
+    test_app = FastAPI()
+    test_app.include_router(router)
+    async with AsyncClient(app=test_app, base_url="http://test") as ac:
+        response = await ac.get("/items/1")
+
+    assert response.status_code == 200
+    assert parse_comment(statements[0]) == {"controller": "get_item", "route": "/items/{item_id}"}
+
+
+def test_slow_query_explain_statement_classification():
+    """副作用のない参照系のSQLのみ EXPLAIN ANALYZE で再実行すること"""
+    assert is_read_statement("SELECT * FROM users WHERE id = $1")
+    assert is_read_statement("WITH recent AS (SELECT 1) SELECT * FROM recent")
+    assert not is_read_statement("SELECT * FROM users WHERE id = $1 FOR UPDATE")
+    assert not is_read_statement("WITH moved AS (DELETE FROM users RETURNING *) SELECT * FROM moved")
+    assert not is_read_statement("UPDATE users SET name = $1 WHERE id = $2")
+    assert parameter_shape((1, "a", None)) == ["int", "str", "NoneType"]
+    assert parameter_shape({"id": 1}) == ["id:int"]
+
+
+@pytest.mark.asyncio
+async def test_admin_slow_queries_endpoint(client: AsyncClient, auth_headers):
+    """管理者が遅いSQLの実行計画を取得・破棄できること"""
+    response = await client.get("/api/admin/slow-queries", headers=auth_headers)
+    assert response.status_code == 200
+    assert isinstance(response.json()["plans"], list)
+
+    response = await client.delete("/api/admin/slow-queries", headers=auth_headers)
+    assert response.status_code == 204
+
+
+def test_route_deadlines_resolution():
+    """ルートごとの制限時間は先に書いた設定が優先され、一致しない場合は既定値になること"""
+    resolver = DeadlineResolver(
+        parse_route_deadlines("GET /api/subscriptions/history=5, * /api/subscriptions/*=10"),
+        default=30,
+    )
+    assert resolver.deadline_for("GET", "/api/subscriptions/history") == 5
+    assert resolver.deadline_for("POST", "/api/subscriptions/history") == 10
+    assert resolver.deadline_for("GET", "/api/users") == 30
+    with pytest.raises(ValueError):
+        parse_route_deadlines("/api/users=5")
+
+
+def test_statement_timeout_shrinks_with_remaining_deadline(monkeypatch):
+    """statement_timeout はトランザクションの最初のSQLの前に設定し、許容値以上経過した後のSQLの前に残り時間で設定し直すこと"""
+    monkeypatch.setattr(database, "STATEMENT_TIMEOUT_SLACK_MS", 50)
+    engine = create_engine("sqlite://")
+    timeouts: list[int] = []
+
+    @event.listens_for(engine, "connect")
+    def register_set_config(dbapi_connection, connection_record):
+        # PostgreSQL の set_config の代わり（設定した値を記録）
+        dbapi_connection.create_function("set_config", 3, lambda name, value, local: timeouts.append(int(value)))
+
+    class SqliteRoutingSession(database.RoutingSession):
+        def get_bind(self, mapper=None, **kw):
+            return engine
+
+    token = start_deadline(10)
+    try:
+        with SqliteRoutingSession() as session:
+            session.execute(text("SELECT 1"))
+            session.execute(text("SELECT 1"))
+            assert len(timeouts) == 1
+            time.sleep(0.06)
+            session.execute(text("SELECT 1"))
+            assert len(timeouts) == 2
+            assert timeouts[1] < timeouts[0] <= 10000
+            session.rollback()
+
+        # 制限時間がない場合は設定しない
+        reset_deadline(token)
+        token = start_deadline(0)
+        with SqliteRoutingSession() as session:
+            session.execute(text("SELECT 1"))
+        assert len(timeouts) == 2
+    finally:
+        reset_deadline(token)
+        engine.dispose()
+
+
+def test_is_deadline_error_matches_query_canceled():
+    """statement_timeout によるキャンセルは SQLAlchemy が変換した例外でもドライバーの例外でも制限時間の超過になること"""
+    canceled = asyncpg.exceptions.QueryCanceledError("canceling statement due to statement timeout")
+    assert is_deadline_error(DeadlineExceeded())
+    assert is_deadline_error(canceled)
+    assert is_deadline_error(DBAPIError("SELECT 1", None, canceled))
+    assert not is_deadline_error(asyncpg.exceptions.UniqueViolationError("duplicate key"))
+    assert not is_deadline_error(RuntimeError())
+
+
+@pytest.mark.asyncio
+async def test_database_route_returns_503_after_deadline(monkeypatch):
+    """制限時間を超えた後のSQLは実行せず、503 を返すこと"""
+    monkeypatch.setattr(database, "deadline_resolver", DeadlineResolver([("GET", "/slow", 0.01)], default=0))
+    engine = create_engine("sqlite://")
+    executed: list[str] = []
+
+    router = APIRouter(route_class=DatabaseRoute)
+
+    @router.get("/slow")
+    async def slow():
+        await asyncio.sleep(0.02)
+        with engine.connect() as conn:
+            executed.append(conn.exec_driver_sql("SELECT 1").scalar())
+        return {}
+
+    @router.get("/fast")
+    async def fast():
+        with engine.connect() as conn:
+            executed.append(conn.exec_driver_sql("SELECT 1").scalar())
+        return {}
+
+    test_app = FastAPI()
+    test_app.include_router(router)
+    async with AsyncClient(app=test_app, base_url="http://test") as ac:
+        slow_response = await ac.get("/slow")
+        fast_response = await ac.get("/fast")
+
+    assert slow_response.status_code == 503
+    assert fast_response.status_code == 200
+    assert executed == [1]
+
+
+def test_shard_map_parsing():
+    """シャードの設定を解釈し、未指定の企業は default に配置すること"""
+    shards = parse_shard_map(
+        "shard1=postgresql+asyncpg://localhost/db_shard1?ssl=disable", "42=shard1", "postgresql+asyncpg://localhost/db"
+    )
+    assert shards.shards == [DEFAULT_SHARD, "shard1"]
+    assert shards.url_for("shard1") == "postgresql+asyncpg://localhost/db_shard1?ssl=disable"
+    assert shards.shard_for(42) == "shard1"
+    assert shards.shard_for(1) == DEFAULT_SHARD
+    assert shards.shard_for(None) == DEFAULT_SHARD
+    with pytest.raises(ValueError):
+        parse_shard_map("", "42=shard2", "postgresql+asyncpg://localhost/db")
+
+
+def test_tenant_move_plan_follows_foreign_keys():
+    """企業IDを持たないテーブルは外部キーをたどって移動対象にし、操作履歴は対象外にすること"""
+    plan, shared = tenant_move_plan(Base.metadata)
+    conditions = {item.table.name: item.condition for item in plan}
+    names = list(conditions)
+
+    assert names[0] == "companies"
+    assert conditions["users"] == "company_id = $1"
+    assert conditions["departments"] == "company_id = $1"
+    assert conditions["group_role_permissions"] == "group_role_id IN (SELECT id FROM group_roles WHERE company_id = $1)"
+    assert names.index("branches") < names.index("departments") < names.index("user_department_assignments")
+    assert not any(name.startswith("audit_") for name in names)
+
+    # マスタとシステムグループ（企業IDが NULL）は共有の行
+    shared_conditions = {item.table.name: item.condition for item in shared}
+    assert shared_conditions == {
+        "roles": "TRUE",
+        "services": "TRUE",
+        "group_roles": "company_id IS NULL",
+        "group_role_permissions": "group_role_id IN (SELECT id FROM group_roles WHERE company_id IS NULL)",
+    }
+
+
+def test_request_shard_uses_token_company(monkeypatch):
+    """アクセストークンの company_id から企業の配置先シャードを決めること"""
+    urls = {DEFAULT_SHARD: "postgresql+asyncpg://localhost/db", "shard1": "postgresql+asyncpg://localhost/db_shard1"}
+    monkeypatch.setattr(database, "shard_map", ShardMap(urls, {42: "shard1"}))
+
+    moved = create_access_token({"user_id": 1, "company_id": 42})
+    assert database.request_shard(_request(access_token=moved)) == "shard1"
+    other = create_access_token({"user_id": 2, "company_id": 1})
+    assert database.request_shard(_request(access_token=other)) == DEFAULT_SHARD
+    assert database.request_shard(_request()) == DEFAULT_SHARD
+
+
+class _UserResult:
+    def __init__(self, user):
+        self.user = user
+
+    def scalar_one_or_none(self):
+        return self.user
+
+
+class _ShardSession:
+    """get_current_user のテスト用セッション（シャードと、IDで取得するユーザーのみ）"""
+
+    def __init__(self, shard: str, user):
+        self.info = {SHARD_KEY: shard}
+        self.user = user
+
+    async def execute(self, statement, params=None):
+        return _UserResult(self.user)
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_rejects_tokens_for_other_shards(monkeypatch):
+    """シャード分割時は company_id を含まないトークンと、企業の配置先と異なるシャードのユーザーを 401 にすること"""
+    urls = {DEFAULT_SHARD: "postgresql+asyncpg://localhost/db", "shard1": "postgresql+asyncpg://localhost/db_shard1"}
+    monkeypatch.setattr(dependencies, "shard_map", ShardMap(urls, {42: "shard1"}))
+    moved_user = User(id=1, company_id=42, name="移動済み", email="moved@example.com", role="manager")
+
+    token = create_access_token({"user_id": 1, "company_id": 42})
+    user = await get_current_user(_request(access_token=token), token, _ShardSession("shard1", moved_user))
+    assert user is moved_user
+
+    # 移動元に残った行
+    with pytest.raises(HTTPException) as exc_info:
+        await get_current_user(_request(access_token=token), token, _ShardSession(DEFAULT_SHARD, moved_user))
+    assert exc_info.value.status_code == 401
+
+    # company_id を含まない（移動前に発行した）トークン
+    legacy = create_access_token({"user_id": 1})
+    with pytest.raises(HTTPException) as exc_info:
+        await get_current_user(_request(access_token=legacy), legacy, _ShardSession(DEFAULT_SHARD, moved_user))
+    assert exc_info.value.status_code == 401
+
+
+def test_prebuilt_statements_reuse_cache_key():
+    """構築済みのステートメントはキャッシュキーを再利用し、値をバインドパラメータで受け取ること"""
+    for statement in (USER_BY_ID_QUERY, USER_PERMISSIONS_QUERY):
+        assert statement._generate_cache_key() is statement._generate_cache_key()
+        assert statement.compile().params == {"user_id": None}
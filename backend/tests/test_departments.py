@@ -3,6 +3,7 @@ Departments CRUD API Tests
 """
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.company import Company
@@ -24,6 +25,7 @@ async def test_get_departments_list(client: AsyncClient, db_session: AsyncSessio
     await db_session.flush()
 
     department = Department(
+        company_id=company.id,
         branch_id=branch.id,
         name="営業部",
         description="営業部門",
@@ -63,6 +65,48 @@ async def test_get_departments_list(client: AsyncClient, db_session: AsyncSessio
     assert departments[0]["name"] == "営業部"
 
 
+@pytest.mark.asyncio
+async def test_get_departments_scoped_by_company_id(client: AsyncClient, db_session: AsyncSession, capture_statements):
+    """部署一覧は departments.company_id で絞り込み、支店を結合しないこと"""
+    departments = {}
+    for name in ("自社", "他社"):
+        company = Company(name=name)
+        db_session.add(company)
+        await db_session.flush()
+        branch = Branch(company_id=company.id, name=f"{name}本社")
+        db_session.add(branch)
+        await db_session.flush()
+        department = Department(company_id=company.id, branch_id=branch.id, name=f"{name}営業部")
+        db_session.add(department)
+        departments[name] = department
+
+    user = User(
+        company_id=departments["自社"].company_id,
+        name="管理者",
+        email="manager@example.com",
+        password_hash=get_password_hash("password123"),
+        role="manager",
+    )
+    db_session.add(user)
+    await db_session.commit()
+
+    await client.assign_admin_permissions(user.id)
+    login_response = await client.post(
+        "/api/auth/login",
+        json={"email": "manager@example.com", "password": "password123"},
+    )
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    with capture_statements() as statements:
+        response = await client.get("/api/departments", headers=headers)
+
+    assert response.status_code == 200
+    assert [item["name"] for item in response.json()] == ["自社営業部"]
+    department_queries = [statement for statement in statements if "FROM departments" in statement]
+    assert department_queries
+    assert not any("branches" in statement for statement in department_queries)
+
+
 @pytest.mark.asyncio
 async def test_create_department(client: AsyncClient, db_session: AsyncSession):
     """部署作成テスト"""
@@ -110,6 +154,10 @@ async def test_create_department(client: AsyncClient, db_session: AsyncSession):
     assert data["name"] == "技術部"
     assert data["description"] == "技術開発部門"
 
+    # 企業IDは支店から設定される
+    result = await db_session.execute(select(Department.company_id).where(Department.id == data["id"]))
+    assert result.scalar_one() == company.id
+
 
 @pytest.mark.asyncio
 async def test_update_department(client: AsyncClient, db_session: AsyncSession):
@@ -123,6 +171,7 @@ async def test_update_department(client: AsyncClient, db_session: AsyncSession):
     await db_session.flush()
 
     department = Department(
+        company_id=company.id,
         branch_id=branch.id,
         name="更新前部署",
     )
@@ -173,6 +222,7 @@ async def test_delete_department(client: AsyncClient, db_session: AsyncSession):
     await db_session.flush()
 
     department = Department(
+        company_id=company.id,
         branch_id=branch.id,
         name="削除対象部署",
     )
@@ -3,9 +3,11 @@ Users CRUD API Tests
 """
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.company import Company
+from app.models.customer import Customer
 from app.models.user import User
 from app.auth.password import get_password_hash
 
@@ -183,6 +185,67 @@ async def test_delete_user(client: AsyncClient, db_session: AsyncSession):
     assert response.status_code == 204
 
 
+@pytest.mark.asyncio
+async def test_delete_user_with_many_daily_reports(client: AsyncClient, db_session: AsyncSession, capture_statements):
+    """日報が大量にあるユーザーの削除でも、日報・担当顧客を読み込まずDB側のカスケード・SET NULL で処理すること"""
+    company = Company(name="テスト企業")
+    db_session.add(company)
+    await db_session.flush()
+
+    admin = User(
+        company_id=company.id,
+        name="管理者",
+        email="admin@example.com",
+        password_hash=get_password_hash("password123"),
+        role="admin",
+    )
+    db_session.add(admin)
+    await db_session.flush()
+
+    targets = {}
+    for count in (1, 100_000):
+        target_user = User(
+            company_id=company.id,
+            name=f"日報{count}件のユーザー",
+            email=f"target{count}@example.com",
+            password_hash=get_password_hash("password123"),
+            role="user",
+        )
+        db_session.add(target_user)
+        await db_session.flush()
+        db_session.add(Customer(company_id=company.id, assigned_user_id=target_user.id, name="担当顧客"))
+        await db_session.execute(
+            text(
+                "INSERT INTO daily_reports (company_id, user_id, report_date) "
+                "SELECT :company_id, :user_id, DATE '2026-01-01' + n FROM generate_series(1, :count) AS n"
+            ),
+            {"company_id": company.id, "user_id": target_user.id, "count": count},
+        )
+        targets[count] = target_user
+    await db_session.commit()
+
+    await client.assign_admin_permissions(admin.id)
+    login_response = await client.post(
+        "/api/auth/login",
+        json={"email": "admin@example.com", "password": "password123"},
+    )
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    statement_counts = {}
+    for count, target_user in targets.items():
+        with capture_statements() as statements:
+            response = await client.delete(f"/api/users/{target_user.id}", headers=headers)
+        assert response.status_code == 204
+        assert not any("daily_reports" in statement or "customers" in statement for statement in statements)
+        statement_counts[count] = len(statements)
+
+    assert statement_counts[1] == statement_counts[100_000]
+    remaining = await db_session.execute(text("SELECT count(*) FROM daily_reports"))
+    assert remaining.scalar_one() == 0
+    unassigned = await db_session.execute(text("SELECT count(*) FROM customers WHERE assigned_user_id IS NULL"))
+    assert unassigned.scalar_one() == 2
+
+
 @pytest.mark.asyncio
 async def test_create_user_with_duplicate_email(
     client: AsyncClient, db_session: AsyncSession
@@ -3,6 +3,10 @@ import type { ApiError } from '@/types'
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000'
 
+// read-your-writes トークン（更新直後の参照をプライマリDBで処理させるためにサーバーへ送り返す）
+const READ_YOUR_WRITES_HEADER = 'X-Primary-Until'
+let readYourWritesToken: string | null = null
+
 // Axiosインスタンスの作成
 const apiClient: AxiosInstance = axios.create({
   baseURL: API_BASE_URL,
@@ -19,6 +23,9 @@ apiClient.interceptors.request.use(
     if (token && config.headers) {
       config.headers.Authorization = `Bearer ${token}`
     }
+    if (readYourWritesToken && config.headers) {
+      config.headers[READ_YOUR_WRITES_HEADER] = readYourWritesToken
+    }
     return config
   },
   (error) => {
@@ -28,7 +35,13 @@ apiClient.interceptors.request.use(
 
 // レスポンスインターセプター: エラーハンドリング
 apiClient.interceptors.response.use(
-  (response) => response,
+  (response) => {
+    const primaryUntil = response.headers[READ_YOUR_WRITES_HEADER.toLowerCase()]
+    if (primaryUntil) {
+      readYourWritesToken = primaryUntil
+    }
+    return response
+  },
   (error: AxiosError<ApiError>) => {
     // 401エラー: 認証切れ
     if (error.response?.status === 401) {